@@ -1,85 +1,214 @@
 """
-Description: 
+Description:
 The following is a script that computes various airflow and heat gain metrics
-based on input parameters provided by the user in a csv file. Input parameters
-are loaded from csv to a pandas dataframe.
+based on input parameters provided by the user in a csv file (first data row
+of input_parameters.csv).
+
+Sweep mode (--sweep) evaluates a whole grid of what-if conditions for test
+planning: every swept input gets a list ("5.88,7.87,16") or a range
+("lo:hi:n", n evenly spaced points incl. both ends), the other inputs keep
+their input_parameters.csv values. Each swept input is laid along its own
+array axis, so systemCalcs.heat_gain_chain computes the full Cartesian
+product by NumPy broadcasting (no Python loop; intermediate values that only
+depend on one input stay on that input's axis). Results are saved as a
+compact .npz file (the axis values plus one array per output, stored without
+the axes it does not depend on), or as a tidy table with one row per grid
+point: .parquet (needs pyarrow) or .csv. Formatting text is what limits csv
+(~1 s per 100,000 points), so use .npz or .parquet for million-point grids.
+
+Sweepable inputs: Pbar_inHg, D (duct ID, in), pdiff (inWc), Tdb, Tdew,
+Tdb_room, W_room or Tdew_room.
+
+Usage:
+    python HG_Calculator.py [input_parameters.csv] [-o output.csv]
+    python HG_Calculator.py --sweep D=5.88,7.87,16 --sweep pdiff=0.002:0.5:1000
+                            --sweep Tdb_room=65:85:41 -o grid.npz
 
 Dependencies:
-    - pandas
     - numpy
-    - os (standard library)
+    - csv, os (standard library)
+    - pandas (only for tidy sweep tables), pyarrow (only for .parquet)
 """
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #                               Imports
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-import systemCalcs as calc 
-import pandas as pd
-import csv 
+import systemCalcs as calc
+import numpy as np
+import argparse
+import csv
+import time
 import os
+from log_writer import LogWriter
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-def write_data(data, file_name):
-    with open(file_name, 'a', newline='') as file_data:
-        csvWriter = csv.writer(file_data, delimiter=',')
-        csvWriter.writerow(data)
-
-
-# operation to get string of current directory path
-current_directory = os.getcwd()
-# Read input parameters from csv file
-csv_file_name = "input_parameters.csv"
-csv_path = current_directory + '/' + csv_file_name
-df = pd.read_csv(csv_path)
-
-# Input parameters ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-# 1.) Barometric Pressure - inHg
-Pbar_inHg = df["Pbar_inHg"][0]
-# 2.) Barometric Pressure converted from inHg to millibars 
-Pbar_mbar = Pbar_inHg/calc.millibar_to_inHg
-# 3.) Duct diameter (ID used for flow calculation)
-duct_diameter = df["duct diameter"][0]
-# 4.) Differential pressure measured in in.wc. (Velocity pressure)
-pdiff = df["dp.inw"][0]
-# 5.) Dry bulb temperature
-Tdb = df["Tdb"][0]
-# 6.) Dew point temperature
-Tdew = df["Tdew"][0]
-# ~~ Optional inputs ~~
-# 7.) Room Dry Bulb Temperature
-Tdb_room = df["Tdb_room"][0]
-# 8.) Room Humidity Ratio
-W_room = df["W_room"][0]
-# Outputs ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-# 1.) Partial Pressure Water Vapor (Calculated)
-pp_water = calc.Pp(Tdew)
-# 2.) Humidity Ratio - Supply/Room
-w = calc.W(Pbar_inHg, pp_water)
-# 3.) Calculated Air Density - Room/Supply System 1
-rho = calc.rho(Pbar_mbar, Tdb, w) 
-# 4.) Air Velocity
-V = calc.velocity(pdiff, rho)
-# 5.) Actual Measured Flow [Acfm] - Provide duct ID 
-Q_Acfm = round(calc.QflowActual(V, duct_diameter), 2) 
-# 6.) Standard Air Corrected Flow [Scfm]
-Q_Scfm = round(calc.QflowStandard(Q_Acfm, Pbar_inHg, Tdb), 2)
-# 7.) Sensible Heat Gain [Btu/h] (approx.)
-q_sensible =  round(1.08 * Q_Scfm * (Tdb - Tdb_room), 1)
-# 8.) Latent Heat Gain [Btu/h] (approx.) 
-q_latent = round(4840 * Q_Scfm * (w - W_room), 1)
-# 9.) Total Heat Gain [Btu/h]
-q_total = round(q_sensible + q_latent, 1)
-
-# Format and write results to csv ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# heat_gain_chain argument -> input_parameters.csv column
+INPUT_COLUMNS = {
+    "Pbar_inHg": "Pbar_inHg",   # Barometric Pressure - inHg
+    "D": "duct diameter",       # Duct diameter (ID used for flow calculation)
+    "pdiff": "dp.inw",          # Differential pressure in in.wc. (Velocity pressure)
+    "Tdb": "Tdb",               # Dry bulb temperature
+    "Tdew": "Tdew",             # Dew point temperature
+    "Tdb_room": "Tdb_room",     # Room Dry Bulb Temperature (optional)
+    "W_room": "W_room",         # Room Humidity Ratio (optional)
+}
 output_headers = ["Q_Scfm", "Q_Acfm", "Velocity", "W", "q_sensible", "q_latent", "q_total"]
-results = []
-results.append(Q_Scfm)
-results.append(Q_Acfm)
-results.append(V)
-results.append(w)
-results.append(q_sensible)
-results.append(q_latent)
-results.append(q_total)
-# results.append()
-write_data(output_headers, "output.csv")
-write_data(results, "output.csv")
+# Sweep results (heat_gain_chain keys)
+SWEEP_OUTPUTS = ["Q_Scfm", "Q_Acfm", "V", "W", "rho", "q_sensible", "q_latent", "q_total"]
+
+
+def load_parameters(csv_path):
+    # First row of the input csv as {heat_gain_chain argument: value}
+    with open(csv_path, newline='') as f:
+        row = {k.strip(): v.strip() for k, v in next(csv.DictReader(f)).items() if k}
+    params = {key: float(row[col]) for key, col in INPUT_COLUMNS.items() if row.get(col)}
+    if row.get("Tdew_room"):
+        params["Tdew_room"] = float(row["Tdew_room"])
+        params.pop("W_room", None)
+    return params
+
+def calculate(params):
+    # Single operating point, step by step as listed in the results
+    Pbar_inHg = params["Pbar_inHg"]
+    # Barometric Pressure converted from inHg to millibars
+    Pbar_mbar = Pbar_inHg/calc.millibar_to_inHg
+    Tdb = params["Tdb"]
+    # 1.) Partial Pressure Water Vapor (Calculated)
+    pp_water = calc.Pp(params["Tdew"])
+    # 2.) Humidity Ratio - Supply/Room
+    w = calc.W(Pbar_inHg, pp_water)
+    if "Tdew_room" in params:
+        W_room = calc.W(Pbar_inHg, calc.Pp(params["Tdew_room"]))
+    else:
+        W_room = params["W_room"]
+    # 3.) Calculated Air Density - Room/Supply System 1
+    rho = calc.rho(Pbar_mbar, Tdb, w)
+    # 4.) Air Velocity
+    V = calc.velocity(params["pdiff"], rho)
+    # 5.) Actual Measured Flow [Acfm] - Provide duct ID
+    Q_Acfm = round(calc.QflowActual(V, params["D"]), 2)
+    # 6.) Standard Air Corrected Flow [Scfm]
+    Q_Scfm = round(calc.QflowStandard(Q_Acfm, Pbar_inHg, Tdb), 2)
+    # 7.) Sensible Heat Gain [Btu/h] (approx.)
+    q_sensible =  round(1.08 * Q_Scfm * (Tdb - params["Tdb_room"]), 1)
+    # 8.) Latent Heat Gain [Btu/h] (approx.)
+    q_latent = round(4840 * Q_Scfm * (w - W_room), 1)
+    # 9.) Total Heat Gain [Btu/h]
+    q_total = round(q_sensible + q_latent, 1)
+    return [Q_Scfm, Q_Acfm, V, w, q_sensible, q_latent, q_total]
+
+def write_results(results, path="output.csv"):
+    with LogWriter(path) as log:
+        log.writerow(output_headers)
+        log.writerow(results)
+
+
+# ---- Sweep mode -------------------------------------------------------------
+def parse_values(spec):
+    # "a,b,c" -> list; "lo:hi:n" -> n evenly spaced points from lo to hi
+    if ":" in spec:
+        lo, hi, n = spec.split(":")
+        return np.linspace(float(lo), float(hi), int(n))
+    return np.array([float(v) for v in spec.split(",")])
+
+def parse_sweeps(specs):
+    # ["name=values", ...] -> {name: 1-D array}, in the given order
+    axes = {}
+    for spec in specs:
+        name, values = spec.split("=", 1)
+        name = name.strip()
+        if name not in INPUT_COLUMNS and name != "Tdew_room":
+            raise ValueError("Unknown sweep input \"{}\"".format(name))
+        axes[name] = parse_values(values)
+    return axes
+
+def sweep(base, axes, outputs=SWEEP_OUTPUTS, round_results=True):
+    # base: fixed inputs; axes: {input: 1-D values}, one grid axis each.
+    # Returns {"axes": axes, output: N-D array of shape (len(axis), ...)};
+    # outputs are broadcast views, an axis they do not depend on costs no memory
+    params = dict(base)
+    if "Tdew_room" in axes:
+        params.pop("W_room", None)
+    elif "W_room" in axes:
+        params.pop("Tdew_room", None)
+    ndim = len(axes)
+    for i, (name, values) in enumerate(axes.items()):
+        shape = [1]*ndim
+        shape[i] = len(values)
+        params[name] = np.asarray(values, dtype=float).reshape(shape)
+    shape = tuple(len(values) for values in axes.values())
+    r = calc.heat_gain_chain(round_results=round_results, **params)
+    result = {"axes": dict(axes)}
+    for out in outputs:
+        result[out] = np.broadcast_to(r[out], shape)
+    return result
+
+def tidy(result):
+    # One row per grid point: the swept inputs, then the outputs
+    import pandas as pd
+    axes = result["axes"]
+    grid = np.meshgrid(*axes.values(), indexing="ij", sparse=True)
+    shape = tuple(len(values) for values in axes.values())
+    columns = {name: np.broadcast_to(g, shape).ravel() for name, g in zip(axes, grid)}
+    for key, values in result.items():
+        if key != "axes":
+            columns[key] = values.ravel()
+    return pd.DataFrame(columns)
+
+def _compact(values):
+    # Drop the broadcast (zero-stride) axes, keeping the number of dimensions
+    return np.ascontiguousarray(values[tuple(slice(0, 1) if stride == 0 and n > 1 else slice(None)
+                                             for stride, n in zip(values.strides, values.shape))])
+
+def save(result, path):
+    # .npz: axis values ("axis:<input>") + one compact array per output;
+    # .parquet / anything else: tidy table / csv
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npz":
+        arrays = {"axis:" + name: values for name, values in result["axes"].items()}
+        arrays.update({key: _compact(values) for key, values in result.items() if key != "axes"})
+        np.savez(path, **arrays)
+    elif ext == ".parquet":
+        tidy(result).to_parquet(path, index=False)
+    else:
+        tidy(result).to_csv(path, index=False, float_format="%.6g")
+
+def load(path):
+    # Inverse of save() for .npz files (outputs broadcast back to the grid)
+    with np.load(path) as f:
+        result = {"axes": {k[5:]: f[k] for k in f.files if k.startswith("axis:")}}
+        shape = tuple(len(values) for values in result["axes"].values())
+        result.update({k: np.broadcast_to(f[k], shape) for k in f.files if not k.startswith("axis:")})
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Airflow and heat gain for one operating point or a grid")
+    parser.add_argument("input", nargs="?", default=os.path.join(os.getcwd(), "input_parameters.csv"))
+    parser.add_argument("-o", "--output", help="output file (default output.csv, sweep.npz for --sweep)")
+    parser.add_argument("--sweep", action="append", metavar="INPUT=VALUES",
+                        help="swept input, e.g. D=5.88,7.87,16 or pdiff=0.002:0.5:1000 (repeatable)")
+    args = parser.parse_args(argv)
+
+    # Read input parameters from csv file
+    params = load_parameters(args.input)
+    if not args.sweep:
+        # Format and write results to csv
+        write_results(calculate(params), args.output or "output.csv")
+    else:
+        try:
+            axes = parse_sweeps(args.sweep)
+        except ValueError as e:
+            parser.error(str(e))
+        output = args.output or "sweep.npz"
+        tic = time.perf_counter()
+        result = sweep(params, axes)
+        calc_sec = time.perf_counter() - tic
+        save(result, output)
+        points = int(np.prod([len(values) for values in axes.values()]))
+        print("{:,} points ({}) -> {}: {:.2f} s calc, {:.2f} s total".format(
+            points, " x ".join("{} {}".format(len(v), k) for k, v in axes.items()),
+            output, calc_sec, time.perf_counter() - tic))
+
 
+if __name__ == '__main__':
+    main()
@@ -1,85 +1,198 @@
 """
-Description: 
+Description:
 The following is a script that computes various airflow and heat gain metrics
-based on input parameters provided by the user in a csv file. Input parameters
-are loaded from csv to a pandas dataframe.
+for every interval of a logged test. The log (xlsx or csv) is loaded to a
+pandas dataframe, the whole calculation chain runs column-wise through
+systemCalcs.heat_gain_chain, and the results are written in one bulk write.
+
+Which log column feeds which input is given by a column mapping (input name ->
+column name). The default matches the xlsx exports (e.g. test.xlsx); another
+mapping can be passed as a JSON file, a two column csv (input,column) or
+"input=column" pairs on the command line. Logs written by main.py (.csv) get
+their own column mapping, duct diameter and header rows (PRESETS) unless
+these are given.
+
+The parsed input columns are cached next to the input file (see ingest.py),
+so repeated runs on the same log skip the slow xlsx parse.
+
+With --uncertainty linear|mc the standard uncertainty of flow and heat gain
+is added per row (u_* columns, see uncertainty.py). With --energy the heat
+gains are integrated over the log's own time column (E.sec for xlsx exports,
+Elapsed s - or Test Time in older ones - for main.py logs) into running Btu
+totals (see energy.py).
+
+Usage:
+    python HG_interval_calc.py [input] [-o output.csv] [--columns spec]
+                               [--duct-diameter D] [--skiprows N] [--no-cache]
+                               [--uncertainty linear|mc] [--draws 2000] [--energy]
 
 Dependencies:
     - pandas
     - numpy
     - os (standard library)
+    - uncertainty (only with --uncertainty)
 """
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #                               Imports
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-import systemCalcs as calc 
+import systemCalcs as calc
+import ingest
+import energy
 import pandas as pd
-import csv 
+import argparse
+import csv
+import json
+import time
 import os
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-def write_data(data, file_name):
-    with open(file_name, 'a', newline='') as file_data:
-        csvWriter = csv.writer(file_data, delimiter=',')
-        csvWriter.writerow(data)
-
-
-# operation to get string of current directory path
-current_directory = os.getcwd()
-# Read input parameters from csv file
-xlsx_file_name = "test.xlsx"
-xlsx_path = current_directory + '/' + xlsx_file_name
-df = pd.read_excel(xlsx_path, skiprows=22)
-output_headers = ["Q_Scfm", "Q_Acfm", "Velocity", "W", "q_sensible", "q_latent", "q_total"]
-write_data(output_headers, "output.csv")
-# Input parameters ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-for i in range(len(df)-3):
-    # 1.) Barometric Pressure - inHg
-    Pbar_inHg = df["Pbar.inHg"][i]
-    # 2.) Barometric Pressure converted from inHg to millibars 
-    Pbar_mbar = Pbar_inHg/calc.millibar_to_inHg
-    # 3.) Duct diameter (ID used for flow calculation)
-    duct_diameter = 5.88 #df["duct diameter"][0]
-    # 4.) Differential pressure measured in in.wc. (Velocity pressure)
-    pdiff = df["LmuaLDp.inw"][i]
-    # 5.) Dry bulb temperature
-    Tdb = df["tLmua"][i]
-    # 6.) Dew point temperature
-    Tdew = df["DewEx"][i]
-    # ~~ Optional inputs ~~
-    # 7.) Room Dry Bulb Temperature
-    Tdb_room = df["AvTr.F"][i]
-    # 8.) Room Humidity Ratio
-    W_room = df["wLmua"][i]
-    # Outputs ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    # 1.) Partial Pressure Water Vapor (Calculated)
-    pp_water = calc.Pp(Tdew)
-    # 2.) Humidity Ratio - Supply/Room
-    w = calc.W(Pbar_inHg, pp_water)
-    # 3.) Calculated Air Density - Room/Supply System 1
-    rho = calc.rho(Pbar_mbar, Tdb, w) 
-    # 4.) Air Velocity
-    V = calc.velocity(pdiff, rho)
-    # 5.) Actual Measured Flow [Acfm] - Provide duct ID 
-    Q_Acfm = round(calc.QflowActual(V, duct_diameter), 2) 
-    # 6.) Standard Air Corrected Flow [Scfm]
-    Q_Scfm = round(calc.QflowStandard(Q_Acfm, Pbar_inHg, Tdb), 2)
-    # 7.) Sensible Heat Gain [Btu/h] (approx.)
-    q_sensible =  round(1.08 * Q_Scfm * (Tdb - Tdb_room), 1)
-    # 8.) Latent Heat Gain [Btu/h] (approx.) 
-    q_latent = round(4840 * Q_Scfm * (w - W_room), 1)
-    # 9.) Total Heat Gain [Btu/h]
-    q_total = round(q_sensible + q_latent, 1)
-
-    # Format and write results to csv ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    results = []
-    results.append(Q_Scfm)
-    results.append(Q_Acfm)
-    results.append(V)
-    results.append(w)
-    results.append(q_sensible)
-    results.append(q_latent)
-    results.append(q_total)
-    # results.append()
-    write_data(results, "output.csv")
+# Input name (systemCalcs.heat_gain_chain argument) -> log column
+DEFAULT_COLUMNS = {
+    "Pbar_inHg": "Pbar.inHg",   # Barometric Pressure - inHg
+    "pdiff": "LmuaLDp.inw",     # Differential pressure in in.wc. (Velocity pressure)
+    "Tdb": "tLmua",             # Dry bulb temperature
+    "Tdew": "DewEx",            # Dew point temperature
+    "Tdb_room": "AvTr.F",       # Room Dry Bulb Temperature
+    "W_room": "wLmua",          # Room Humidity Ratio (or "Tdew_room")
+}
+DUCT_DIAMETER = 5.88 # Duct ID used for flow calculation [in]
+# Station logs written by main.py (date row, then the 25-column header)
+LOG_COLUMNS = {
+    "Pbar_inHg": "Pbar_inHg",
+    "pdiff": "Pdif_exh",
+    "Tdb": "Tdb_exh",
+    "Tdew": "Tdew_exh",
+    "Tdb_room": "Tdb_room:",
+    "W_room": "W_room",
+}
+LOG_DUCT_DIAMETER = 7.87
+# Per source type: column mapping, duct diameter, skiprows, skip_footer
+PRESETS = {
+    "xlsx": (DEFAULT_COLUMNS, DUCT_DIAMETER, 22, 3),
+    "log": (LOG_COLUMNS, LOG_DUCT_DIAMETER, 1, 0),
+}
+# xlsx exports: time column and its unit in seconds (logs: energy.LOG_TIME_COLUMNS)
+XLSX_TIME = ("E.sec", 1.0)
+OUTPUT_HEADERS = ["Q_Scfm", "Q_Acfm", "Velocity", "W", "q_sensible", "q_latent", "q_total"]
+OUTPUT_KEYS = ["Q_Scfm", "Q_Acfm", "V", "W", "q_sensible", "q_latent", "q_total"]
+UNCERTAINTY_KEYS = ["Q_Scfm", "q_sensible", "q_latent", "q_total"]
+ENERGY_KEYS = ["q_sensible", "q_latent", "q_total"] # -> energy.ENERGY_HEADERS
+
+
+def load_column_map(spec=None, defaults=DEFAULT_COLUMNS):
+    # spec: None (defaults), dict, path to .json / .csv, or "key=col,key=col"
+    if spec is None:
+        return dict(defaults)
+    if isinstance(spec, dict):
+        columns = dict(spec)
+    elif os.path.isfile(spec):
+        if spec.lower().endswith(".json"):
+            with open(spec) as f:
+                columns = json.load(f)
+        else:
+            mapping = pd.read_csv(spec, header=None, dtype=str)
+            columns = dict(zip(mapping[0].str.strip(), mapping[1].str.strip()))
+    else:
+        columns = dict(pair.split("=", 1) for pair in spec.split(","))
+    # Entries not given fall back to the defaults (room humidity is either/or)
+    if "Tdew_room" in columns:
+        return {**{k: v for k, v in defaults.items() if k != "W_room"}, **columns}
+    return {**defaults, **columns}
+
+def _source_type(path):
+    # xlsx exports vs. csv logs from main.py
+    return "xlsx" if path.lower().endswith((".xlsx", ".xls")) else "log"
+
+def preset_for(path):
+    return PRESETS[_source_type(path)]
+
+def time_column_for(path):
+    # csv logs: "Elapsed s" if logged, else the rounded "Test Time"
+    if _source_type(path) == "xlsx":
+        return XLSX_TIME
+    with open(path, newline="") as f:
+        f.readline() # date row
+        return energy.log_time_column(next(csv.reader([f.readline()]), []))
+
+def read_input(path, columns, skiprows=22, skip_footer=3, cache=True):
+    # Only the mapped columns are parsed (or loaded from the ingest cache);
+    # trailing summary rows are dropped
+    df = ingest.read_log(path, skiprows, usecols=columns.values(), cache=cache)
+    if skip_footer:
+        df = df.iloc[:-skip_footer]
+    return df.apply(pd.to_numeric, errors="coerce")
+
+def compute(df, columns, duct_diameter=DUCT_DIAMETER, uncertainty=None, draws=2000, t=None):
+    # Whole-column calculation - no per-row Python loop
+    # uncertainty: None, "linear" or "mc" -> u_<output> columns
+    # t: test time [s] per row -> running Btu totals (energy.ENERGY_HEADERS)
+    inputs = {key: df[col].to_numpy(dtype=float) for key, col in columns.items()}
+    r = calc.heat_gain_chain(D=duct_diameter, **inputs)
+    results = pd.DataFrame({h: r[k] for h, k in zip(OUTPUT_HEADERS, OUTPUT_KEYS)})
+    if uncertainty:
+        import uncertainty as unc
+        u = unc.propagate(dict(inputs, D=duct_diameter), uncertainty, draws=draws,
+                          outputs=UNCERTAINTY_KEYS)
+        for k in UNCERTAINTY_KEYS:
+            results["u_" + k] = u["u:" + k]
+    if t is not None:
+        totals = energy.integrate(t, {h: r[k] for h, k in zip(energy.ENERGY_HEADERS, ENERGY_KEYS)})
+        for h in energy.ENERGY_HEADERS:
+            results[h] = totals[h]
+    return results
+
+def reprocess(input_path, output_path="output.csv", columns=None,
+              duct_diameter=None, skiprows=None, skip_footer=None, cache=True,
+              uncertainty=None, draws=2000, energy=False):
+    # Returns the results dataframe and the calculation rate in rows/sec.
+    # Settings not given come from the preset of the input (xlsx export or
+    # main.py log, see PRESETS)
+    preset = preset_for(input_path)
+    columns = load_column_map(columns, preset[0])
+    duct_diameter = preset[1] if duct_diameter is None else duct_diameter
+    skiprows = preset[2] if skiprows is None else skiprows
+    skip_footer = preset[3] if skip_footer is None else skip_footer
+    time_column, scale = time_column_for(input_path)
+    df = read_input(input_path, dict(columns, t=time_column) if energy else columns,
+                    skiprows, skip_footer, cache)
+    tic = time.perf_counter()
+    t = df[time_column].to_numpy(dtype=float)*scale if energy else None
+    results = compute(df, columns, duct_diameter, uncertainty, draws, t)
+    results.to_csv(output_path, index=False)
+    toc = time.perf_counter()
+    rows_per_sec = len(results)/max(toc - tic, 1e-9)
+    return results, rows_per_sec
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute flow and heat gain for every row of a test log")
+    parser.add_argument("input", nargs="?", default=os.path.join(os.getcwd(), "test.xlsx"))
+    parser.add_argument("-o", "--output", default="output.csv")
+    parser.add_argument("--columns", help="column mapping: JSON/csv file or key=col,key=col")
+    parser.add_argument("--duct-diameter", type=float,
+                        help="duct ID [in] (default {} for xlsx exports, {} for main.py logs)".format(
+                            DUCT_DIAMETER, LOG_DUCT_DIAMETER))
+    parser.add_argument("--skiprows", type=int, help="rows before the header (default: per input type)")
+    parser.add_argument("--skip-footer", type=int, help="summary rows after the data (default: per input type)")
+    parser.add_argument("--no-cache", action="store_true", help="always re-parse the input file")
+    parser.add_argument("--uncertainty", choices=("linear", "mc"),
+                        help="add the standard uncertainty of flow and heat gain")
+    parser.add_argument("--draws", type=int, default=2000, help="Monte Carlo draws per row")
+    parser.add_argument("--energy", action="store_true",
+                        help="add running Btu totals (trapezoidal over the log's time column)")
+    args = parser.parse_args(argv)
+
+    tic = time.perf_counter()
+    results, rows_per_sec = reprocess(args.input, args.output, args.columns,
+                                      args.duct_diameter, args.skiprows, args.skip_footer,
+                                      not args.no_cache, args.uncertainty, args.draws, args.energy)
+    total = time.perf_counter() - tic
+    print("{} rows -> {} ({:.0f} rows/sec calc + write, {:.2f} sec total incl. read)".format(
+        len(results), args.output, rows_per_sec, total))
+    if args.energy and len(results):
+        print("Energy: " + ", ".join("{} {:.1f}".format(h, results[h].iloc[-1])
+                                     for h in energy.ENERGY_HEADERS))
+
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Description:
+Adaptive scan rate: sample fast while the test is changing (appliance on /
+off, warm-up) and slowly once it has settled. The rate of change of each
+watched quantity (exhaust temperature, velocity pressure, total heat gain by
+default) is the least-squares slope over a short rolling window
+(rolling_stats.RollingWindow, so non-uniform scan times are handled):
+
+    slow -> fast  as soon as any |slope| exceeds its threshold
+    fast -> slow  only after every |slope| has stayed below exit_ratio x its
+                  threshold for `hold` seconds
+
+The two thresholds and the hold time give the hysteresis that keeps noise
+around a threshold from toggling the rate. update() returns the interval to
+use; main.py hands it to the scheduler (Scheduler.set_interval, which takes
+effect after the scan already scheduled, so a transient is picked up within
+one slow interval).
+
+Dependencies:
+    - rolling_stats
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+from rolling_stats import RollingWindow
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Watched quantity -> slope threshold [units per minute] for switching to fast
+DEFAULT_THRESHOLDS = {
+    "T_exh": 1.0,        # F/min
+    "pdiff_exh": 0.02,   # inWc/min
+    "Total HG": 400.0,   # Btu/h per min
+}
+
+
+def parse_rates(spec):
+    # "FAST:SLOW" [s] -> (fast, slow), e.g. "1:10"
+    fast, slow = (float(v) for v in spec.split(":"))
+    if not 0 < fast <= slow:
+        raise ValueError("Adaptive intervals need 0 < fast <= slow")
+    return fast, slow
+
+
+class AdaptiveInterval:
+
+    def __init__(self, fast=1.0, slow=10.0, thresholds=None, window=120.0, hold=120.0,
+                 exit_ratio=0.5):
+        # fast / slow: scan intervals [s]; window: slope window [s], long enough
+        # to hold a dozen slow scans so scan noise does not read as a slope
+        if not 0 < fast <= slow:
+            raise ValueError("Adaptive intervals need 0 < fast <= slow")
+        self.fast_interval = float(fast)
+        self.slow_interval = float(slow)
+        self.thresholds = dict(thresholds or DEFAULT_THRESHOLDS)
+        self.hold = float(hold)
+        self.exit_ratio = float(exit_ratio)
+        capacity = int(window/fast) + 2
+        self.windows = {name: RollingWindow(window, capacity) for name in self.thresholds}
+        self.fast = True       # start fast: the start of a test is a transient
+        self.quiet_since = None
+        self.switches = 0
+        self.time_fast = 0.0   # test time spent in each mode [s]
+        self.time_slow = 0.0
+        self._t_prev = None
+
+    @property
+    def interval(self):
+        return self.fast_interval if self.fast else self.slow_interval
+
+    def rates(self):
+        # name -> |slope| per minute over the window (NaN until 2 samples)
+        return {name: abs(w.slope)*60 for name, w in self.windows.items()}
+
+    def update(self, t, values):
+        # t: test time [s]; values: name -> value (missing / NaN skipped).
+        # Returns the scan interval to use from now on.
+        if self._t_prev is not None:
+            if self.fast:
+                self.time_fast += t - self._t_prev
+            else:
+                self.time_slow += t - self._t_prev
+        self._t_prev = t
+        for name, w in self.windows.items():
+            x = values.get(name)
+            if x is not None and x == x:
+                w.add(t, x)
+        # Quantities without a slope yet (or not measured) do not count
+        rates = {name: r for name, r in self.rates().items() if r == r}
+        changing = any(r > self.thresholds[name] for name, r in rates.items())
+        settled = bool(rates) and all(r <= self.exit_ratio*self.thresholds[name]
+                                      for name, r in rates.items())
+        if changing:
+            self.quiet_since = None
+            if not self.fast:
+                self.fast = True
+                self.switches += 1
+        elif self.fast and settled:
+            if self.quiet_since is None:
+                self.quiet_since = t
+            elif t - self.quiet_since >= self.hold:
+                self.fast = False
+                self.quiet_since = None
+                self.switches += 1
+        else:
+            self.quiet_since = None
+        return self.interval
+
+    def report(self):
+        total = self.time_fast + self.time_slow
+        if not total:
+            return "Adaptive rate: no samples"
+        return "Adaptive rate: {} switches, {:.0f} % of the test at {} s, {:.0f} % at {} s".format(
+            self.switches, 100*self.time_fast/total, self.fast_interval,
+            100*self.time_slow/total, self.slow_interval)
+
+
+if __name__ == '__main__':
+    import random
+
+    # Synthetic test: exhaust temperature steps up at 20 min (appliance on)
+    # and down at 80 min, exponential response with noise. Scans follow the
+    # interval the controller asks for.
+    rng = random.Random(0)
+    rate = AdaptiveInterval(fast=1.0, slow=10.0)
+    t, scans, log = 0.0, 0, []
+    while t < 120*60:
+        if t < 20*60:
+            T = 75.0
+        elif t < 80*60:
+            T = 95.0 - 20.0*2.718281828**(-(t - 20*60)/600)
+        else:
+            T = 75.0 + 20.0*2.718281828**(-(t - 80*60)/600)
+        interval = rate.update(t, {"T_exh": T + rng.gauss(0, 0.05)})
+        if not log or log[-1][1] != interval:
+            log.append((t, interval))
+        t += interval
+        scans += 1
+    for start, interval in log:
+        print("  from {:6.1f} min: every {} s".format(start/60, interval))
+    print("{} scans instead of {} at 1 s".format(scans, 120*60))
+    print(rate.report())
@@ -0,0 +1,111 @@
+"""
+Description:
+One command line entry point for the station tools:
+
+    python airflow_station.py log   [options]       official test with data logging
+    python airflow_station.py idle  [options]       idle test (display only)
+    python airflow_station.py probe [names ...]     read input channels once
+    python airflow_station.py calc  [csv] [-o out]  flow / heat gain for one operating point
+    python airflow_station.py sweep D=5.88,7.87 pdiff=0.002:0.5:1000 [-o grid.npz]
+    python airflow_station.py reprocess test.xlsx   recompute a log (a folder / glob: batch)
+    python airflow_station.py energy 10-18-26a.csv   heat gain energy totals [Btu] of a log
+
+`python airflow_station.py <command> --help` lists the options of a command
+(log / idle take the same options as main.py). Only the standard library is
+imported at startup; every command imports the modules it needs when it
+runs, so e.g. a channel check never loads pandas and reprocessing never loads
+the LabJack driver (benchmarks/startup.py measures the start-up times).
+
+Dependencies:
+    - argparse, importlib (standard library); the rest per command
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import argparse
+import importlib
+import os
+import sys
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# command -> (module, help); the module is imported only when the command runs
+COMMANDS = {
+    "log": ("main", "official test with data logging"),
+    "idle": ("main", "idle test, no logging"),
+    "probe": ("labjack_functions", "read input channels once (channel map, or a single AI / TC)"),
+    "calc": ("HG_Calculator", "flow and heat gain for the conditions in input_parameters.csv"),
+    "sweep": ("HG_Calculator", "what-if grid: INPUT=a,b,c or INPUT=lo:hi:n per swept input"),
+    "reprocess": ("HG_interval_calc", "recompute flow and heat gain for a log (folder / glob: batch)"),
+    "energy": ("energy", "heat gain energy totals [Btu] of a log (incremental with --checkpoint)"),
+}
+
+
+def probe(argv):
+    parser = argparse.ArgumentParser(prog="airflow_station.py probe",
+                                     description="Read input channels once and print them")
+    parser.add_argument("names", nargs="*", help="channel map entries (default: all)")
+    parser.add_argument("--ai", type=int, metavar="CH", help="read analog input AIN<CH> instead [V]")
+    parser.add_argument("--tc", type=int, metavar="CH", help="read thermocouple on AIN<CH> instead [F]")
+    parser.add_argument("--negative", type=int, default=199, metavar="CH",
+                        help="negative channel (default 199 = GND)")
+    parser.add_argument("--range", type=float, default=10.0, help="AI voltage range (default 10)")
+    parser.add_argument("--simulate", metavar="SRC", help="simulated device (see sim_ljm.py)")
+    parser.add_argument("-i", "--interactive", action="store_true", help="prompt for the channel")
+    args = parser.parse_args(argv)
+
+    import labjack_functions as ljf
+    from channel_map import ChannelMap
+    channel_map = ChannelMap.load()
+    if args.simulate:
+        import sim_ljm
+        ljf.set_session(ljf.LabJackSession(
+            backend=sim_ljm.SimLJM(channel_map, sim_ljm.make_source(args.simulate))))
+    if args.interactive:
+        import main
+        return main.probe()
+    if args.ai is not None:
+        print("AIN{}: {} V".format(args.ai, ljf.aiRead(args.ai, args.negative, args.range)))
+    elif args.tc is not None:
+        print("AIN{} TC: {} F".format(args.tc, ljf.tempRead_TC(args.tc, args.negative)))
+    else:
+        if args.names:
+            unknown = [n for n in args.names if n not in [c.name for c in channel_map]]
+            if unknown:
+                parser.error("not in the channel map: " + ", ".join(unknown))
+            channel_map = channel_map.subset(names=args.names)
+        session = ljf.get_session()
+        channel_map.write_config(session)
+        for name, value in channel_map.read_scan(session).items():
+            print("{:12s} {:12.4f}".format(name, value))
+
+def run(command, argv):
+    module_name = COMMANDS[command][0]
+    if command == "probe":
+        return probe(argv)
+    if command == "reprocess" and argv and not argv[0].startswith("-") \
+            and (os.path.isdir(argv[0]) or any(c in argv[0] for c in "*?[")):
+        module_name = "batch_reprocess"
+    elif command == "sweep":
+        # INPUT=VALUES positionals -> --sweep INPUT=VALUES
+        argv = sum((["--sweep", a] if "=" in a and not a.startswith("-") else [a] for a in argv), [])
+    elif command in ("log", "idle"):
+        argv = ["--" + command] + argv
+    module = importlib.import_module(module_name)
+    return module.main(argv)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(
+        prog="airflow_station.py", description="Airflow station: logging, checks and calculations",
+        epilog="\n".join("  {:10s} {}".format(c, h) for c, (m, h) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=COMMANDS, metavar="command",
+                        help="one of: " + ", ".join(COMMANDS))
+    # Everything after the command belongs to it (incl. --help)
+    if not argv or argv[0] not in COMMANDS:
+        parser.parse_args(argv[:1])
+    return run(argv[0], argv[1:])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Description:
+asyncio front end for the station. LJM calls are blocking, so they run on a
+dedicated single-thread executor (one thread owns the device handle, as in
+the threaded pipeline) while the event loop stays free for consumers:
+
+    lj = AsyncLabJack(session)
+    scans = ScanBroadcaster(lj, channel_map, interval=5.0)
+    scans.start()
+    async for item in scans.subscribe():     # logger, display, publisher...
+        print(item.elapsed, item.scan)
+
+ScanBroadcaster acquires on a drift-free schedule and hands each scan to
+every subscriber's own bounded queue without waiting: when a subscriber
+falls behind, its oldest scans are dropped (and counted) so a slow consumer
+never stalls acquisition or the other consumers.
+
+Any ljm backend works, e.g. fake_ljm.FakeLJM / sim_ljm.SimLJM for tests.
+
+Dependencies:
+    - labjack_functions, scheduler (Histogram)
+    - asyncio, concurrent.futures (standard library)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+import labjack_functions as ljf
+from scheduler import Histogram
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+_CLOSED = object() # End-of-stream marker in subscriber queues
+
+
+async def ainput(prompt=""):
+    # input() without blocking the event loop (menus while acquiring)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, input, prompt)
+
+
+class AsyncLabJack:
+
+    def __init__(self, session=None, executor=None):
+        self.session = session or ljf.get_session()
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(1, thread_name_prefix="ljm")
+
+    async def run(self, func, *args, **kwargs):
+        # Run any blocking call (e.g. a labjack_functions helper) on the LJM thread
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def eWriteNames(self, names, values):
+        return await self.run(self.session.eWriteNames, names, values)
+
+    async def eReadName(self, name):
+        return await self.run(self.session.eReadName, name)
+
+    async def eReadNames(self, names):
+        return await self.run(self.session.eReadNames, names)
+
+    async def read_scan(self, channel_map):
+        return await self.run(channel_map.read_scan, self.session)
+
+    def close(self):
+        if self._own_executor:
+            self.executor.shutdown(wait=True)
+
+
+class ScanItem:
+    __slots__ = ("k", "elapsed", "stamp", "scan", "error")
+
+    def __init__(self, k, elapsed, stamp, scan, error=None):
+        self.k = k               # scan number on the schedule
+        self.elapsed = elapsed   # test time [s]
+        self.stamp = stamp       # wall-clock time [s]
+        self.scan = scan         # channel name -> value, None if the read failed
+        self.error = error
+
+
+class Subscription:
+    # Async iterator over the scans published after subscribing
+
+    def __init__(self, broadcaster, maxsize):
+        self._broadcaster = broadcaster
+        self.queue = asyncio.Queue(maxsize)
+        self.received = 0
+        self.dropped = 0
+
+    def _offer(self, item):
+        # Called by the producer; never waits
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self.queue.get()
+        if item is _CLOSED:
+            raise StopAsyncIteration
+        self.received += 1
+        return item
+
+    def close(self):
+        self._broadcaster._subscribers.discard(self)
+
+
+class ScanBroadcaster:
+
+    def __init__(self, lj, channel_map, interval=5.0):
+        self.lj = lj
+        self.channel_map = channel_map
+        self.interval = float(interval)
+        self.jitter = Histogram()
+        self.latency = Histogram()
+        self.scans = 0
+        self.errors = 0
+        self.missed = 0
+        self._subscribers = set()
+        self._task = None
+
+    def subscribe(self, maxsize=10):
+        # maxsize: scans a consumer may lag behind before its oldest are dropped
+        sub = Subscription(self, maxsize)
+        self._subscribers.add(sub)
+        return sub
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _publish(self, item):
+        for sub in list(self._subscribers):
+            sub._offer(item)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        start = due = loop.time()
+        k = 0
+        try:
+            while True:
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif -delay >= self.interval:
+                    # Skip whole missed intervals instead of bursting
+                    missed = int(-delay // self.interval)
+                    self.missed += missed
+                    k += missed
+                    due += missed*self.interval
+                tick_start = loop.time()
+                self.jitter.add(max(0.0, tick_start - due))
+                stamp = time.time()
+                try:
+                    scan, error = await self.lj.read_scan(self.channel_map), None
+                except self.lj.session.ljm.LJMError as e:
+                    scan, error = None, e
+                    self.errors += 1
+                self.latency.add(loop.time() - tick_start)
+                self.scans += 1
+                self._publish(ScanItem(k, tick_start - start, stamp, scan, error))
+                k += 1
+                due += self.interval
+        finally:
+            for sub in list(self._subscribers):
+                sub._offer(_CLOSED)
+
+
+if __name__ == '__main__':
+    from channel_map import ChannelMap
+    from fake_ljm import FakeLJM
+
+    # Three consumers against a fake device with 20 ms reads: a fast logger,
+    # a display that is slower than the scan rate and one that never reads
+    async def consume(sub, delay):
+        async for item in sub:
+            await asyncio.sleep(delay)
+
+    async def demo():
+        channel_map = ChannelMap.load()
+        lj = AsyncLabJack(ljf.LabJackSession(backend=FakeLJM(read_latency=0.02)))
+        channel_map.configure(lj.session)
+        scans = ScanBroadcaster(lj, channel_map, interval=0.05)
+        subs = {"logger": scans.subscribe(), "display": scans.subscribe(maxsize=2),
+                "stalled": scans.subscribe(maxsize=5)}
+        tasks = [asyncio.create_task(consume(subs["logger"], 0)),
+                 asyncio.create_task(consume(subs["display"], 0.2))]
+        scans.start()
+        await asyncio.sleep(2.0)
+        await scans.stop()
+        await asyncio.gather(*tasks)
+        lj.close()
+        print("{} scans, {} missed, latency {}".format(scans.scans, scans.missed,
+                                                       scans.latency.summary()))
+        for name, sub in subs.items():
+            print("{:8s} received {:3d}  dropped {:3d}".format(name, sub.received, sub.dropped))
+
+    asyncio.run(demo())
@@ -0,0 +1,118 @@
+"""
+Description:
+Batch heat gain reprocessing of many test files at once. Every input (station
+logs like 10-18-26a.csv from main.py and xlsx exports like test.xlsx) is
+handed to a worker process, which runs the systemCalcs chain on it through
+HG_interval_calc.reprocess and writes <name>_hg.csv to the output directory.
+A combined summary table (one row per input file, incl. the test's heat gain
+energy in Btu, see energy.py) is written as summary.csv.
+
+Files are independent, so throughput scales with the number of workers up to
+the number of cores (and disk bandwidth for the first, uncached read).
+
+Usage:
+    python batch_reprocess.py ../Data [more dirs or globs] [-o out_dir] [-j workers]
+
+Dependencies:
+    - pandas
+    - concurrent.futures (standard library)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import HG_interval_calc as hg
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+INPUT_PATTERNS = ("*.csv", "*.xlsx")
+SUMMARY_HEADERS = ["file", "rows", "valid_rows", "Q_Scfm", "q_sensible", "q_latent",
+                   "q_total", "Sensible Btu", "Latent Btu", "Total Btu", "sec", "error"]
+
+
+def find_inputs(sources):
+    # Expand directories and glob patterns to a sorted list of input files
+    files = []
+    for src in sources:
+        if os.path.isdir(src):
+            for pattern in INPUT_PATTERNS:
+                files += glob.glob(os.path.join(src, pattern))
+        else:
+            files += glob.glob(src)
+    return sorted(set(os.path.abspath(f) for f in files))
+
+def output_path(path, out_dir):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(out_dir, stem + "_hg.csv")
+
+def process_file(path, out_dir, cache=True):
+    # Worker: reprocess one file, return its summary row (errors are reported,
+    # not raised, so one bad file does not stop the batch)
+    tic = time.perf_counter()
+    row = dict.fromkeys(SUMMARY_HEADERS)
+    row["file"] = os.path.basename(path)
+    try:
+        columns, duct_diameter, skiprows, skip_footer = hg.preset_for(path)
+        results, rate = hg.reprocess(path, output_path(path, out_dir), columns,
+                                     duct_diameter, skiprows, skip_footer, cache, energy=True)
+    except Exception as e:
+        row["error"] = "{}: {}".format(type(e).__name__, e)
+    else:
+        valid = results.dropna()
+        row["rows"] = len(results)
+        row["valid_rows"] = len(valid)
+        for col in ("Q_Scfm", "q_sensible", "q_latent", "q_total"):
+            row[col] = valid[col].mean()
+        if len(results):
+            for col in hg.energy.ENERGY_HEADERS:
+                row[col] = results[col].iloc[-1]
+    row["sec"] = round(time.perf_counter() - tic, 3)
+    return row
+
+def run_batch(files, out_dir, workers=None, cache=True):
+    os.makedirs(out_dir, exist_ok=True)
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_file, f, out_dir, cache): f for f in files}
+        for future in as_completed(futures):
+            row = future.result()
+            status = row["error"] or "{} rows".format(row["rows"])
+            print("  {:30s} {:8.2f} sec  {}".format(row["file"], row["sec"], status))
+            rows.append(row)
+    summary = pd.DataFrame(rows, columns=SUMMARY_HEADERS).sort_values("file")
+    summary.to_csv(os.path.join(out_dir, "summary.csv"), index=False)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reprocess many test files in parallel")
+    parser.add_argument("sources", nargs="+", help="directories and/or glob patterns")
+    parser.add_argument("-o", "--out-dir", default=None, help="default: <first source dir>/reprocessed")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="default: number of CPUs")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    files = find_inputs(args.sources)
+    if not files:
+        raise SystemExit("No input files found in {}".format(args.sources))
+    out_dir = args.out_dir
+    if out_dir is None:
+        first = args.sources[0] if os.path.isdir(args.sources[0]) else os.path.dirname(files[0])
+        out_dir = os.path.join(first, "reprocessed")
+    # Outputs of an earlier batch are not inputs
+    files = [f for f in files if os.path.dirname(f) != os.path.abspath(out_dir)]
+
+    tic = time.perf_counter()
+    summary = run_batch(files, out_dir, args.workers, not args.no_cache)
+    total = time.perf_counter() - tic
+    n_rows = summary["rows"].fillna(0).sum()
+    print("{} files, {:.0f} rows in {:.2f} sec ({:.0f} rows/sec) -> {}".format(
+        len(files), n_rows, total, n_rows/max(total, 1e-9), out_dir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Description:
+Calculation throughput benchmark: the per-scan scalar path used by the live
+loop (station.compute_record, one scan at a time) versus the vectorized
+systemCalcs.heat_gain_chain over whole arrays (offline reprocessing), both on
+the same synthetic inputs.
+
+Usage:
+    python benchmarks/calcs.py [rows]
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import os
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import station
+import systemCalcs as calc
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+def inputs(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {"Pbar_inHg": rng.uniform(29.0, 30.2, n), "pdiff": rng.uniform(0.05, 0.4, n),
+            "Tdb": rng.uniform(75, 110, n), "Tdew": rng.uniform(40, 60, n),
+            "Tdb_room": rng.uniform(68, 76, n)}
+
+def timed(func, repeat=3):
+    best = float('inf')
+    for i in range(repeat):
+        tic = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - tic)
+    return best
+
+def run(rows=100000, scalar_rows=5000):
+    x = inputs(rows)
+    scans = [station.scan_from_values(T_room=x["Tdb_room"][i], T_exh=x["Tdb"][i], T_lab=70.0,
+                                      Tdew_exh=x["Tdew"][i], Pbar_inHg=x["Pbar_inHg"][i],
+                                      pdiff_exh=x["pdiff"][i])
+             for i in range(scalar_rows)]
+
+    def scalar():
+        for scan in scans:
+            station.compute_record(scan, "", 0.0)
+
+    def scalar_chain():
+        for i in range(scalar_rows):
+            calc.heat_gain_chain(x["Pbar_inHg"][i], x["pdiff"][i], x["Tdb"][i], x["Tdew"][i],
+                                 x["Tdb_room"][i], station.DUCT_ID, Tdew_room=station.TDEW_ROOM)
+
+    def vectorized(fast_Pp=False):
+        calc.heat_gain_chain(D=station.DUCT_ID, Tdew_room=station.TDEW_ROOM,
+                             fast_Pp=fast_Pp, **x)
+
+    results = []
+    for label, func, n in (("compute_record per scan", scalar, scalar_rows),
+                           ("heat_gain_chain per scan", scalar_chain, scalar_rows),
+                           ("heat_gain_chain vectorized", vectorized, rows),
+                           ("heat_gain_chain vectorized Pp_fast",
+                            lambda: vectorized(True), rows)):
+        sec = timed(func)
+        results.append({"case": label, "rows": n, "rows_per_sec": n/sec,
+                        "us_per_row": sec/n*1e6})
+    return results
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for r in run(rows):
+        print("{case:36s} {rows_per_sec:14,.0f} rows/sec  {us_per_row:9.3f} us/row".format(**r))
@@ -0,0 +1,90 @@
+"""
+Description:
+Log writing benchmark: the old per-row open/append/close write_data, a plain
+csv.writer on a file kept open, log_writer.LogWriter and the binary log
+(binlog.BinaryLogWriter). Reports time per row and write syscalls per row
+(from /proc/self/io on Linux) for the 25-column station record. The per-row
+case also makes an open() and a close() syscall for every row.
+
+Usage:
+    python benchmarks/log_io.py [rows]
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import csv
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from binlog import BinaryLogWriter
+from log_writer import LogWriter
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+ROW = ["12:00:00", 1.25, 72.1, 75.3, 86.2, 51.8, 55.41, 29.45, 0.05, 0.3785,
+       0.8849, 0.4381, 1.2498, 0.00803, 0.00931, 0.0729, 0.0712, 42.77, 35.05,
+       1034.2, 349.41, 336.9, 3966.8, 2087.3, 6054.1]
+
+
+def syscw():
+    # Write syscalls made by this process so far (None if unavailable)
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('syscw:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+def per_row_open(file_name, rows):
+    # main.write_data before LogWriter: open, write one row, close
+    for i in range(rows):
+        with open(file_name, 'a', newline='') as f:
+            csv.writer(f, delimiter=',').writerow(ROW)
+
+def csv_open_file(file_name, rows):
+    # csv.writer on a file opened once (buffered by Python, no fsync)
+    with open(file_name, 'a', newline='') as f:
+        writer = csv.writer(f, delimiter=',')
+        for i in range(rows):
+            writer.writerow(ROW)
+
+def binary_log(file_name, rows, **kwargs):
+    columns = ["time"] + ["c{}".format(i) for i in range(1, len(ROW))]
+    row = [0.0] + ROW[1:]
+    with BinaryLogWriter(file_name, columns, **kwargs) as log:
+        for i in range(rows):
+            log.append(row)
+
+def log_writer(file_name, rows, **kwargs):
+    with LogWriter(file_name, **kwargs) as log:
+        for i in range(rows):
+            log.writerow(ROW)
+
+def measure(label, func, rows, *args, **kwargs):
+    with tempfile.TemporaryDirectory() as folder:
+        file_name = os.path.join(folder, "log.csv")
+        w0 = syscw()
+        tic = time.perf_counter()
+        func(file_name, rows, *args, **kwargs)
+        sec = time.perf_counter() - tic
+        w1 = syscw()
+    writes = (w1 - w0)/rows if w0 is not None else float('nan')
+    return {"case": label, "rows": rows, "us_per_row": sec/rows*1e6,
+            "write_syscalls_per_row": writes}
+
+def run(rows=2000):
+    return [measure("per-row open/append", per_row_open, rows),
+            measure("csv.writer open file", csv_open_file, rows),
+            measure("LogWriter 12 rows + fsync", log_writer, rows),
+            measure("LogWriter 120 rows + fsync", log_writer, rows, flush_rows=120),
+            measure("LogWriter 120 rows no fsync", log_writer, rows, flush_rows=120, fsync=False),
+            measure("binlog 60 rows + fsync", binary_log, rows),
+            measure("binlog 600 rows no fsync", binary_log, rows, flush_rows=600, fsync=False)]
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for r in run(rows):
+        print("{case:30s} {us_per_row:9.1f} us/row  {write_syscalls_per_row:6.3f} write syscalls/row".format(**r))
@@ -0,0 +1,56 @@
+"""
+Description:
+Overhead of the metrics instrumentation per timed call / block, with timing
+disabled (the default - what every scan pays) and enabled.
+
+Usage:
+    python benchmarks/metrics_overhead.py [calls]
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import os
+import sys
+import timeit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+def plain(a, b):
+    return a + b
+
+@metrics.timed("bench.add")
+def timed_add(a, b):
+    return a + b
+
+def block():
+    with metrics.timer("bench.block"):
+        pass
+
+def laps():
+    lap = metrics.laps()
+    lap("bench.lap")
+
+def best(func, n):
+    return min(timeit.repeat(func, number=n, repeat=3))/n
+
+def run(calls=200000):
+    was_enabled = metrics.enabled()
+    results = []
+    base = best(lambda: plain(1, 2), calls)
+    for state in ("disabled", "enabled"):
+        metrics.enable() if state == "enabled" else metrics.disable()
+        results.append({"case": "timed() decorator " + state,
+                        "ns_per_call": (best(lambda: timed_add(1, 2), calls) - base)*1e9})
+        results.append({"case": "timer() block " + state, "ns_per_call": best(block, calls)*1e9})
+        results.append({"case": "laps() + 1 lap " + state, "ns_per_call": best(laps, calls)*1e9})
+    metrics.enable() if was_enabled else metrics.disable()
+    metrics.reset()
+    return results
+
+
+if __name__ == '__main__':
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for r in run(calls):
+        print("{case:30s} {ns_per_call:8.0f} ns".format(**r))
@@ -0,0 +1,42 @@
+"""
+Description:
+Saturation pressure benchmark: exact ASHRAE correlation (systemCalcs.Pp)
+versus the lookup table (systemCalcs.Pp_fast), for whole arrays
+(stream / offline rates) and for single scalar calls (live loop), plus the
+table's maximum relative error.
+
+Usage:
+    python benchmarks/pp_lut.py [array size]
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import os
+import sys
+import timeit
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import systemCalcs as calc
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+def best(func, number, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat))/number
+
+def run(n=1000000):
+    T = np.random.default_rng(0).uniform(30, 110, n)
+    calc.Pp_fast(50.0) # build the table outside the timing
+    results = []
+    for label, func in (("exact", calc.Pp), ("table", calc.Pp_fast)):
+        results.append({"case": "Pp {} array".format(label), "n": n,
+                        "ns_per_value": best(lambda: func(T), 1)/n*1e9})
+        results.append({"case": "Pp {} scalar".format(label), "n": 1,
+                        "ns_per_value": best(lambda: func(55.3), 10000)*1e9})
+    return results
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for r in run(n):
+        print("{case:22s} {ns_per_value:10.1f} ns/value".format(**r))
+    print("Table max. relative error: {:.2e}".format(calc.pp_table().max_rel_error))
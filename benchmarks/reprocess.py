@@ -0,0 +1,47 @@
+"""
+Description:
+Reprocessing benchmark on a recorded log (default test.xlsx): rows/sec of
+HG_interval_calc.reprocess end to end with a cold parse (no ingest cache),
+end to end from the ingest cache, and of the calculation + csv write alone.
+
+Usage:
+    python benchmarks/reprocess.py [log]
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import os
+import shutil
+import sys
+import tempfile
+import time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import HG_interval_calc as hgi
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+def run(path=os.path.join(ROOT, "test.xlsx")):
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        # Work on a copy so the cache lives in the temporary folder
+        source = os.path.join(folder, os.path.basename(path))
+        shutil.copy(path, source)
+        columns, diameter, skiprows, skip_footer = hgi.preset_for(source)
+        output = os.path.join(folder, "output.csv")
+        for label, cache in (("cold parse", False), ("build cache", True), ("from cache", True)):
+            tic = time.perf_counter()
+            df, calc_rate = hgi.reprocess(source, output, columns, diameter, skiprows,
+                                          skip_footer, cache)
+            sec = time.perf_counter() - tic
+            results.append({"case": "reprocess " + label, "rows": len(df),
+                            "rows_per_sec": len(df)/sec, "ms_total": sec*1000})
+        results.append({"case": "calc + write only", "rows": len(df), "rows_per_sec": calc_rate,
+                        "ms_total": len(df)/calc_rate*1000})
+    return results
+
+
+if __name__ == '__main__':
+    results = run(*sys.argv[1:2])
+    for r in results:
+        print("{case:24s} {rows} rows {rows_per_sec:12,.0f} rows/sec {ms_total:9.1f} ms".format(**r))
@@ -0,0 +1,144 @@
+"""
+Description:
+Runs the benchmark suite and saves the results as JSON, one file per commit
+(benchmarks/results/<commit>.json, "-dirty" if the tree has local changes),
+together with the Python / NumPy versions and the machine they ran on.
+--compare loads an earlier results file and lists every metric that got
+worse by more than the threshold (exit code 1 if any did).
+
+Metrics are compared by name: "*_per_sec" is higher-is-better, metrics in
+us / ns / ms or syscalls are lower-is-better.
+
+Usage:
+    python benchmarks/run.py                     # full suite
+    python benchmarks/run.py --quick calcs log_io
+    python benchmarks/run.py --compare benchmarks/results/be9d538.json
+
+Dependencies:
+    - the benchmarks in this folder (numpy, pandas for reprocess)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+RESULTS_DIR = os.path.join(HERE, "results")
+# benchmark module -> (full run kwargs, --quick kwargs)
+SUITE = {
+    "calcs": ({"rows": 1000000, "scalar_rows": 20000}, {"rows": 100000, "scalar_rows": 2000}),
+    "pp_lut": ({"n": 1000000}, {"n": 100000}),
+    "reprocess": ({}, {}),
+    "scan_latency": ({"scans": 10000}, {"scans": 1000}),
+    "log_io": ({"rows": 10000}, {"rows": 1000}),
+    "metrics_overhead": ({"calls": 200000}, {"calls": 20000}),
+    "uncertainty_prop": ({"rows": 10000, "draws": 1000}, {"rows": 1000, "draws": 500}),
+    "startup": ({"runs": 10}, {"runs": 3}),
+}
+
+
+def git_commit():
+    # (short commit id, tree has local changes)
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                         stderr=subprocess.DEVNULL, text=True).strip()
+        status = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                         cwd=HERE, stderr=subprocess.DEVNULL, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, bool(status.strip())
+
+def run_suite(names=None, quick=False):
+    results = {}
+    for name in names or SUITE:
+        full, small = SUITE[name]
+        tic = time.perf_counter()
+        results[name] = importlib.import_module(name).run(**(small if quick else full))
+        print("{:14s} done in {:.1f} s".format(name, time.perf_counter() - tic))
+    commit, dirty = git_commit()
+    return {"commit": commit, "dirty": dirty, "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "quick": quick, "python": platform.python_version(), "numpy": np.__version__,
+            "machine": "{} {} ({} cpu)".format(platform.system(), platform.machine(), os.cpu_count()),
+            "results": results}
+
+def direction(metric):
+    # +1 higher is better, -1 lower is better, 0 not compared
+    if metric.endswith("_per_sec"):
+        return 1
+    if set(metric.split("_")) & {"us", "ns", "ms", "syscalls"}:
+        return -1
+    return 0
+
+def compare(base, new, threshold=0.10):
+    # Returns lines for the report and the number of regressions
+    lines, regressions = [], 0
+    for name, cases in new["results"].items():
+        old = {r["case"]: r for r in base["results"].get(name, [])}
+        for r in cases:
+            o = old.get(r["case"])
+            if o is None:
+                continue
+            for metric, value in r.items():
+                sign = direction(metric)
+                if not sign or not isinstance(value, (int, float)) or not o.get(metric):
+                    continue
+                change = (value - o[metric])/abs(o[metric])
+                worse = -sign*change > threshold
+                regressions += worse
+                lines.append("{:12s} {:36s} {:14s} {:12.4g} -> {:12.4g} {:+7.1%}{}".format(
+                    name, r["case"], metric, o[metric], value, change,
+                    "  REGRESSION" if worse else ""))
+    return lines, regressions
+
+def print_results(report):
+    for name, cases in report["results"].items():
+        print("\n[{}]".format(name))
+        for r in cases:
+            print("  {:36s} ".format(r["case"]) + "  ".join(
+                "{}={:.4g}".format(k, v) for k, v in r.items()
+                if k != "case" and isinstance(v, (int, float))))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("benchmarks", nargs="*", metavar="benchmark",
+                        help="subset to run: " + ", ".join(SUITE))
+    parser.add_argument("--quick", action="store_true", help="smaller problem sizes")
+    parser.add_argument("-o", "--output", help="results file (default results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative change counted as a regression (default 0.10)")
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in SUITE:
+            parser.error("unknown benchmark \"{}\"".format(name))
+
+    report = run_suite(args.benchmarks, args.quick)
+    print_results(report)
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, "{}{}{}.json".format(
+            report["commit"], "-dirty" if report["dirty"] else "", "-quick" if args.quick else ""))
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1)
+    print("\nResults saved to {}".format(output))
+
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        lines, regressions = compare(base, report, args.threshold)
+        print("\nCompared with {} ({}):".format(base["commit"], args.compare))
+        print("\n".join(lines))
+        print("{} regression(s) over {:.0%}".format(regressions, args.threshold))
+        sys.exit(1 if regressions else 0)
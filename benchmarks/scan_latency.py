@@ -0,0 +1,72 @@
+"""
+Description:
+Per-scan latency of the main.py loop against a simulated device (sim_ljm,
+no USB latency, virtual clock), so it measures the station's own software
+overhead: acquisition (eReadNames + channel conversions), computation
+(station.compute_record, steady-state update, binary log row) and logging
+(LogWriter + BinaryLogWriter with main.py's flush settings). Reports mean,
+p50 and p99 per stage.
+
+Usage:
+    python benchmarks/scan_latency.py [scans]
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import labjack_functions as ljf
+import sim_ljm
+import station
+from binlog import BinaryLogWriter
+from channel_map import ChannelMap
+from log_writer import LogWriter
+from rolling_stats import SteadyState
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+INTERVAL = 5.0 # simulated scan interval [s]
+
+
+def run(scans=2000):
+    channel_map = ChannelMap.load()
+    clock = sim_ljm.SimClock(speed=None)
+    session = ljf.LabJackSession(backend=sim_ljm.SimLJM(channel_map, clock=clock, seed=0))
+    channel_map.configure(session)
+    steady = SteadyState(30, min_interval=INTERVAL, columns=station.HEADERS[2:])
+    stages = {name: np.zeros(scans) for name in ("acquire", "compute", "log", "total")}
+    with tempfile.TemporaryDirectory() as folder:
+        log = LogWriter(os.path.join(folder, "log.csv"), flush_rows=12, flush_seconds=30,
+                        clock=clock.monotonic)
+        binlog = BinaryLogWriter(os.path.join(folder, "log.aslog"),
+                                 station.binary_columns([c.name for c in channel_map]))
+        for k in range(scans):
+            t0 = time.perf_counter()
+            scan = channel_map.read_scan(session)
+            t1 = time.perf_counter()
+            elapsed = clock.monotonic()
+            data = station.compute_record(scan, "12:00:00", round(elapsed/60, 2))
+            steady.add(elapsed, data[2:len(station.HEADERS)])
+            row = station.binary_row(clock.time(), elapsed, scan, data)
+            t2 = time.perf_counter()
+            log.writerow(data)
+            binlog.append(row)
+            t3 = time.perf_counter()
+            for name, sec in (("acquire", t1 - t0), ("compute", t2 - t1),
+                              ("log", t3 - t2), ("total", t3 - t0)):
+                stages[name][k] = sec
+            clock.sleep(INTERVAL)
+        log.close()
+        binlog.close()
+    return [{"case": "scan " + name, "scans": scans, "us_mean": s.mean()*1e6,
+             "us_p50": np.percentile(s, 50)*1e6, "us_p99": np.percentile(s, 99)*1e6}
+            for name, s in stages.items()]
+
+
+if __name__ == '__main__':
+    scans = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for r in run(scans):
+        print("{case:14s} mean {us_mean:9.1f} us  p50 {us_p50:9.1f} us  p99 {us_p99:9.1f} us".format(**r))
@@ -0,0 +1,56 @@
+"""
+Description:
+Start-up time of the command line tools: a fresh interpreter per run, best
+and median wall time over `runs` runs. Covers the bare interpreter, the CLI
+help, the quick commands (calc, probe against the simulated device) and the
+imports of the heavy entry modules for comparison. calc runs in a temporary
+folder so output.csv does not land in the repo.
+
+Usage:
+    python benchmarks/startup.py [runs]
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "airflow_station.py")
+CASES = [
+    ("python -c pass", ["-c", "pass"]),
+    ("airflow_station --help", [CLI, "--help"]),
+    ("airflow_station calc", [CLI, "calc", os.path.join(ROOT, "input_parameters.csv")]),
+    ("airflow_station probe (simulated)", [CLI, "probe", "--simulate", "synthetic"]),
+    ("import main", ["-c", "import main"]),
+    ("import HG_interval_calc", ["-c", "import HG_interval_calc"]),
+]
+
+
+def timed_run(args, cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    tic = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=cwd, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - tic
+
+def run(runs=10):
+    results = []
+    with tempfile.TemporaryDirectory() as cwd:
+        for label, args in CASES:
+            timed_run(args, cwd) # warm the file system cache / .pyc files
+            times = [timed_run(args, cwd) for i in range(runs)]
+            results.append({"case": label, "runs": runs, "best_ms": min(times)*1000,
+                            "median_ms": statistics.median(times)*1000})
+    return results
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for r in run(runs):
+        print("{case:36s} best {best_ms:7.1f} ms   median {median_ms:7.1f} ms".format(**r))
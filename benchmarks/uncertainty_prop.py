@@ -0,0 +1,48 @@
+"""
+Description:
+Uncertainty propagation cost (uncertainty.py): one scan at a time as in the
+live loop (first order, Monte Carlo) and whole logs as in offline
+reprocessing, on the same synthetic inputs as calcs.py.
+
+Usage:
+    python benchmarks/uncertainty_prop.py [rows] [draws]
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import station
+import uncertainty
+from calcs import inputs, timed
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+def run(rows=10000, draws=1000, scans=200):
+    specs = uncertainty.SensorSpecs.load()
+    x = dict(inputs(rows), D=station.DUCT_ID, Tdew_room=station.TDEW_ROOM)
+    one = [{k: v[i] if hasattr(v, "__len__") else v for k, v in x.items()} for i in range(scans)]
+
+    def per_scan(method, n_draws):
+        for scan in one:
+            uncertainty.propagate(scan, method, specs, n_draws)
+
+    results = []
+    for label, func, n in (("linear per scan", lambda: per_scan("linear", 0), scans),
+                           ("monte_carlo per scan {} draws".format(draws),
+                            lambda: per_scan("mc", draws), scans),
+                           ("linear whole log", lambda: uncertainty.linear(x, specs), rows),
+                           ("monte_carlo whole log {} draws".format(draws),
+                            lambda: uncertainty.monte_carlo(x, specs, draws), rows)):
+        sec = timed(func, repeat=2)
+        results.append({"case": label, "rows": n, "rows_per_sec": n/sec,
+                        "us_per_row": sec/n*1e6})
+    return results
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    draws = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    for r in run(rows, draws):
+        print("{case:36s} {rows_per_sec:12,.0f} rows/sec  {us_per_row:10.1f} us/row".format(**r))
@@ -0,0 +1,209 @@
+"""
+Description:
+Chunked, columnar binary log format for the station (".aslog"), written
+alongside the csv log. Each scan's raw channel values and derived columns are
+stored as typed NumPy arrays; rows are buffered and appended as row groups
+("chunks"), each with its own small JSON header:
+
+    file  := MAGIC chunk*
+    chunk := b"CHNK" uint32(header length) header(JSON) column data...
+
+    header = {"rows": n, "columns": [[name, dtype], ...]}
+    column data = n values of each column, one column after the other
+
+A chunk is written with a single write() and only counts once it is
+complete, so the file can be read while the test is still running (a reader
+simply stops at a partially written last chunk) and a crash never leaves
+more than the unfinished chunk behind - it is truncated on the next open.
+
+The reader returns NumPy arrays for any subset of columns, seeking over the
+columns that are not asked for instead of parsing text.
+
+Dependencies:
+    - numpy
+    - json, struct (standard library)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import json
+import os
+import struct
+import threading
+import time
+import numpy as np
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+MAGIC = b"ASBLOG1\n"
+CHUNK = b"CHNK"
+_HEAD = struct.Struct("<4sI")
+
+
+def _scan_chunks(f, offset, file_size):
+    # Yield (chunk offset, header, data offset, chunk end) for complete chunks
+    while offset + _HEAD.size <= file_size:
+        f.seek(offset)
+        tag, n = _HEAD.unpack(f.read(_HEAD.size))
+        if tag != CHUNK or offset + _HEAD.size + n > file_size:
+            return
+        try:
+            header = json.loads(f.read(n))
+        except ValueError:
+            return
+        data_offset = offset + _HEAD.size + n
+        end = data_offset + sum(header["rows"]*np.dtype(dt).itemsize
+                                for name, dt in header["columns"])
+        if end > file_size:
+            return
+        yield offset, header, data_offset, end
+        offset = end
+
+
+class BinaryLogWriter:
+
+    def __init__(self, file_name, columns, flush_rows=60, flush_seconds=60.0,
+                 fsync=True, clock=time.monotonic):
+        # columns: list of names (float64) or (name, dtype) pairs
+        self.columns = [(c, "<f8") if isinstance(c, str) else (c[0], np.dtype(c[1]).str)
+                        for c in columns]
+        self.file_name = file_name
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.fsync = fsync
+        self.clock = clock
+        self._fd = self._open(file_name)
+        self._buf = np.zeros(flush_rows, dtype=[(n, dt) for n, dt in self.columns])
+        # Value stored for a column missing from a dict row
+        self._missing = {n: np.nan if np.dtype(dt).kind == "f" else 0 for n, dt in self.columns}
+        self._n = 0
+        self._last_flush = clock()
+        self._lock = threading.Lock()
+        self.chunks = 0
+
+    @staticmethod
+    def _open(file_name):
+        # Create the file, or truncate a partially written trailing chunk
+        if os.path.exists(file_name) and os.path.getsize(file_name) >= len(MAGIC):
+            with open(file_name, 'rb+') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError("{} is not a binary station log".format(file_name))
+                end = len(MAGIC)
+                for offset, header, data_offset, end in _scan_chunks(f, end, os.path.getsize(file_name)):
+                    pass
+                f.truncate(end)
+        else:
+            with open(file_name, 'wb') as f:
+                f.write(MAGIC)
+        return os.open(file_name, os.O_WRONLY | os.O_APPEND)
+
+    def append(self, row):
+        # row: sequence in column order or dict name -> value (missing: NaN / 0)
+        with self._lock:
+            rec = self._buf[self._n]
+            if isinstance(row, dict):
+                for name, dt in self.columns:
+                    rec[name] = row.get(name, self._missing[name])
+            else:
+                for (name, dt), value in zip(self.columns, row):
+                    rec[name] = value
+            self._n += 1
+            if self._n >= self.flush_rows or self.clock() - self._last_flush >= self.flush_seconds:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = self.clock()
+        if not self._n:
+            return
+        header = json.dumps({"rows": self._n, "columns": self.columns}).encode()
+        parts = [_HEAD.pack(CHUNK, len(header)), header]
+        parts += [np.ascontiguousarray(self._buf[name][:self._n]).tobytes()
+                  for name, dt in self.columns]
+        data = memoryview(b"".join(parts))
+        while data:
+            data = data[os.write(self._fd, data):]
+        if self.fsync:
+            os.fsync(self._fd)
+        self._n = 0
+        self.chunks += 1
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                self._flush()
+                os.close(self._fd)
+                self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BinaryLogReader:
+    # Incremental reader: refresh() picks up chunks appended since the last
+    # call, so a live log can be followed without re-reading it.
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.chunks = [] # (header, data offset)
+        self._offset = len(MAGIC)
+        with open(file_name, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("{} is not a binary station log".format(file_name))
+        self.refresh()
+
+    def refresh(self):
+        # Returns the number of new chunks
+        size = os.path.getsize(self.file_name)
+        new = 0
+        with open(self.file_name, 'rb') as f:
+            for offset, header, data_offset, end in _scan_chunks(f, self._offset, size):
+                self.chunks.append((header, data_offset))
+                self._offset = end
+                new += 1
+        return new
+
+    @property
+    def columns(self):
+        return [name for name, dt in self.chunks[0][0]["columns"]] if self.chunks else []
+
+    @property
+    def rows(self):
+        return sum(header["rows"] for header, data_offset in self.chunks)
+
+    def read(self, columns=None, start_chunk=0):
+        # dict name -> ndarray for the requested columns (default: all)
+        if columns is None:
+            columns = self.columns
+        parts = {name: [] for name in columns}
+        with open(self.file_name, 'rb') as f:
+            for header, data_offset in self.chunks[start_chunk:]:
+                n = header["rows"]
+                pos = data_offset
+                for name, dt in header["columns"]:
+                    size = n*np.dtype(dt).itemsize
+                    if name in parts:
+                        f.seek(pos)
+                        parts[name].append(np.frombuffer(f.read(size), dtype=dt))
+                    pos += size
+        return {name: np.concatenate(arrays) if arrays else np.empty(0)
+                for name, arrays in parts.items()}
+
+
+def read_columns(file_name, columns=None):
+    return BinaryLogReader(file_name).read(columns)
+
+
+if __name__ == '__main__':
+    import sys
+
+    reader = BinaryLogReader(sys.argv[1])
+    print("{} rows in {} chunks".format(reader.rows, len(reader.chunks)))
+    data = reader.read(sys.argv[2:] or None)
+    for name, values in data.items():
+        print("{:20s} {}".format(name, values[-5:]))
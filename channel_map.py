@@ -0,0 +1,188 @@
+"""
+Description:
+Declarative channel map for the station sensors. Each entry lists a sensor's
+name, kind (tc, voltage, current), positive/negative channel, range, TC type
+and offset. The map writes every AIN configuration register once (on each
+device (re)connect) and reads a whole scan with a single eReadNames call,
+instead of re-writing the configuration before every single reading.
+
+The map can be built from a dict/list, a CSV file or (if PyYAML is installed)
+a YAML file - see channel_map.csv for the station defaults.
+
+Dependencies:
+    - metrics
+    - csv, weakref (standard library)
+    - yaml (optional, only for .yaml/.yml maps)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import csv
+import os
+import weakref
+import metrics
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# tc_type: 21-J, 22-K, 23-R, 24-T
+TC_TYPES = {"J": 21, "K": 22, "R": 23, "T": 24}
+KINDS = ("tc", "voltage", "current")
+# LJTick-CurrentShunt: volts to mA [I = V / (20 * 5.9ohms)]
+SHUNT_MA_PER_V = 8.4746
+
+DEFAULT_MAP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "channel_map.csv")
+
+
+class Channel:
+
+    def __init__(self, name, kind, channel, negative_ch=199, v_range=None,
+                 tc_type=22, offset=0.0, resolution=0, settling_us=0):
+        if kind not in KINDS:
+            raise ValueError("Unknown channel kind \"{}\" for {}".format(kind, name))
+        self.name = name
+        self.kind = kind
+        self.channel = int(channel)
+        self.negative_ch = int(negative_ch)
+        self.v_range = None if v_range is None else float(v_range)
+        if isinstance(tc_type, str):
+            tc_type = TC_TYPES[tc_type.upper()] if tc_type.upper() in TC_TYPES else int(tc_type)
+        self.tc_type = int(tc_type)
+        self.offset = float(offset)
+        self.resolution = int(resolution)
+        self.settling_us = float(settling_us)
+
+    @property
+    def read_name(self):
+        if self.kind == "tc":
+            return "AIN{}_EF_READ_A".format(self.channel)
+        return "AIN{}".format(self.channel)
+
+    def config_frames(self):
+        # Register names and values to push to the device for this channel
+        ch = self.channel
+        names = ["AIN{}_NEGATIVE_CH".format(ch), "AIN{}_RESOLUTION_INDEX".format(ch),
+                 "AIN{}_SETTLING_US".format(ch)]
+        values = [self.negative_ch, self.resolution, self.settling_us]
+        if self.v_range is not None:
+            names.append("AIN{}_RANGE".format(ch))
+            values.append(self.v_range)
+        if self.kind == "tc":
+            # EF index = TC type, config A = 2 -> output in degF
+            names += ["AIN{}_EF_INDEX".format(ch), "AIN{}_EF_CONFIG_A".format(ch)]
+            values += [self.tc_type, 2]
+        else:
+            # Plain analog read - make sure no extended feature is left enabled
+            names.append("AIN{}_EF_INDEX".format(ch))
+            values.append(0)
+        return names, values
+
+    def convert(self, raw):
+        # tc -> degF, voltage -> V, current -> mA (offset added in those units)
+        if self.kind == "tc":
+            return round(raw + self.offset, 2)
+        if self.kind == "current":
+            return raw * SHUNT_MA_PER_V + self.offset
+        return raw + self.offset
+
+    def to_raw(self, value):
+        # Inverse of convert(): engineering value -> register value (simulation)
+        if self.kind == "current":
+            return (value - self.offset) / SHUNT_MA_PER_V
+        return value - self.offset
+
+
+class ChannelMap:
+
+    def __init__(self, channels):
+        self.channels = list(channels)
+        names = [c.name for c in self.channels]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate sensor names in channel map")
+        self.read_names = [c.read_name for c in self.channels]
+        self._configured = weakref.WeakSet() # sessions with the connect hook
+
+    # ---- Construction -------------------------------------------------------
+    @classmethod
+    def from_dict(cls, spec):
+        # spec: {name: {kind, channel, ...}} or [{name, kind, channel, ...}, ...]
+        if isinstance(spec, dict):
+            spec = [dict(entry, name=name) for name, entry in spec.items()]
+        channels = []
+        for entry in spec:
+            entry = {k: v for k, v in entry.items() if v not in (None, "")}
+            if "range" in entry:
+                entry["v_range"] = entry.pop("range")
+            channels.append(Channel(**entry))
+        return cls(channels)
+
+    @classmethod
+    def load(cls, path=DEFAULT_MAP):
+        ext = os.path.splitext(path)[1].lower()
+        if ext in (".yaml", ".yml"):
+            import yaml
+            with open(path) as f:
+                return cls.from_dict(yaml.safe_load(f))
+        with open(path, newline='') as f:
+            rows = [{k.strip(): v.strip() for k, v in row.items()}
+                    for row in csv.DictReader(f)]
+        return cls.from_dict(rows)
+
+    def subset(self, kinds=None, names=None):
+        # New map holding only the selected channels (e.g. the TCs when the
+        # analog inputs are streamed). Configuration stays with the full map.
+        return ChannelMap(c for c in self.channels
+                          if (kinds is None or c.kind in kinds)
+                          and (names is None or c.name in names))
+
+    # ---- Device I/O ---------------------------------------------------------
+    def config_frames(self):
+        names, values = [], []
+        for c in self.channels:
+            n, v = c.config_frames()
+            names += n
+            values += v
+        return names, values
+
+    def write_config(self, session):
+        names, values = self.config_frames()
+        session.eWriteNames(names, values)
+
+    def configure(self, session):
+        # Push the configuration now (if open) and after every reconnect
+        if session not in self._configured:
+            self._configured.add(session)
+            session.add_connect_hook(self.write_config)
+
+    def read_raw(self, session):
+        # One eReadNames round trip for the whole scan
+        return session.eReadNames(self.read_names)
+
+    def read_scan(self, session):
+        raw = self.read_raw(session)
+        with metrics.timer("scan.convert"):
+            return {c.name: c.convert(r) for c, r in zip(self.channels, raw)}
+
+    def __getitem__(self, name):
+        for c in self.channels:
+            if c.name == name:
+                return c
+        raise KeyError(name)
+
+    def __iter__(self):
+        return iter(self.channels)
+
+    def __len__(self):
+        return len(self.channels)
+
+
+if __name__ == '__main__':
+    from fake_ljm import FakeLJM
+    import labjack_functions as ljf
+
+    cmap = ChannelMap.load()
+    fake = FakeLJM({"AIN6_EF_READ_A": 78.0, "AIN12": 2.0, "AIN10": 0.5})
+    session = ljf.LabJackSession(backend=fake)
+    cmap.configure(session)
+    for i in range(10):
+        scan = cmap.read_scan(session)
+    print(scan)
+    print("10 scans: {} config write(s), {} read call(s)".format(fake.write_calls, fake.read_calls))
@@ -0,0 +1,205 @@
+"""
+Description:
+Multi-device acquisition: several LabJack T7s (e.g. one per test hood) read
+concurrently and merged into one record stream.
+
+DeviceRegistry holds one LabJackSession + ChannelMap per device, keyed by a
+name and opened by serial number or IP address (instead of "ANY"). It can be
+built from a dict or a csv file (name,identifier,connection,channel_map).
+
+MultiDeviceAcquisition runs one reader thread per device. Its acquire(tick)
+fits pipeline.Pipeline: every tick of the common scheduler is dispatched to
+all devices at once, the scans are collected until the tick's deadline, and
+one merged record is returned with channels named "<device>/<channel>".
+Since the devices are read in parallel, a scan takes about as long as the
+slowest device instead of the sum of all of them. Each device counts once
+per tick: on time, late (missed the deadline) or busy (still reading).
+
+main.py --devices devices.csv uses it: the first device is the station (its
+channels feed the flow / heat gain calculations), the others are logged.
+
+Dependencies:
+    - labjack_functions, channel_map
+    - threading, queue (standard library)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import csv
+import os
+import queue
+import threading
+import time
+import labjack_functions as ljf
+from channel_map import ChannelMap
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+class Device:
+
+    def __init__(self, name, session, channel_map):
+        self.name = name
+        self.session = session
+        self.channel_map = channel_map
+        channel_map.configure(session)
+
+
+class DeviceRegistry:
+
+    def __init__(self):
+        self.devices = {}
+
+    def add(self, name, identifier, channel_map=None, connection_type="ANY",
+            backend=None):
+        # identifier: serial number or IP address of the T7
+        if name in self.devices:
+            raise ValueError("Device \"{}\" already registered".format(name))
+        if not isinstance(channel_map, ChannelMap):
+            channel_map = ChannelMap.load(channel_map) if channel_map else ChannelMap.load()
+        session = ljf.LabJackSession("T7", connection_type, str(identifier), backend=backend)
+        self.devices[name] = Device(name, session, channel_map)
+        return self.devices[name]
+
+    @classmethod
+    def from_dict(cls, spec, backends=None):
+        # spec: {name: {"identifier": ..., "connection": ..., "channel_map": ...}}
+        # backends: optional {name: ljm backend} (e.g. simulated devices)
+        registry = cls()
+        for name, entry in spec.items():
+            registry.add(name, entry["identifier"], entry.get("channel_map"),
+                         entry.get("connection", "ANY"), (backends or {}).get(name))
+        return registry
+
+    @classmethod
+    def load(cls, path, backends=None):
+        return cls.from_dict(cls.read_csv(path), backends)
+
+    @staticmethod
+    def read_csv(path):
+        # csv columns: name, identifier, connection, channel_map (relative paths
+        # are relative to the registry file) -> from_dict() spec
+        folder = os.path.dirname(os.path.abspath(path))
+        spec = {}
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                row = {k.strip(): (v or "").strip() for k, v in row.items()}
+                cmap = row.get("channel_map") or None
+                if cmap and not os.path.isabs(cmap):
+                    cmap = os.path.join(folder, cmap)
+                spec[row["name"]] = {"identifier": row["identifier"],
+                                     "connection": row.get("connection") or "ANY",
+                                     "channel_map": cmap}
+        return spec
+
+    def close(self):
+        for device in self.devices.values():
+            device.session.close()
+
+    def __iter__(self):
+        return iter(self.devices.values())
+
+    def __len__(self):
+        return len(self.devices)
+
+
+class MultiDeviceAcquisition:
+
+    def __init__(self, registry, clock=None):
+        # clock: the scheduler's clock if not real time (sim_ljm.SimClock:
+        # monotonic() and speed, None speed = virtual time)
+        self.registry = registry
+        self.clock = time.monotonic if clock is None else clock.monotonic
+        self.speed = 1.0 if clock is None else clock.speed
+        self.results = queue.Queue()
+        self.late = 0       # scans that missed their tick's deadline
+        self.busy = 0       # ticks skipped by a device still reading the last one
+        self._workers = {}
+        for device in registry:
+            q = queue.Queue(maxsize=1)
+            t = threading.Thread(target=self._worker, args=(device, q),
+                                 name="daq-" + device.name, daemon=True)
+            self._workers[device.name] = (q, t)
+            t.start()
+
+    def _worker(self, device, q):
+        while True:
+            tick = q.get()
+            if tick is None:
+                return
+            start = self.clock()
+            try:
+                scan = device.channel_map.read_scan(device.session)
+            except device.session.ljm.LJMError as e:
+                print("Device {} disconnected: {}".format(device.name, e))
+                scan = None
+            self.results.put((tick.k, device.name, scan, start - tick.start, self.clock()))
+
+    def acquire(self, tick, timeout=None):
+        # Read every device for this tick; returns the merged record:
+        #   {"k", "elapsed", "scan": {"dev/ch": value}, "devices": {dev: scan|None},
+        #    "skew": {dev: read start - tick start [s]}}
+        # The deadline is in scheduler time; the wait for it in real seconds
+        # (in virtual time reads take no real time, so the budget only bounds
+        # a device that hangs)
+        budget = tick.interval*0.9 if timeout is None else timeout
+        deadline = self.clock() + budget
+        wait_until = time.monotonic() + (budget/self.speed if self.speed else budget)
+        expected = set()
+        for name, (q, t) in self._workers.items():
+            try:
+                q.put_nowait(tick)
+                expected.add(name)
+            except queue.Full:
+                self.busy += 1
+        devices = dict.fromkeys(self._workers)
+        skew = {}
+        while expected:
+            try:
+                k, name, scan, lag, done = self.results.get(
+                    timeout=max(0.0, wait_until - time.monotonic()))
+            except queue.Empty:
+                break
+            if k != tick.k:
+                continue # Result of an earlier tick, already counted late
+            expected.discard(name)
+            if done > deadline:
+                self.late += 1 # Finished after the deadline in scheduler time
+                continue
+            devices[name] = scan
+            skew[name] = lag
+        self.late += len(expected)
+        merged = {}
+        for name, scan in devices.items():
+            if scan is not None:
+                for channel, value in scan.items():
+                    merged[name + "/" + channel] = value
+        return {"k": tick.k, "elapsed": tick.elapsed, "scan": merged,
+                "devices": devices, "skew": skew}
+
+    def close(self):
+        for q, t in self._workers.values():
+            q.put(None)
+        for q, t in self._workers.values():
+            t.join()
+        self.registry.close()
+
+
+if __name__ == '__main__':
+    from fake_ljm import FakeLJM
+    from scheduler import Scheduler
+
+    # Scaling check with simulated devices, each read taking 50 ms
+    for n in (1, 2, 4, 8):
+        backends = {"hood{}".format(i): FakeLJM({"AIN2_EF_READ_A": 80.0 + i}, read_latency=0.05)
+                    for i in range(n)}
+        registry = DeviceRegistry.from_dict({name: {"identifier": 470010000 + i}
+                                             for i, name in enumerate(backends)}, backends)
+        daq = MultiDeviceAcquisition(registry)
+        sched = Scheduler(0.1)
+        for i in range(10):
+            tick = sched.next_tick()
+            record = daq.acquire(tick)
+            sched.done(tick)
+        daq.close()
+        print("{} device(s): {} channels/scan, scan latency {}".format(
+            n, len(record["scan"]), sched.latency.summary()))
@@ -0,0 +1,295 @@
+"""
+Description:
+Heat gain energy totals [Btu]: the instantaneous Sensible / Latent / Total HG
+[Btu/h] integrated over the test with the trapezoidal rule on the real
+timestamps, so non-uniform steps (adaptive sampling, missed scans, xlsx
+exports with irregular E.sec) are weighted correctly:
+
+    EnergyIntegrator  - incremental, O(1) per record; runs in the main.py
+                        loop and checkpoints its state to a JSON sidecar
+                        (written to a temporary file and renamed into place)
+                        so a restarted test resumes its totals
+    integrate()       - the same rule on whole columns (NumPy), for
+                        HG_interval_calc / batch reprocessing
+    integrate_csv()   - main.py csv logs read incrementally: the checkpoint
+                        keeps the byte offset of the last complete row, so a
+                        growing log is never re-read from the start
+
+Steps longer than max_gap (a disconnect, the downtime of a restart) are not
+bridged; they are reported as gap time instead. A step that does not move
+forward in time ends the segment the same way. max_gap follows the scan
+interval: GAP_INTERVALS x the slowest interval (main.py: --interval, or the
+slow rate of --adaptive; offline: the 95th percentile step of the log), and
+never less than MAX_GAP.
+
+Usage:
+    python energy.py 10-18-26a.csv [--checkpoint state.json]   (main.py log)
+    python energy.py test.xlsx                                  (xlsx export)
+
+Dependencies:
+    - numpy
+    - csv, json, os, time (standard library)
+    - HG_interval_calc (only for xlsx exports)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import argparse
+import csv
+import io
+import json
+import os
+import time
+import numpy as np
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+ENERGY_COLUMNS = ["Sensible HG", "Latent HG", "Total HG"]   # Btu/h
+ENERGY_HEADERS = ["Sensible Btu", "Latent Btu", "Total Btu"] # running totals
+MAX_GAP = 60.0          # longest step [s] always integrated across
+GAP_INTERVALS = 3.0     # ... or this many (slowest) scan intervals
+# main.py log time columns and their unit [s], preferred first
+LOG_TIME_COLUMNS = [("Elapsed s", 1.0), ("Test Time", 60.0)]
+CHECKPOINT_EVERY = 60.0 # test seconds between checkpoints
+STATE_VERSION = 1
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+def max_gap_for(interval):
+    # Longest step bridged when scanning every `interval` s (the slowest rate)
+    return max(MAX_GAP, GAP_INTERVALS*float(interval))
+
+def auto_max_gap(t):
+    # max_gap for a log from its own steps (95th percentile: the slow rate of
+    # an adaptive log, not the occasional disconnect)
+    dt = np.diff(np.asarray(t, dtype=float))
+    dt = dt[dt > 0]
+    return max_gap_for(np.percentile(dt, 95)) if len(dt) else MAX_GAP
+
+
+class EnergyIntegrator:
+
+    def __init__(self, columns=ENERGY_COLUMNS, max_gap=MAX_GAP, checkpoint=None,
+                 every=CHECKPOINT_EVERY):
+        # max_gap: see max_gap_for(); None: set by integrate_csv() from the log
+        # checkpoint: JSON path written every `every` seconds of test time
+        self.columns = list(columns)
+        self.max_gap = float(max_gap) if max_gap is not None else None
+        self.checkpoint = checkpoint
+        self.every = float(every)
+        self.totals = {c: 0.0 for c in self.columns}     # Btu
+        self.seconds = {c: 0.0 for c in self.columns}    # integrated time [s]
+        self.gap_seconds = {c: 0.0 for c in self.columns}
+        self._last = {c: None for c in self.columns}     # (t, value) of the last valid sample
+        self.n = 0
+        self.t_last = None
+        self.offset = 0.0 # added to t, see resume()
+        self.wall_time = None # wall clock of the loaded checkpoint
+        self.source = {}  # extra state kept with the checkpoint (integrate_csv)
+        self._saved_at = None
+
+    def add(self, t, values):
+        # t: test time [s]; values: column -> Btu/h (NaN / 'OPEN' skipped).
+        # Returns the running totals [Btu].
+        t = float(t) + self.offset
+        max_gap = self.max_gap if self.max_gap is not None else MAX_GAP
+        for c in self.columns:
+            x = _number(values.get(c))
+            if x != x:
+                continue
+            last = self._last[c]
+            if last is not None:
+                dt = t - last[0]
+                if 0 < dt <= max_gap:
+                    self.totals[c] += 0.5*(last[1] + x)*dt/3600
+                    self.seconds[c] += dt
+                elif dt > max_gap:
+                    self.gap_seconds[c] += dt
+            self._last[c] = (t, x)
+        self.n += 1
+        self.t_last = t
+        if self.checkpoint is not None and (self._saved_at is None
+                                            or t - self._saved_at >= self.every):
+            self.save()
+        return self.totals
+
+    def row(self, decimals=1):
+        # Running totals in ENERGY_HEADERS order
+        return [round(self.totals[c], decimals) for c in self.columns]
+
+    # ---- Checkpoints ----------------------------------------------------------
+    def state(self):
+        return {"version": STATE_VERSION, "columns": self.columns, "max_gap": self.max_gap,
+                "totals": self.totals, "seconds": self.seconds, "gap_seconds": self.gap_seconds,
+                "last": {c: list(v) if v else None for c, v in self._last.items()},
+                "n": self.n, "t_last": self.t_last, "wall_time": time.time(),
+                "source": self.source}
+
+    def save(self, path=None):
+        # Temporary file + rename: a crash leaves the previous checkpoint intact
+        path = path or self.checkpoint
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state(), f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._saved_at = self.t_last
+
+    @classmethod
+    def load(cls, path, checkpoint=None, every=CHECKPOINT_EVERY):
+        with open(path) as f:
+            state = json.load(f)
+        if state.get("version") != STATE_VERSION:
+            raise ValueError("{}: unsupported energy checkpoint version {}".format(
+                path, state.get("version")))
+        self = cls(state["columns"], state["max_gap"], checkpoint, every)
+        self.totals.update(state["totals"])
+        self.seconds.update(state["seconds"])
+        self.gap_seconds.update(state["gap_seconds"])
+        self._last.update({c: tuple(v) if v else None for c, v in state["last"].items()})
+        self.n = state["n"]
+        self.t_last = self._saved_at = state["t_last"]
+        self.wall_time = state["wall_time"]
+        self.source = state.get("source", {})
+        return self
+
+    def resume(self, wall_now=None):
+        # Continue a loaded state in a restarted test, whose test time starts
+        # again at 0: the new time axis continues after the wall-clock downtime
+        # (bridged only if the restart took less than max_gap)
+        if self.t_last is None:
+            return self
+        wall_now = time.time() if wall_now is None else wall_now
+        downtime = wall_now - self.wall_time if self.wall_time is not None else 0.0
+        self.offset = self.t_last + max(0.0, downtime)
+        return self
+
+    def report(self):
+        lines = ["Energy (trapezoidal, {} records):".format(self.n)]
+        for c, h in zip(self.columns, ENERGY_HEADERS):
+            gap = self.gap_seconds[c]
+            lines.append("  {:12s} {:12.1f} Btu over {:.1f} min{}".format(
+                h, self.totals[c], self.seconds[c]/60,
+                " ({:.1f} min not bridged)".format(gap/60) if gap else ""))
+        return "\n".join(lines)
+
+
+# ---- Whole columns ------------------------------------------------------------
+def integrate(t, columns, max_gap=None):
+    # t: seconds; columns: name -> Btu/h arrays (NaN skipped). Returns
+    # name -> running total [Btu] per row, same rule as EnergyIntegrator.
+    # max_gap None: auto_max_gap(t)
+    t = np.asarray(t, dtype=float)
+    if max_gap is None:
+        max_gap = auto_max_gap(t[~np.isnan(t)])
+    totals = {}
+    for name, x in columns.items():
+        x = np.asarray(x, dtype=float)
+        valid = np.flatnonzero(~np.isnan(x) & ~np.isnan(t))
+        tv, xv = t[valid], x[valid]
+        dt = np.diff(tv)
+        step = 0.5*(xv[1:] + xv[:-1])*dt/3600
+        step[(dt <= 0) | (dt > max_gap)] = 0.0
+        cum = np.concatenate(([0.0], np.cumsum(step)))
+        # Rows without a value carry the total of the last valid row
+        idx = np.searchsorted(valid, np.arange(len(x)), side="right") - 1
+        totals[name] = np.where(idx >= 0, cum[np.maximum(idx, 0)], 0.0)
+    return totals
+
+
+# ---- main.py csv logs, incremental ------------------------------------------------
+def log_time_column(header):
+    # (column, scale to seconds) of a main.py log: the unrounded elapsed
+    # seconds, or "Test Time" in logs written before it was added
+    for column, scale in LOG_TIME_COLUMNS:
+        if column in header:
+            return column, scale
+    raise ValueError("No time column ({}) in the log".format(
+        " / ".join(c for c, s in LOG_TIME_COLUMNS)))
+
+def integrate_csv(path, integrator=None):
+    # Adds the complete rows of a main.py log that the integrator has not seen
+    # (integrator.source holds the file, byte offset and time column)
+    integrator = integrator or EnergyIntegrator(max_gap=None)
+    source = integrator.source
+    with open(path, "rb") as f:
+        if source.get("path") != os.path.abspath(path) or os.fstat(f.fileno()).st_size < source["offset"]:
+            # New file (or one that was replaced): date row + header first
+            f.readline()
+            header = next(csv.reader([f.readline().decode()]))
+            time_column, scale = log_time_column(header)
+            source.clear()
+            source.update(path=os.path.abspath(path), offset=f.tell(), time=[time_column, scale],
+                          index={c: header.index(c) for c in [time_column] + integrator.columns})
+        f.seek(source["offset"])
+        data = f.read()
+    end = data.rfind(b"\n") + 1 # partial last row: wait for the rest
+    index = source["index"]
+    time_column, scale = source.get("time", LOG_TIME_COLUMNS[-1])
+    rows = []
+    for row in csv.reader(io.StringIO(data[:end].decode())):
+        if len(row) <= max(index.values()):
+            continue
+        t = _number(row[index[time_column]])*scale
+        if t == t:
+            rows.append((t, {c: row[index[c]] for c in integrator.columns}))
+    if integrator.max_gap is None and len(rows) > 1:
+        integrator.max_gap = auto_max_gap([t for t, values in rows])
+    # Saved once at the end, when the offset matches the totals
+    checkpoint, integrator.checkpoint = integrator.checkpoint, None
+    for t, values in rows:
+        integrator.add(t, values)
+    source["offset"] += end
+    integrator.checkpoint = checkpoint
+    if checkpoint is not None:
+        integrator.save()
+    return integrator
+
+
+def integrate_export(path, max_gap=None, cache=True):
+    # xlsx export (or csv log): recompute the heat gains, then integrate them
+    import HG_interval_calc as hgi
+    columns, duct_diameter, skiprows, skip_footer = hgi.preset_for(path)
+    time_column, scale = hgi.time_column_for(path)
+    df = hgi.read_input(path, dict(columns, t=time_column), skiprows, skip_footer, cache)
+    results = hgi.compute(df, columns, duct_diameter)
+    t = df[time_column].to_numpy(dtype=float)*scale
+    return integrate(t, {h: results[k] for h, k in zip(ENERGY_HEADERS, hgi.ENERGY_KEYS)}, max_gap)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Heat gain energy totals [Btu] of a test log")
+    parser.add_argument("input", help="main.py csv log or xlsx export")
+    parser.add_argument("--checkpoint", metavar="JSON",
+                        help="csv logs: resume from / save to this state file (only new rows are read)")
+    parser.add_argument("--max-gap", type=float, metavar="SEC",
+                        help="longest step integrated across (default: {:g} x the log's slow "
+                             "scan interval, at least {:g} s)".format(GAP_INTERVALS, MAX_GAP))
+    args = parser.parse_args(argv)
+
+    tic = time.perf_counter()
+    if args.input.lower().endswith((".xlsx", ".xls")):
+        totals = integrate_export(args.input, args.max_gap)
+        for h, cum in totals.items():
+            print("  {:12s} {:12.1f} Btu".format(h, cum[-1] if len(cum) else 0.0))
+    else:
+        if args.checkpoint and os.path.isfile(args.checkpoint):
+            integrator = EnergyIntegrator.load(args.checkpoint, args.checkpoint)
+            if args.max_gap is not None:
+                integrator.max_gap = args.max_gap
+        else:
+            integrator = EnergyIntegrator(max_gap=args.max_gap, checkpoint=args.checkpoint)
+        n = integrator.n
+        integrate_csv(args.input, integrator)
+        print("{} new rows".format(integrator.n - n))
+        print(integrator.report())
+    print("{:.3f} sec".format(time.perf_counter() - tic))
+
+
+if __name__ == '__main__':
+    main()
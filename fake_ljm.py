@@ -0,0 +1,185 @@
+"""
+Description:
+A stand-in for the labjack.ljm module so the acquisition code can be run and
+checked without a T7 or the LJM driver. An instance of FakeLJM exposes the
+same calls the station uses (openS, close, eWriteNames, eReadName, eReadNames
+and the eStream* calls) and can be handed to labjack_functions.LabJackSession
+as its backend. Streamed samples are synthetic: the register value plus
+gaussian noise (stream_noise, in volts).
+
+Dependencies:
+    - none (standard library only)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import random
+import time
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class LJMError(Exception):
+    # Mirrors labjack.ljm.LJMError closely enough for the station code
+    def __init__(self, errorCode=None, errorAddress=None, errorString=None):
+        self.errorCode = errorCode
+        self.errorAddress = errorAddress
+        self.errorString = errorString
+        super().__init__("LJM library error code {} {}".format(errorCode, errorString))
+
+# Error codes used by the fake (same numbers as LJM)
+LJME_DEVICE_NOT_FOUND = 1227
+LJME_DEVICE_DISCONNECTED = 1224 # LJME_RECONNECT_FAILED in LJM, close enough
+LJME_STREAM_NOT_RUNNING = 1303
+FLOAT32 = 3
+
+
+class FakeLJM:
+    LJMError = LJMError
+
+    def __init__(self, values=None, stream_noise=0.0, realtime=True, read_latency=0.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        # values: register name -> number or callable(name) returning a number
+        # read_latency: seconds each eReadName(s) call takes (USB round trip)
+        # clock/sleep: time source for latency and stream pacing (see sim_ljm.py)
+        self.values = dict(values or {})
+        self.read_latency = read_latency
+        self.clock = clock
+        self.sleep = sleep
+        self.stream_noise = stream_noise
+        self.realtime = realtime  # eStreamRead waits for the block like a device
+        self.registers = {}       # last value written per register
+        self.connected = True
+        self.fail_next_open = 0   # number of upcoming openS calls that fail
+        self.open_calls = 0
+        self.close_calls = 0
+        self.read_calls = 0
+        self.write_calls = 0
+        self._next_handle = 1
+        self._handles = set()
+        self._stream = None
+
+    # ---- Test helpers -------------------------------------------------------
+    def disconnect(self):
+        # Simulate the USB cable being pulled: all open handles go stale
+        self.connected = False
+        self._handles.clear()
+        self._stream = None # a stream does not survive the device going away
+
+    def reconnect(self):
+        self.connected = True
+
+    # ---- LJM API ------------------------------------------------------------
+    def openS(self, deviceType, connectionType, identifier):
+        self.open_calls += 1
+        if not self.connected or self.fail_next_open > 0:
+            self.fail_next_open = max(0, self.fail_next_open - 1)
+            raise LJMError(LJME_DEVICE_NOT_FOUND, errorString="LJME_DEVICE_NOT_FOUND")
+        handle = self._next_handle
+        self._next_handle += 1
+        self._handles.add(handle)
+        return handle
+
+    def close(self, handle):
+        self.close_calls += 1
+        self._check(handle)
+        self._handles.discard(handle)
+
+    def eWriteNames(self, handle, numFrames, aNames, aValues):
+        self._check(handle)
+        if len(aNames) != numFrames or len(aValues) != numFrames:
+            raise LJMError(errorString="numFrames does not match names/values")
+        self.write_calls += 1
+        for name, value in zip(aNames, aValues):
+            self.registers[name] = value
+
+    def eReadName(self, handle, name):
+        self._check(handle)
+        self.read_calls += 1
+        self._latency()
+        return self._value(name)
+
+    def eReadNames(self, handle, numFrames, aNames):
+        self._check(handle)
+        if len(aNames) != numFrames:
+            raise LJMError(errorString="numFrames does not match names")
+        self.read_calls += 1
+        self._latency()
+        return [self._value(name) for name in aNames]
+
+    # ---- Stream mode --------------------------------------------------------
+    def namesToAddresses(self, numFrames, aNames):
+        # Only AIN# is needed for streaming: address = 2 * channel
+        addresses = [2*int(name[3:]) for name in aNames[:numFrames]]
+        return addresses, [FLOAT32]*len(addresses)
+
+    def eStreamStart(self, handle, scansPerRead, numAddresses, aScanList, scanRate):
+        self._check(handle)
+        names = ["AIN{}".format(a//2) for a in aScanList[:numAddresses]]
+        self._stream = {"names": names, "scans_per_read": scansPerRead,
+                        "scan_rate": float(scanRate), "next": self.clock()}
+        return float(scanRate)
+
+    def eStreamRead(self, handle):
+        self._check(handle)
+        if self._stream is None:
+            raise LJMError(LJME_STREAM_NOT_RUNNING, errorString="LJME_STREAM_NOT_RUNNING")
+        st = self._stream
+        if self.realtime:
+            st["next"] += st["scans_per_read"] / st["scan_rate"]
+            delay = st["next"] - self.clock()
+            if delay > 0:
+                self.sleep(delay)
+        data = []
+        for i in range(st["scans_per_read"]):
+            for name in st["names"]:
+                value = self._value(name)
+                if self.stream_noise:
+                    value += random.gauss(0.0, self.stream_noise)
+                data.append(value)
+        return data, 0, 0
+
+    def eStreamStop(self, handle):
+        self._check(handle)
+        if self._stream is None:
+            raise LJMError(LJME_STREAM_NOT_RUNNING, errorString="LJME_STREAM_NOT_RUNNING")
+        self._stream = None
+
+    # -------------------------------------------------------------------------
+    def _check(self, handle):
+        if handle not in self._handles:
+            raise LJMError(LJME_DEVICE_DISCONNECTED, errorString="LJME_DEVICE_DISCONNECTED")
+
+    def _latency(self):
+        if self.read_latency:
+            self.sleep(self.read_latency)
+
+    def _value(self, name):
+        value = self.values.get(name, self.registers.get(name, 0.0))
+        if callable(value):
+            value = value(name)
+        return value
+
+
+if __name__ == '__main__':
+    import labjack_functions as ljf
+
+    fake = FakeLJM({"AIN2_EF_READ_A": 75.0, "AIN10": 1.0})
+    session = ljf.LabJackSession(backend=fake)
+    for i in range(5):
+        ljf.tempRead_TC(2, 3, 1, session=session)
+        ljf.aiCurrent(10, session=session)
+    assert fake.open_calls == 1, fake.open_calls
+    print("10 reads, {} openS call(s)".format(fake.open_calls))
+
+    fake.disconnect()
+    fake.reconnect()
+    assert ljf.tempRead_TC(2, 3, 1, session=session) == 76.0
+    assert session.reconnects == 1 and fake.open_calls == 2
+    print("Reconnected after LJMError: {} reconnect(s)".format(session.reconnects))
+
+    fake.disconnect()
+    try:
+        ljf.aiRead(12, session=session)
+    except LJMError:
+        print("Device gone: LJMError propagated to caller")
+    else:
+        raise AssertionError("expected LJMError")
@@ -0,0 +1,236 @@
+"""
+Description:
+Fixed-memory history of the recent scans. All storage is preallocated NumPy
+structured arrays used as ring buffers, so memory does not grow with the
+length of a test:
+
+    raw tier  - every scan (raw channel values and derived columns) for the
+                last `raw_hours`
+    1 s, 1 min and 10 min tiers - per-bucket mean / min / max of every field,
+                each over its own fixed span (default 6 h / 7 days / 90 days)
+
+A sample updates the running sums of the open bucket of each tier (a few
+array operations, independent of the history length); the bucket is written
+to its ring when a sample for a later bucket arrives. series() picks the
+finest tier that still covers the requested span, for plots and whole-test
+checks.
+
+Non-numeric values (e.g. 'OPEN' while the device is disconnected) are stored
+as NaN and ignored by the tier statistics.
+
+Dependencies:
+    - numpy
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import numpy as np
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# (bucket seconds, span seconds) of the downsampled tiers
+DEFAULT_TIERS = ((1, 6*3600), (60, 7*24*3600), (600, 90*24*3600))
+
+
+class Ring:
+    # Preallocated ring buffer over a structured array of float64 fields,
+    # written through a flat 2-D view (one row assignment per append)
+
+    def __init__(self, capacity, fields):
+        self.data = np.zeros(capacity, dtype=[(f, "f8") for f in fields])
+        self.flat = self.data.view("f8").reshape(capacity, len(fields))
+        self.capacity = capacity
+        self.head = 0   # next slot to write
+        self.count = 0
+
+    def append(self, values):
+        # values: sequence / array in field order
+        self.flat[self.head] = values
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def ordered(self):
+        # Copy of the stored rows, oldest first
+        if self.count < self.capacity:
+            return self.data[:self.count].copy()
+        return np.concatenate((self.data[self.head:], self.data[:self.head]))
+
+    def __len__(self):
+        return self.count
+
+
+class Tier:
+    # Mean / min / max of every field per `resolution`-second bucket. The
+    # running sums live in rows of History's accumulator arrays so that one
+    # array operation updates all tiers at once.
+
+    def __init__(self, resolution, span, fields, acc):
+        self.resolution = float(resolution)
+        self.span = float(span)
+        self.fields = list(fields)
+        columns = ["t", "n"]
+        for stat in ("mean", "min", "max"):
+            columns += ["{}:{}".format(stat, f) for f in self.fields]
+        self.ring = Ring(int(span // resolution) + 1, columns)
+        self._sum, self._count, self._min, self._max = acc
+        self._bucket = None
+        self._n = 0
+        self._row = np.empty(len(columns))
+
+    def advance(self, t):
+        # Close the open bucket if t falls in a later one
+        bucket = t // self.resolution
+        if bucket != self._bucket:
+            self._close()
+            self._bucket = bucket
+        self._n += 1
+
+    def _open_row(self):
+        # Statistics of the open bucket as a ring row
+        n = len(self.fields)
+        row = self._row
+        row[0] = self._bucket*self.resolution
+        row[1] = self._n
+        if self._count.all():
+            np.divide(self._sum, self._count, out=row[2:2 + n])
+            row[2 + n:2 + 2*n] = self._min
+            row[2 + 2*n:] = self._max
+        else:
+            # Fields without a single value in this bucket are NaN
+            missing = self._count == 0
+            with np.errstate(invalid="ignore", divide="ignore"):
+                np.divide(self._sum, self._count, out=row[2:2 + n])
+            row[2 + n:2 + 2*n] = np.where(missing, np.nan, self._min)
+            row[2 + 2*n:] = np.where(missing, np.nan, self._max)
+        return row
+
+    def _close(self):
+        # Write the open bucket to the ring and reset its accumulators
+        if self._bucket is None or not self._n:
+            return
+        self.ring.append(self._open_row())
+        self._n = 0
+        self._sum[:] = 0.0
+        self._count[:] = 0.0
+        self._min[:] = np.inf
+        self._max[:] = -np.inf
+
+    def rows(self, include_open=True):
+        # Stored buckets, oldest first (plus the still open one)
+        rows = self.ring.ordered()
+        if include_open and self._n:
+            row = np.zeros(1, dtype=rows.dtype)
+            row.view("f8")[:] = self._open_row()
+            rows = np.concatenate((rows, row))
+        return rows
+
+
+class History:
+
+    def __init__(self, fields, raw_hours=2.0, interval=1.0, tiers=DEFAULT_TIERS):
+        # fields: names of the numeric values kept per scan
+        # interval: shortest scan interval [s], sizes the raw ring
+        self.fields = list(fields)
+        n = len(self.fields)
+        self.raw = Ring(int(raw_hours*3600/interval) + 1, ["t"] + self.fields)
+        # Accumulators of the open bucket, one row per tier
+        self._sum = np.zeros((len(tiers), n))
+        self._count = np.zeros((len(tiers), n))
+        self._min = np.full((len(tiers), n), np.inf)
+        self._max = np.full((len(tiers), n), -np.inf)
+        self.tiers = [Tier(res, span, self.fields,
+                           (self._sum[i], self._count[i], self._min[i], self._max[i]))
+                      for i, (res, span) in enumerate(tiers)]
+        self._row = np.empty(n + 1)
+        self.t_first = None
+
+    def add(self, t, values):
+        # t: test time [s]; values: dict name -> value or sequence in field order
+        if self.t_first is None:
+            self.t_first = t
+        row = self._row
+        row[0] = t
+        if isinstance(values, dict):
+            row[1:] = [_number(values.get(f)) for f in self.fields]
+        else:
+            row[1:] = [_number(v) for v in values]
+        self.raw.append(row)
+        for tier in self.tiers:
+            tier.advance(t)
+        x = row[1:]
+        ok = x == x # not NaN
+        self._sum += np.where(ok, x, 0.0)
+        self._count += ok
+        np.fmin(self._min, x, out=self._min)
+        np.fmax(self._max, x, out=self._max)
+
+    @property
+    def nbytes(self):
+        return self.raw.data.nbytes + sum(tier.ring.data.nbytes for tier in self.tiers)
+
+    def series(self, field, seconds=None, stat="mean"):
+        # (t, values) of one field over the last `seconds` (default: the whole
+        # test), from the raw ring if it covers the span, else the finest tier
+        rows = self.raw.ordered()
+        if not len(rows):
+            return np.empty(0), np.empty(0)
+        t_last = rows["t"][-1]
+        if seconds is None:
+            seconds = t_last - self.t_first
+        if rows["t"][0] <= max(t_last - seconds, self.t_first):
+            t, v = rows["t"], rows[field]
+            keep = t >= t_last - seconds
+        else:
+            tier = self.tier_for(seconds)
+            rows = tier.rows()
+            t, v = rows["t"], rows["{}:{}".format(stat, field)]
+            keep = t + tier.resolution > t_last - seconds # t: bucket start
+        return t[keep], v[keep]
+
+    def summary(self, field, seconds=None):
+        # (mean, min, max) of one field over the last `seconds` (default: the
+        # whole test); from the tiers this is the mean of the bucket means
+        mean = self.series(field, seconds)[1]
+        ok = mean == mean
+        if not ok.any():
+            return np.nan, np.nan, np.nan
+        low = self.series(field, seconds, "min")[1]
+        high = self.series(field, seconds, "max")[1]
+        return float(mean[ok].mean()), float(np.nanmin(low)), float(np.nanmax(high))
+
+    def tier_for(self, seconds):
+        # Finest tier whose span covers `seconds` (None: the coarsest)
+        if seconds is not None:
+            for tier in self.tiers:
+                if tier.span >= seconds:
+                    return tier
+        return self.tiers[-1]
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+if __name__ == '__main__':
+    import time
+
+    # A 3-day test at a 1 s interval: memory stays fixed while the tiers
+    # still cover the whole test
+    fields = ["Tdb_exh", "Q_Scfm", "Total HG"]
+    hist = History(fields, raw_hours=1, interval=1.0)
+    print("Preallocated: {:.1f} MB".format(hist.nbytes/1e6))
+    n = 3*24*3600
+    noise = np.random.default_rng(0).normal(0, 1, (n, 3)).tolist()
+    tic = time.perf_counter()
+    for k in range(n):
+        e = noise[k]
+        hist.add(float(k), (90 + 0.2*e[0], 330 + e[1], "OPEN" if k % 5000 == 0 else 6000 + 50*e[2]))
+    sec = time.perf_counter() - tic
+    print("{} samples in {:.1f} s ({:.1f} us/sample), still {:.1f} MB".format(
+        n, sec, sec/n*1e6, hist.nbytes/1e6))
+    for span in (600, 6*3600, 3*24*3600):
+        t, v = hist.series("Total HG", span)
+        print("last {:6d} s: {:5d} points, mean Total HG {:.1f}".format(span, len(t), np.nanmean(v)))
+    print("whole test: Total HG mean {:.1f}, min {:.1f}, max {:.1f}".format(*hist.summary("Total HG")))
@@ -0,0 +1,133 @@
+"""
+Description:
+Cached ingest of test logs. Parsing a multi-megabyte xlsx export with openpyxl
+is by far the slowest step of reprocessing, so the first read of a workbook
+stores the parsed columns in a columnar sidecar cache (Parquet if pyarrow is
+installed, pickle otherwise) under a .cache directory next to the source file.
+Later reads load from the cache as long as the source file's mtime and size
+are unchanged, and only the requested columns are parsed / loaded.
+
+Mixed-type columns (e.g. numbers with the "Total test duration" footer text)
+are returned as text, from a fresh parse and from the cache alike (the cache
+formats cannot hold mixed columns); use pd.to_numeric on them.
+
+Dependencies:
+    - pandas
+    - pyarrow (optional, Parquet cache)
+    - openpyxl (xlsx sources)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import json
+import os
+import pandas as pd
+try:
+    import pyarrow # noqa: F401 - only needed by pandas' parquet engine
+    CACHE_FORMAT = "parquet"
+except ImportError:
+    CACHE_FORMAT = "pickle"
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+CACHE_DIR = ".cache"
+
+
+def cache_paths(path):
+    # Sidecar cache data file and its metadata file for a source log
+    folder, name = os.path.split(os.path.abspath(path))
+    base = os.path.join(folder, CACHE_DIR, name)
+    ext = ".parquet" if CACHE_FORMAT == "parquet" else ".pkl"
+    return base + ext, base + ".json"
+
+def _source_key(path, skiprows):
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "skiprows": skiprows,
+            "format": CACHE_FORMAT}
+
+def _parse(path, skiprows, usecols):
+    if path.lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(path, skiprows=skiprows, usecols=usecols)
+    else:
+        df = pd.read_csv(path, skiprows=skiprows, usecols=usecols)
+    return _normalize(df)
+
+def _normalize(df):
+    # Object (mixed-type) columns as text and column names as strings, the
+    # way they come back from the cache, so both paths give the same frame
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].map(lambda v: None if pd.isna(v) else str(v))
+    df.columns = [str(c) for c in df.columns]
+    return df
+
+def _load_cache(path, skiprows, usecols):
+    data_path, meta_path = cache_paths(path)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    if {k: meta.get(k) for k in ("mtime_ns", "size", "skiprows", "format")} != _source_key(path, skiprows):
+        return None, None # Source changed - re-parse
+    cached = meta["columns"]
+    if usecols is not None and not set(usecols) <= set(cached):
+        return None, cached # Need columns that were never parsed
+    if usecols is None and not meta["all_columns"]:
+        return None, cached
+    try:
+        if CACHE_FORMAT == "parquet":
+            df = pd.read_parquet(data_path, columns=usecols)
+        else:
+            df = pd.read_pickle(data_path)
+            if usecols is not None:
+                df = df[list(usecols)]
+    except (OSError, ValueError):
+        return None, None
+    return df, cached
+
+def _store_cache(path, skiprows, df, all_columns):
+    data_path, meta_path = cache_paths(path)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    tmp = data_path + ".tmp"
+    if CACHE_FORMAT == "parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, data_path)
+    meta = dict(_source_key(path, skiprows), columns=list(df.columns),
+                all_columns=all_columns)
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+def read_log(path, skiprows=22, usecols=None, cache=True):
+    # Read a test log (xlsx or csv), optionally only the columns in usecols
+    if usecols is not None:
+        usecols = list(usecols)
+    if not cache:
+        return _parse(path, skiprows, usecols)
+    df, cached = _load_cache(path, skiprows, usecols)
+    if df is not None:
+        return df
+    # Parse what is needed now plus what the cache already held, so switching
+    # between column subsets does not keep re-parsing the workbook
+    parse_cols = None
+    if usecols is not None:
+        parse_cols = list(dict.fromkeys((cached or []) + usecols))
+    df = _parse(path, skiprows, parse_cols)
+    try:
+        _store_cache(path, skiprows, df, all_columns=parse_cols is None)
+    except (OSError, ValueError) as e:
+        print("Could not write cache for {}: {}".format(path, e))
+    return df if usecols is None else df[usecols]
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "test.xlsx"
+    for label in ("first read", "cached read"):
+        tic = time.perf_counter()
+        df = read_log(path)
+        print("{}: {} rows x {} cols in {:.3f} sec".format(label, len(df), len(df.columns),
+                                                         time.perf_counter() - tic))
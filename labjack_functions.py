@@ -1,5 +1,149 @@
-from labjack import ljm
 import math
+import threading
+import metrics
+ljm = None # labjack.ljm, imported by the first session that needs it
+LJME_STREAM_NOT_RUNNING = 1303
+
+def load_ljm():
+    # Imported on first use, so code running on a fake backend (and tools that
+    # never touch the device) skip the driver import
+    global ljm
+    if ljm is None:
+        try:
+            from labjack import ljm as module
+        except ImportError:
+            # LJM driver not installed - a backend (e.g. fake_ljm.FakeLJM) must be
+            # handed to LabJackSession / set_session() before any read is made.
+            return None
+        ljm = module
+    return ljm
+
+# ---- PERSISTENT DEVICE SESSION ----------------------------------------------
+# Opening a device ("ANY", "ANY", "ANY") means a full device discovery, which
+# used to dominate the scan time when every read opened and closed the T7.
+# A session opens the device once, shares the handle across all reads and
+# re-opens it by itself when an LJMError shows the connection was lost.
+class LabJackSession:
+
+    def __init__(self, device_type="ANY", connection_type="ANY", identifier="ANY",
+                 backend=None):
+        self.ljm = backend if backend is not None else load_ljm()
+        if self.ljm is None:
+            raise ImportError("labjack-ljm is not installed and no backend was provided")
+        self.device_type = device_type
+        self.connection_type = connection_type
+        self.identifier = identifier
+        self.handle = None
+        self.opens = 0       # number of successful openS calls
+        self.reconnects = 0  # number of re-opens after an LJMError
+        self._connect_hooks = []
+        self._connecting = False # connect hooks running: calls are not retried
+        self._lock = threading.RLock()
+
+    def open(self):
+        with self._lock:
+            if self.handle is None:
+                with metrics.timer("ljm.openS"):
+                    self.handle = self.ljm.openS(self.device_type, self.connection_type,
+                                                 self.identifier)
+                self.opens += 1
+                # Device side configuration may be gone after a reconnect. A
+                # hook that fails leaves the session closed, so the next call
+                # starts over instead of reconnecting from inside the hook.
+                self._connecting = True
+                try:
+                    for hook in self._connect_hooks:
+                        hook(self)
+                except BaseException:
+                    self.close()
+                    raise
+                finally:
+                    self._connecting = False
+            return self.handle
+
+    def close(self):
+        with self._lock:
+            if self.handle is not None:
+                try:
+                    self.ljm.close(self.handle)
+                except self.ljm.LJMError:
+                    pass # Device already gone
+                self.handle = None
+
+    def add_connect_hook(self, hook):
+        # hook(session) is called every time the device is (re)opened
+        with self._lock:
+            self._connect_hooks.append(hook)
+            if self.handle is not None:
+                hook(self)
+
+    def _call(self, func, *args):
+        with self._lock, metrics.timer("ljm." + func.__name__):
+            try:
+                return func(self.open(), *args)
+            except self.ljm.LJMError:
+                # Drop the stale handle and retry once on a fresh connection.
+                # If the device is really gone the second LJMError propagates.
+                if self._connecting:
+                    raise # from a connect hook: open() gives up the connection
+                self.close()
+                self.reconnects += 1
+                return func(self.open(), *args)
+
+    def eWriteNames(self, names, values):
+        return self._call(self.ljm.eWriteNames, len(names), names, values)
+
+    def eReadName(self, name):
+        return self._call(self.ljm.eReadName, name)
+
+    def eReadNames(self, names):
+        return self._call(self.ljm.eReadNames, len(names), names)
+
+    # Stream calls are not retried: a stream does not survive a reconnect, and
+    # eStreamRead must not hold the lock while it waits for the next block.
+    def eStreamStart(self, scans_per_read, names, scan_rate):
+        with self._lock:
+            addresses = self.ljm.namesToAddresses(len(names), names)[0]
+            return self.ljm.eStreamStart(self.open(), scans_per_read, len(addresses),
+                                         addresses, scan_rate)
+
+    def eStreamRead(self):
+        # Take the handle under the lock, wait for the block outside it. A
+        # closed session (e.g. after a reconnect) fails like a stopped stream.
+        with self._lock:
+            handle = self.handle
+        if handle is None:
+            raise self.ljm.LJMError(errorCode=LJME_STREAM_NOT_RUNNING,
+                                    errorString="LJME_STREAM_NOT_RUNNING")
+        return self.ljm.eStreamRead(handle)
+
+    def eStreamStop(self):
+        with self._lock:
+            if self.handle is not None:
+                self.ljm.eStreamStop(self.handle)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_session = None
+
+def get_session():
+    # Shared session used by the read helpers below
+    global _session
+    if _session is None:
+        _session = LabJackSession()
+    return _session
+
+def set_session(session):
+    # Replace the shared session (e.g. with one built on a fake backend)
+    global _session
+    if _session is not None and _session is not session:
+        _session.close()
+    _session = session
 
 def K_to_F(T):
     # Kelvin to Celsius
@@ -16,35 +160,34 @@ def V_to_P(v):
     return round(p, 2)
 
 # ---- READ IN SINGLE END or DIFF. THERMOCOUPLE MEASUREMENT --------------------------
-def tempRead_TC(ch_p, ch_n=199, offset=0, tc_type=22):
+@metrics.timed("lj.tempRead_TC")
+def tempRead_TC(ch_p, ch_n=199, offset=0, tc_type=22, session=None):
 
-    # Open first available LabJack connection
-    handle = ljm.openS("ANY", "ANY", "ANY")
+    # Shared LabJack connection (opened on first use)
+    session = session or get_session()
 
     names = ["AIN{}_EF_INDEX".format(ch_p), "AIN{}_EF_CONFIG_A".format(ch_p),
              "AIN{}_NEGATIVE_CH".format(ch_p)]
     # tc_type: 21-J, 22-K, 23-R, 24-T
     aValues = [tc_type, 2, ch_n] # Configuration inputs
 
-    numFrames = len(names)
-    ljm.eWriteNames(handle, numFrames, names, aValues)
+    session.eWriteNames(names, aValues)
 
     name = "AIN{}_EF_READ_A".format(ch_p)
-    r_ = ljm.eReadName(handle, name)
+    r_ = session.eReadName(name)
     T = round(r_ + offset, 2)
 
-    ljm.close(handle)
-
     return T
 
 # ---- READ IN SINGLE END or DIFF. THERMOCOUPLE MEASUREMENT w/ CJC ------------
-def tempRead_TC_CJC(ch_p, ch_n=199, ch_cjc=0, offset=0):
+@metrics.timed("lj.tempRead_TC_CJC")
+def tempRead_TC_CJC(ch_p, ch_n=199, ch_cjc=0, offset=0, session=None):
     
     modbus_add = ch_cjc*2
     CJC_slope = 55.56
     CJC_offset = 255.37
-    # Open first available LabJack connection
-    handle = ljm.openS("ANY", "ANY", "ANY")
+    # Shared LabJack connection (opened on first use)
+    session = session or get_session()
 
     names = ["AIN{}_EF_INDEX".format(ch_p), "AIN{}_EF_CONFIG_A".format(ch_p),
              "AIN{}_EF_CONFIG_B".format(ch_p), "AIN{}_EF_CONFIG_D".format(ch_p),
@@ -53,23 +196,21 @@ def tempRead_TC_CJC(ch_p, ch_n=199, ch_cjc=0, offset=0):
     # Configuration inputs
     aValues = [22, 2, modbus_add, CJC_slope, CJC_offset, ch_n]
 
-    numFrames = len(names)
-    ljm.eWriteNames(handle, numFrames, names, aValues)
+    session.eWriteNames(names, aValues)
 
     name = "AIN{}_EF_READ_A".format(ch_p)
-    r_ = ljm.eReadName(handle, name)
+    r_ = session.eReadName(name)
     T = round(r_, 2)
 
-    ljm.close(handle)
-
     return T
 
 # ---- READ IN SINGLE RTD MEASUREMENT -----------------------------------------
-def tempRead_RTD(ai_ch, rtd=40, offset=0):
+@metrics.timed("lj.tempRead_RTD")
+def tempRead_RTD(ai_ch, rtd=40, offset=0, session=None):
 
 
-    # Open first available LabJack connection
-    handle = ljm.openS("ANY", "ANY", "ANY")
+    # Shared LabJack connection (opened on first use)
+    session = session or get_session()
     # AIN# values:
     #   RTD Type: 40 = PT100, 41 = PT500, 42 = PT1000
     #   Temperature Units: 0 = K, 1 = C, 2 = F
@@ -79,22 +220,20 @@ def tempRead_RTD(ai_ch, rtd=40, offset=0):
     
     aValues = [rtd, 2] # Configuration inputs
 
-    numFrames = len(names)
-    ljm.eWriteNames(handle, numFrames, names, aValues)
+    session.eWriteNames(names, aValues)
 
     name = "AIN{}_EF_READ_A".format(ai_ch)
-    r_ = ljm.eReadName(handle, name)
+    r_ = session.eReadName(name)
     T = round(r_, 2)
 
-    ljm.close(handle)
-
     return T
 
 # ---- READ IN SINGLE ANALOG INPUT CHANNEL ------------------------------------
-def aiRead(channel_p, channel_n=199, v_range=10.0):
+@metrics.timed("lj.aiRead")
+def aiRead(channel_p, channel_n=199, v_range=10.0, session=None):
 
-    # Open first available LabJack connection
-    handle = ljm.openS("ANY", "ANY", "ANY")
+    # Shared LabJack connection (opened on first use)
+    session = session or get_session()
     # AIN0 and AIN1:
     #   Negative channel = single ended (199)
     #   Range: +/- 10.0 V (10.0)
@@ -104,20 +243,19 @@ def aiRead(channel_p, channel_n=199, v_range=10.0):
              "AIN{}_RESOLUTION_INDEX".format(channel_p), "AIN{}_SETTLING_US".format(channel_p)]
 
     aValues = [channel_n, v_range, 0, 0]
-    numFrames = len(names)
-    ljm.eWriteNames(handle, numFrames, names, aValues)
+    session.eWriteNames(names, aValues)
     
     name = "AIN{}".format(channel_p)
-    result = ljm.eReadName(handle, name)
-    ljm.close(handle)
+    result = session.eReadName(name)
 
     return result
 
 # ---- READ IN FROM MULTIPLE ANALOG INPUT CHANNELS ----------------------------
-def aiReads(a1, a2):
+@metrics.timed("lj.aiReads")
+def aiReads(a1, a2, session=None):
 
-    # Open first found LabJack
-    handle = ljm.openS("ANY", "ANY", "ANY")
+    # Shared LabJack connection (opened on first use)
+    session = session or get_session()
     # AIN0 and AIN1:
     #   Negative channel = single ended (199)
     #   Range: +/- 10.0 V (10.0)
@@ -129,22 +267,20 @@ def aiReads(a1, a2):
              "AIN{}_RESOLUTION_INDEX".format(a2), "AIN{}_SETTLING_US".format(a2)]
     aValues = [199, 10.0, 0, 0,
                199, 10.0, 0, 0]
-    numFrames = len(names)
-    ljm.eWriteNames(handle, numFrames, names, aValues)
+    session.eWriteNames(names, aValues)
     
     names = ["AIN{}".format(a1), "AIN{}".format(a2)]
-    numFrames = len(names)
-    results = ljm.eReadNames(handle, numFrames, names)
-    ljm.close(handle)
+    results = session.eReadNames(names)
 
     return results[0], results[1]
 # --- READ IN FROM LJTick - Current Shunt SENSOR (AI Current to AI Voltage)----
 # The LJTick-CurrentShunt is a signal conditioning module designed to convert
 # 4-20 mA current loop signals into voltage signals that vary from 0.472 to 2.36 V.
-def aiCurrent(channel_p, v_range=2.36):
+@metrics.timed("lj.aiCurrent")
+def aiCurrent(channel_p, v_range=2.36, session=None):
 
-    # Open first available LabJack connection
-    handle = ljm.openS("ANY", "ANY", "ANY")
+    # Shared LabJack connection (opened on first use)
+    session = session or get_session()
     # AIN0 and AIN1:
     #   Negative channel = single ended (199)
     #   Range: +/- 10.0 V (10.0)
@@ -154,13 +290,11 @@ def aiCurrent(channel_p, v_range=2.36):
              "AIN{}_RESOLUTION_INDEX".format(channel_p), "AIN{}_SETTLING_US".format(channel_p)]
 
     aValues = [199, v_range, 0, 0]
-    numFrames = len(names)
-    ljm.eWriteNames(handle, numFrames, names, aValues)
+    session.eWriteNames(names, aValues)
     
     name = "AIN{}".format(channel_p)
-    voltage = ljm.eReadName(handle, name)
+    voltage = session.eReadName(name)
     current = voltage * 8.4746 # Converts volts to mA [I = V / (20 * 5.9ohms)]
-    ljm.close(handle)
 
     return voltage, current
 # -----------------------------------------------------------------------------
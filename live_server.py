@@ -0,0 +1,250 @@
+"""
+Description:
+Local live-telemetry server: publishes every computed record (flows,
+temperatures, heat gains) to remote dashboards as Server-Sent Events over
+plain HTTP (standard library only, any browser's EventSource can read it).
+
+    GET /events             SSE stream of records (compact JSON per event)
+        ?every=N            only every Nth record (decimation for slow links)
+        ?since=K            first replay the buffered records after id K
+                            (also done for the Last-Event-ID header on reconnect)
+    GET /replay?last=N      recent history as JSON lines (or ?since=K)
+    GET /latest             most recent record as JSON
+    GET /                   minimal live table page
+
+Each record is encoded once into a bytes frame which is shared by every
+client (only a reference is queued per client, the data is never copied).
+Every client has its own bounded queue; when a client reads slower than
+records arrive its oldest frames are dropped (counted), so a slow client
+never delays the station or the other clients. The last `history` frames are
+kept in a ring buffer for /replay and reconnects.
+
+Dependencies:
+    - http.server, json, threading, collections (standard library)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import json
+import math
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+KEEPALIVE = 15.0 # seconds between SSE comments on an idle stream
+
+PAGE = b"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Airflow Station</title></head>
+<body><h3>Airflow Station - live</h3><table id="t"></table>
+<script>
+var t = document.getElementById("t");
+new EventSource("/events").onmessage = function(e) {
+  var r = JSON.parse(e.data), h = "";
+  for (var k in r) h += "<tr><td>" + k + "</td><td>" + r[k] + "</td></tr>";
+  t.innerHTML = h;
+};
+</script></body></html>
+"""
+
+
+def _clean(value):
+    # JSON has no NaN / inf
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class _Client:
+
+    def __init__(self, queue_size, every):
+        self.frames = deque(maxlen=queue_size)
+        self.every = max(1, every)
+        self.dropped = 0
+        self.sent = 0
+        self._seen = 0
+
+    def offer(self, frame):
+        self._seen += 1
+        if (self._seen - 1) % self.every:
+            return # Decimated
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1 # deque drops the oldest frame
+        self.frames.append(frame)
+
+
+class LiveServer:
+
+    def __init__(self, port=8765, host="127.0.0.1", history=720, client_queue=60):
+        # history: records kept for /replay; client_queue: frames a client may lag
+        self.history = deque(maxlen=history) # (id, payload, frame)
+        self.client_queue = client_queue
+        self.clients = set()
+        self.published = 0
+        self.dropped = 0 # frames dropped for clients that disconnected since
+        self.closed = False
+        self._cond = threading.Condition()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.live = self
+        self.port = self._server.server_address[1]
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="live-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ---- Publishing ---------------------------------------------------------
+    def publish(self, record):
+        # record: dict name -> value; encoded once, shared by all clients
+        payload = json.dumps({k: _clean(v) for k, v in record.items()},
+                             separators=(",", ":")).encode()
+        with self._cond:
+            k = self.published
+            self.published += 1
+            frame = b"id: %d\ndata: %s\n\n" % (k, payload)
+            self.history.append((k, payload, frame))
+            for client in self.clients:
+                client.offer(frame)
+            self._cond.notify_all()
+        return k
+
+    def stats(self):
+        with self._cond:
+            return {"published": self.published, "clients": len(self.clients),
+                    "dropped": self.dropped + sum(c.dropped for c in self.clients)}
+
+    # ---- Used by the request handler ----------------------------------------
+    def _since(self, k):
+        with self._cond:
+            return [h for h in self.history if h[0] > k]
+
+    def _connect(self, every, since):
+        client = _Client(self.client_queue, every)
+        with self._cond:
+            if since is not None:
+                for k, payload, frame in self.history:
+                    if k > since:
+                        client.offer(frame)
+            self.clients.add(client)
+        return client
+
+    def _disconnect(self, client):
+        with self._cond:
+            self.clients.discard(client)
+            self.dropped += client.dropped
+
+    def _next_frames(self, client):
+        # Wait for frames; [] on keepalive timeout, None once closed
+        with self._cond:
+            if not client.frames and not self.closed:
+                self._cond.wait(KEEPALIVE)
+            if self.closed:
+                return None
+            frames = list(client.frames)
+            client.frames.clear()
+        return frames
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass # Keep the console for the station display
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        live = self.server.live
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if url.path == "/events":
+                since = query.get("since", self.headers.get("Last-Event-ID"))
+                self._events(live, int(query.get("every", 1)),
+                             None if since is None else int(since))
+            elif url.path == "/replay":
+                if "since" in query:
+                    rows = live._since(int(query["since"]))
+                else:
+                    last = max(0, int(query.get("last", len(live.history))))
+                    rows = live._since(-1)
+                    rows = rows[len(rows) - last:] if last < len(rows) else rows
+                self._send(b"".join(payload + b"\n" for k, payload, frame in rows),
+                           "application/x-ndjson")
+            elif url.path == "/latest":
+                rows = live._since(live.published - 2)
+                self._send(rows[-1][1] if rows else b"{}", "application/json")
+            elif url.path == "/":
+                self._send(PAGE, "text/html; charset=utf-8")
+            else:
+                self.send_error(404)
+        except ValueError:
+            self.send_error(400)
+
+    def _events(self, live, every, since):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.close_connection = True
+        client = live._connect(every, since)
+        try:
+            while True:
+                frames = live._next_frames(client)
+                if frames is None:
+                    break
+                self.wfile.write(b"".join(frames) if frames else b": keepalive\n\n")
+                self.wfile.flush()
+                client.sent += len(frames)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            live._disconnect(client)
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    import labjack_functions as ljf
+    import sim_ljm
+    import station
+    from channel_map import ChannelMap
+
+    # Serve synthetic station records (simulated device, 1 record per second)
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    channel_map = ChannelMap.load()
+    session = ljf.LabJackSession(backend=sim_ljm.SimLJM(channel_map, seed=0))
+    channel_map.configure(session)
+    live = LiveServer(port).start()
+    print("Serving on http://127.0.0.1:{}/ (Ctrl+C to stop)".format(live.port))
+    start = time.monotonic()
+    try:
+        while True:
+            elapsed = time.monotonic() - start
+            data = station.compute_record(channel_map.read_scan(session),
+                                          time.strftime("%H:%M:%S"), round(elapsed/60, 2))
+            live.publish(dict(zip(station.HEADERS, data)))
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        live.close()
+        print(live.stats())
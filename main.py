@@ -1,40 +1,203 @@
-import sys
+"""
+Description:
+The logging station: reads every sensor of the channel map on a drift-free
+schedule, computes flow and heat gain per scan (station.py) and logs /
+displays / publishes the records through a threaded pipeline. Nothing runs
+at import; `python main.py` shows the start menu as before, and
+airflow_station.py exposes the same runs as the `log`, `idle` and `probe`
+subcommands.
+
+Usage:
+    python main.py [1] [--log | --idle] [options, see --help]
+
+Dependencies:
+    - labjack_functions, station, channel_map, pipeline, log_writer, binlog,
+      rolling_stats, history, metrics, energy
+    - sim_ljm, stream, live_server, uncertainty, adaptive (only when their
+      option is used)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import argparse
 import os
-import csv
 import time
 from datetime import date, datetime
-import labjack
 import labjack_functions as ljf
-import systemCalcs as calc
-#______________________________________________________________________________
-#
-# Check for system inputs - If no system inputs provided, continue w/ main prompt
-if len(sys.argv) > 1:
-    # an argument was passed. The first argument specifies the user input.
+import metrics
+import station
+from channel_map import ChannelMap
+from pipeline import Pipeline
+from log_writer import LogWriter
+from binlog import BinaryLogWriter
+from rolling_stats import SteadyState, load_criteria
+from history import History, DEFAULT_TIERS
+from energy import EnergyIntegrator, ENERGY_HEADERS, max_gap_for
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+STREAM_RATE = 2000 # scans/s per channel in stream mode
+# Log rows are written/fsync'ed in batches: whichever budget is reached first
+LOG_FLUSH_ROWS = 12
+LOG_FLUSH_SECONDS = 30
+FILE_LETTERS = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i']
+DATA_DIR = os.path.join(os.pardir, 'Data') # next to the program folder
+
+
+def add_run_options(parser):
+    # Options of a logging / idle run (shared with airflow_station.py)
+    parser.add_argument("--stream", action="store_true",
+                        help="stream the analog channels at kHz and log block averages")
+    parser.add_argument("--interval", type=float, default=5.0, metavar="SEC",
+                        help="logging interval in seconds (default 5, sub-second ok)")
+    parser.add_argument("--adaptive", type=adaptive_rates, metavar="FAST:SLOW",
+                        help="adaptive interval, e.g. 1:10: FAST s while T_exh, pdiff or "
+                             "Total HG are changing, SLOW s once settled (replaces --interval)")
+    parser.add_argument("--adaptive-hold", type=float, default=120.0, metavar="SEC",
+                        help="quiet time before switching back to the slow rate (default 120)")
+    parser.add_argument("--timing", action="store_true",
+                        help="add scan jitter / latency [ms] columns to the log")
+    parser.add_argument("--binlog", action="store_true",
+                        help="also write a columnar binary log (.aslog, see binlog.py)")
+    parser.add_argument("--steady-window", type=float, default=30.0, metavar="MIN",
+                        help="window for the steady-state check (default 30 min)")
+    parser.add_argument("--steady-criteria", type=steady_criteria, metavar="SPEC",
+                        help='steady-state limits, "column=max_std:max_slope_per_min,..." or a '
+                             '.csv / .json file (replaces the defaults in rolling_stats.py)')
+    parser.add_argument("--devices", metavar="CSV",
+                        help="read several T7s in parallel (name,identifier,connection,channel_map; "
+                             "see devices.py): the first is the station, the others are logged")
+    parser.add_argument("--data-dir", default=DATA_DIR,
+                        help="folder for the log files (default ../Data)")
+    sim = parser.add_argument_group("simulated device (no T7, see sim_ljm.py)")
+    sim.add_argument("--simulate", metavar="SRC",
+                     help='"synthetic" data or a recorded log (xlsx / csv)')
+    sim.add_argument("--speed", type=float, default=1.0,
+                     help="simulated seconds per real second (default 1)")
+    sim.add_argument("--duration", type=float, metavar="HOURS",
+                     help="stop after this much (simulated) test time")
+    sim.add_argument("--sim-latency", type=float, default=0.0, metavar="MS",
+                     help="read latency of the simulated device")
+    sim.add_argument("--sim-errors", type=float, default=0.0, metavar="P",
+                     help="probability of a read failing (reconnect + retry)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="no per-scan console display (soak tests)")
+    parser.add_argument("--history-hours", type=float, default=0.0, metavar="H",
+                        help="keep every scan in memory for the last H hours, plus "
+                             "1 s / 1 min / 10 min averages, for a whole-test summary "
+                             "at the end (default 0: off)")
+    parser.add_argument("--energy", action="store_true",
+                        help="log running Btu totals and checkpoint them to <log>.energy.json")
+    parser.add_argument("--resume-energy", metavar="JSON",
+                        help="continue the Btu totals of an interrupted test from its checkpoint")
+    parser.add_argument("--checkpoint-every", type=float, default=60.0, metavar="SEC",
+                        help="test time between energy checkpoints (default 60)")
+    parser.add_argument("--uncertainty", choices=("linear", "mc"),
+                        help="add the standard uncertainty of flow and heat gain per scan, "
+                             "first order or Monte Carlo (uncertainty_specs.csv)")
+    parser.add_argument("--mc-draws", type=int, default=2000, metavar="N",
+                        help="Monte Carlo draws per scan (default 2000)")
+    parser.add_argument("--metrics", action="store_true",
+                        help="time every stage (LJM calls, calculations, log writes); "
+                             "summary printed every --metrics-every SEC, kept in <log>.metrics.json")
+    parser.add_argument("--metrics-every", type=float, default=60.0, metavar="SEC")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="also serve them at http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--live", type=int, metavar="PORT",
+                        help="publish every record to dashboards (SSE, see live_server.py)")
+    parser.add_argument("--live-host", default="127.0.0.1", metavar="HOST",
+                        help="interface to listen on (0.0.0.0 for dashboards on other computers)")
+    return parser
+
+def adaptive_rates(spec):
+    from adaptive import parse_rates
+    try:
+        return parse_rates(spec)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected FAST:SLOW seconds with 0 < FAST <= SLOW")
+
+def steady_criteria(spec):
     try:
-        arg1 = int(sys.argv[1])
-        if arg1 == 1:
-            test = input("""What feature would you like to test?
+        criteria = load_criteria(spec)
+    except (ValueError, TypeError, OSError):
+        raise argparse.ArgumentTypeError('expected "column=max_std:max_slope,..." or a .csv / .json file')
+    unknown = [name for name in criteria if name not in station.HEADERS[2:]]
+    if unknown:
+        raise argparse.ArgumentTypeError("no such column: {}".format(", ".join(unknown)))
+    return criteria
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Airflow station logger")
+    parser.add_argument("feature", nargs="?",
+                        help="1: check a single input channel, then exit")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--log", action="store_true", help="official test with data logging (no menu)")
+    mode.add_argument("--idle", action="store_true", help="idle test, no logging (no menu)")
+    return add_run_options(parser)
+
+def clear_screen():
+    os.system('cls' if os.name == 'nt' else 'clear')
+
+
+# ---- Device -----------------------------------------------------------------
+def open_device(opts):
+    # Channel map, plus a simulated device with its own (possibly
+    # accelerated) clock for --simulate, plus the devices.DeviceRegistry of
+    # --devices (its first device is the station). Returns
+    # (channel_map, clock, sim, registry).
+    channel_map = ChannelMap.load()
+    clock = sim = registry = None
+    if opts.simulate:
+        import sim_ljm
+        clock = sim_ljm.SimClock(opts.speed)
+
+        def simulated(cmap):
+            return sim_ljm.SimLJM(cmap, sim_ljm.make_source(opts.simulate), clock,
+                                  latency=opts.sim_latency/1000, error_rate=opts.sim_errors)
+    if opts.devices:
+        from devices import DeviceRegistry
+        spec = DeviceRegistry.read_csv(opts.devices)
+        backends = {}
+        if opts.simulate:
+            backends = {name: simulated(ChannelMap.load(entry["channel_map"])
+                                        if entry["channel_map"] else ChannelMap.load())
+                        for name, entry in spec.items()}
+        registry = DeviceRegistry.from_dict(spec, backends)
+        station_device = next(iter(registry))
+        channel_map = station_device.channel_map
+        missing = [name for name in station.SCAN_CHANNELS
+                   if name not in [c.name for c in channel_map]]
+        if missing:
+            raise ValueError("Station device \"{}\" has no {} channel(s)".format(
+                station_device.name, ", ".join(missing)))
+        ljf.set_session(station_device.session)
+        sim = backends.get(station_device.name)
+    elif opts.simulate:
+        sim = simulated(channel_map)
+        ljf.set_session(ljf.LabJackSession(backend=sim))
+    return channel_map, clock, sim, registry
+
+def probe():
+    # Check a single input channel (interactive)
+    test = input("""What feature would you like to test?
         (1) Analog Input
         (2) Thermocouple\n""")
-            arg2 = int(input("Positive Input Channel? (1, 2, 3, etc.)\n"))
-            arg3 = int(input("Negative Input Channel if applicable? (199 for GND)\n"))
-            arg4 = float(input("Voltage range if applicable?\n"))
-            if test == '1':
-                t_result = ljf.aiRead(arg2, arg3, arg4)
-                print(t_result)
-            elif test == '2':
-                t_result = ljf.tempRead_TC(arg2, arg3)
-            else:
-                pass
-        else:
-            pass
-    except:
-        raise Exception("Invalid first argument \"{}\"".format(str(sys.argv[1])))
-else:
-    os.system('cls') # clear terminal screen: for linux/Mac - os.system('clear')
-    arg1 = "None"
-    start_input = input("""
+    arg2 = int(input("Positive Input Channel? (1, 2, 3, etc.)\n"))
+    arg3 = int(input("Negative Input Channel if applicable? (199 for GND)\n"))
+    if test == '1':
+        arg4 = float(input("Voltage range if applicable?\n"))
+        t_result = ljf.aiRead(arg2, arg3, arg4)
+    elif test == '2':
+        t_result = ljf.tempRead_TC(arg2, arg3)
+    else:
+        return None
+    print(t_result)
+    return t_result
+
+
+# ---- Start menu / log file ----------------------------------------------------
+def menu():
+    clear_screen()
+    return input("""
                 WELCOME TO THE BOOTLEG CKV PROGRAM!
                 -----------------------------------
 Of the options below, please select a test to begin:
@@ -44,185 +207,315 @@ Of the options below, please select a test to begin:
 
 """)
 
-    if start_input == '2': 
-
-        # Create Data directory if not exist
-        os.system('cls')
-        os.chdir('..')
-        current_directory = os.getcwd()
-        if not os.path.exists(current_directory + '/Data'):
-            os.mkdir(current_directory + '/Data')
-            print('New Data directory added...\n')
-
-        # Create unique data file
-        os.chdir(current_directory + '/Data')
-        file_letter = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i']
-        file_date = date.today().strftime("%m-%d-%y")
-
-        headers = ["Time of Day", "Test Time", "Tdb_Lab", "Tdb_room:", "Tdb_exh", 
-                   "Tdew_room", "Tdew_exh", "Pbar_inHg", "Pdif_exh", "pp_water_supsys1", 
-                   "pp_sat_supsys1", "pp_water_exh", "pp_sat_exh", "W_room", "W_exh", 
-                   "rho_room", "rho_exh", "rh_room", "rh_exh", "V_exh", "Q_Acfm", 
-                   "Q_Scfm", "Sensible HG", "Latent HG", "Total HG"]
-        for i in range(len(file_letter)):
-            if not os.path.isfile(os.getcwd() + '/' + file_date + file_letter[i] + ".csv"):
-                file_name = file_date + file_letter[i] + ".csv"
-                print("Adding new file: {}\n".format(file_name))
-                break
-            elif i == (len(file_letter)-1):
-                file_name = input("Maximum default names achieved.\n User input file name:\n")+".csv"
-                print("Adding new file: {}\n".format(file_name))
+def new_log_file(data_dir=DATA_DIR):
+    # Unique data file for today: <mm-dd-yy><letter>.csv in data_dir
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+        print('New Data directory added...\n')
+    file_date = date.today().strftime("%m-%d-%y")
+    for i in range(len(FILE_LETTERS)):
+        if not os.path.isfile(os.path.join(data_dir, file_date + FILE_LETTERS[i] + ".csv")):
+            file_name = file_date + FILE_LETTERS[i] + ".csv"
+            break
+        elif i == (len(FILE_LETTERS)-1):
+            file_name = input("Maximum default names achieved.\n User input file name:\n")+".csv"
+    print("Adding new file: {}\n".format(file_name))
+    return os.path.join(data_dir, file_name), file_date
 
-        with open(file_name, 'a') as file_data:
-            csvWriter = csv.writer(file_data, delimiter=',')
-            csvWriter.writerow([file_date])
-            csvWriter.writerow(headers)
 
-    elif start_input == '1':
-        os.system('cls') # clear terminal screen: for linux/Mac - os.system('clear')
-        print("Starting Idle Test...")
+###############################################################################
+############### OFFICIAL TEST LOGGING SEQUENCE ################################
+###############################################################################
+# Acquisition, computation and logging/display run as a threaded pipeline
+# (see pipeline.py) so slow disk or console I/O never delays sampling.
+def run(opts, file_name=None, file_date=None, device=None):
+    # file_name: csv log (None: idle test); device: open_device() result
+    channel_map, clock, sim, registry = device or open_device(opts)
+    # Raw channels: the station's, or "<device>/<channel>" of every device
+    raw_names = [c.name for c in channel_map] if registry is None else \
+        [d.name + "/" + c.name for d in registry for c in d.channel_map]
+    # Channels of the other devices are logged as they are
+    device_headers = raw_names[len(channel_map.channels):] if registry is not None else []
+    headers = station.HEADERS + station.ELAPSED_HEADERS \
+        + (station.TIMING_HEADERS if opts.timing else []) \
+        + (station.ADAPTIVE_HEADERS if opts.adaptive else []) \
+        + (ENERGY_HEADERS if opts.energy or opts.resume_energy else []) \
+        + device_headers \
+        + (station.UNCERTAINTY_HEADERS if opts.uncertainty else [])
+    # Time source: the wall/monotonic clocks, or the simulated clock
+    wall_time, monotonic, sim_sleep = time.time, time.monotonic, None
+    if clock is not None:
+        wall_time, monotonic, sim_sleep = clock.time, clock.monotonic, clock.sleep
+
+    log = binlog = reporter = live = None
+    if file_name is not None:
+        # Log stays open for the whole test; rows are batched and fsync'ed
+        log = LogWriter(file_name, flush_rows=LOG_FLUSH_ROWS, flush_seconds=LOG_FLUSH_SECONDS,
+                        clock=monotonic)
+        log.writerow([file_date or date.today().strftime("%m-%d-%y")])
+        log.writerow(headers)
+        log.flush()
+
+    # Sensor channels are configured once per (re)connect and read in one scan
+    session = ljf.get_session()
+    channel_map.configure(session)
+    if opts.stream:
+        # Analog inputs are streamed and averaged per interval; TCs stay polled
+        from stream import StreamAcquisition
+        polled_map = channel_map.subset(kinds=("tc",))
+        stream = StreamAcquisition(session, channel_map.subset(kinds=("voltage", "current")),
+                                   STREAM_RATE)
+        stream.start()
+    if opts.binlog and log is not None:
+        binlog = BinaryLogWriter(os.path.splitext(file_name)[0] + ".aslog",
+                                 station.binary_columns(raw_names))
+
+    if opts.metrics:
+        metrics.enable()
+        if opts.metrics_port is not None:
+            metrics.serve(opts.metrics_port)
+        reporter = metrics.Reporter(opts.metrics_every, os.path.splitext(file_name)[0] + ".metrics.json"
+                                    if log is not None else None).start()
+
+    if opts.live is not None:
+        from live_server import LiveServer
+        live = LiveServer(opts.live, opts.live_host).start()
+        print("Live data at http://{}:{}/".format(opts.live_host, live.port))
 
+    if opts.uncertainty:
+        import uncertainty
+        sensor_specs = uncertainty.SensorSpecs.load()
+
+    # Adaptive rate: buffers are sized for the fast interval, the test starts fast
+    interval = opts.interval
+    rate = None
+    if opts.adaptive:
+        from adaptive import AdaptiveInterval
+        rate = AdaptiveInterval(*opts.adaptive, hold=opts.adaptive_hold)
+        interval = rate.interval
+    last_scan = [None] # test time of the previous scan [s]
+
+    # Heat gain energy totals (trapezoidal over the measured test time); a
+    # resumed test continues the totals of the checkpoint. Steps up to a few
+    # of the slowest scan intervals are integrated, longer ones are gaps.
+    max_gap = max_gap_for(opts.adaptive[1] if opts.adaptive else opts.interval)
+    checkpoint = None
+    if (opts.energy or opts.resume_energy) and log is not None:
+        checkpoint = os.path.splitext(file_name)[0] + ".energy.json"
+    if opts.resume_energy:
+        energy = EnergyIntegrator.load(opts.resume_energy, checkpoint, opts.checkpoint_every).resume()
+        energy.max_gap = max_gap
+        print("Resuming energy totals: {}".format(", ".join(
+            "{} {:.1f}".format(h, x) for h, x in zip(ENERGY_HEADERS, energy.row()))))
     else:
-        print("A valid input was not provided.")
+        energy = EnergyIntegrator(max_gap=max_gap, checkpoint=checkpoint, every=opts.checkpoint_every)
 
-def write_data(file_name, data):
-    with open(file_name, 'a', newline='') as f:
-        csvWriter = csv.writer(f, delimiter=',')
-        csvWriter.writerow(data)
+    # Rolling statistics / steady-state check on every derived quantity
+    steady = SteadyState(opts.steady_window, interval, opts.steady_criteria,
+                         columns=station.HEADERS[2:])
+    # Fixed-memory history of raw + derived values (opt-in); tiers finer than
+    # the scan interval would only repeat the raw scans
+    history = None
+    if opts.history_hours > 0:
+        history = History(station.binary_columns(raw_names)[2:], opts.history_hours,
+                          interval, [tier for tier in DEFAULT_TIERS if tier[0] > interval]
+                          or DEFAULT_TIERS[-1:])
 
-###############################################################################
-############### OFFICIAL TEST LOGGING SEQUENCE ################################
-###############################################################################
-test_time = 0
-while True:
-    tic = time.time()
-    data = []
-    # 1.) Timestamp
-    tod = datetime.now()
-    now = tod.strftime("%H:%M:%S")
-    # 2.) Test Time
-    test_time_min = round(test_time / 60, 2)
- 
-    try:
-        # 3.) Room Dry Bulb Temperature
-        T_room = ljf.tempRead_TC(6, 7, -3, 24)
-        # 4.) Exhaust Dry Bulb Temperature
-        T_exh = ljf.tempRead_TC(2, 3, 1)
-        # 5.) Dew Point - Supply/Room
-        Tdew_room = 51.8 #ljf.tempRead_TC(0, 1)
-        # 6.) Dew Point - Exhaust
-        Tdew_exh_mA = ljf.aiCurrent(11)[1] # (ch 11) Current -> Voltage using LJTick-Current Shunt
-        Tdew_exh = round(calc.DP_DewTran(Tdew_exh_mA, -40, 60), 2) # (SigOUT, lo-range, hi-range in celsius)
-        # 7.) Barometric Pressure
-        Pbar_V = ljf.aiRead(12, 199, 5.0) # (channel 2, 199-GND, 5V Range) Setra Bar Press. Transducer
-        Pbar = (80*Pbar_V + 798.95) # Barometric Pressure in mbar 
-        Pbar_inHg = round(Pbar/33.864, 2)
-        # 8.) Differential Pressure - Velocity Pressure
-        pdiff_exh_mA = ljf.aiCurrent(10)[1] #(ch 10) Current -> Voltage using LJTick-Current Shunt
-        pdiff_exh = round(calc.pdiff_setra(pdiff_exh_mA, 0, 0.5), 3) + 0.003 # + offset (SigOUT, lo-range, hi-range)
-        #************ Calculate air flow, and psychrometrics *********************
-        # 9.) Partial Pressure Water Vapor (Calculated)
-        pp_water_supsys1 = calc.Pp(Tdew_room)
-        # 10.) Saturation Partial Pressure (at Dry bulb Temp)
-        pp_sat_supsys1 = calc.Pp(T_room)
-        # 11.) Partial Pressure Water Vapor (Calculated)
-        pp_water_exh = calc.Pp(Tdew_exh)
-        # 12.) Saturation Partial Pressure (at Dry bulb Temp)
-        pp_sat_exh = calc.Pp(T_exh)
-        # 13.) Humidity Ratio - Supply/Room
-        W_room = calc.W(Pbar_inHg, pp_water_supsys1)
-        # 14.) Humidity Ratio - Exhaust
-        W_exh = calc.W(Pbar_inHg, pp_water_exh)
-        # 15.) Calculated Air Density - Room/Supply System 1
-        rho_room = calc.rho(Pbar, T_room, W_room) 
-        # 16.) Calculated Air Density - Exhaust
-        rho_exh = calc.rho(Pbar, T_exh, W_exh)
-        # 17.) Calculated %RH - Room/Supply System 1
-        rh_room = calc.RH(pp_water_supsys1, pp_sat_supsys1)
-        # 18.) Calculated %RH - Exhaust
-        rh_exh = calc.RH(pp_water_exh, pp_sat_exh)
-        # 19.) Air Velocity
-        V_exh = calc.velocity(pdiff_exh, rho_exh)
-        # 20.) Actual Measured Flow [Acfm] - 8in diameter (7.87 ID) duct for Starbucks Heat Gain Testing
-        Q_Acfm = round(calc.QflowActual(V_exh, 7.87), 2)
-        # 21.) Standard Air Corrected Flow [Scfm]
-        Q_Scfm = round(calc.QflowStandard(Q_Acfm, Pbar_inHg, T_exh), 2)
-        # 22.) Sensible Heat Gain [Btu/h] (approx.)
-        q_sensible =  round(1.08 * Q_Scfm * (T_exh - T_room), 1)
-        # 23.) Latent Heat Gain [Btu/h] (approx.) 
-        q_latent = round(4840 * Q_Scfm * (W_exh - W_room), 1)
-        # 24.) Total Heat Gain [Btu/h]
-        q_total = round(q_sensible + q_latent, 1)
-        # 25.) Lab Temp
-        T_lab = ljf.tempRead_TC(0, 1)
-    except labjack.ljm.ljm.LJMError:
-        print("Your device has been disconnected. Please reconnect!")
-        data.append(now)
-        data.append(test_time_min)
-        for i in range(23):
-            data.append('OPEN')
-    except Exception as e:
-        print(e)
-    else:    
-        data.append(now)                # 0
-        data.append(test_time_min)      # 1
-        data.append(T_lab)              # 2
-        data.append(T_room)             # 3
-        data.append(T_exh)              # 4
-        data.append(Tdew_room)          # 5
-        data.append(Tdew_exh)           # 6
-        data.append(Pbar_inHg)          # 7
-        data.append(round(pdiff_exh,2)) # 8
-        data.append(pp_water_supsys1)   # 9
-        data.append(pp_sat_supsys1)     # 10
-        data.append(pp_water_exh)       # 11
-        data.append(pp_sat_exh)         # 12
-        data.append(W_room)             # 13
-        data.append(W_exh)              # 14
-        data.append(rho_room)           # 15
-        data.append(rho_exh)            # 16
-        data.append(rh_room)            # 17
-        data.append(rh_exh)             # 18
-        data.append(V_exh)              # 19
-        data.append(Q_Acfm)             # 20
-        data.append(Q_Scfm)             # 21
-        data.append(q_sensible)         # 22
-        data.append(q_latent)           # 23
-        data.append(q_total)            # 24
-
-# ---- Write data to .csv file ----------
-    if start_input == '2':
+    # Several devices: one reader thread each, all read on the same tick
+    daq = None
+    if registry is not None:
+        from devices import MultiDeviceAcquisition
+        daq = MultiDeviceAcquisition(registry, clock)
+        station_device = next(iter(registry)).name
+
+    def acquire(tick):
+        # Acquisition stage: timestamp and read one scan (station scan, raw
+        # channels to log)
+        stamp = wall_time()
+        if daq is not None:
+            record = daq.acquire(tick)
+            return stamp, record["devices"][station_device], record["scan"], tick, \
+                monotonic() - tick.start
         try:
-            write_data(file_name, data)
-        except Exception as e:
-            print(e)
-    else: 
+            # All channels in one eReadNames round trip (see channel_map.csv)
+            if opts.stream:
+                scan = polled_map.read_scan(session)
+                with metrics.timer("stream.reduce"):
+                    stream_stats = stream.reduce()
+                for name, stats in stream_stats.items():
+                    scan[name] = stats["mean"]
+            else:
+                scan = channel_map.read_scan(session)
+        except session.ljm.LJMError:
+            print("Your device has been disconnected. Please reconnect!")
+            scan = None
+        return stamp, scan, scan, tick, monotonic() - tick.start
+
+    def compute(item):
+        # Compute stage: flow and psychrometrics (see station.py)
+        stamp, scan, raw, tick, read_time = item
+        # 1.) Timestamp
+        now = datetime.fromtimestamp(stamp).strftime("%H:%M:%S")
+        # 2.) Test Time - measured on the monotonic clock, not counted
+        test_time_min = round(tick.elapsed / 60, 2)
+        if scan is None:
+            data = station.open_record(now, test_time_min)
+        else:
+            data = station.compute_record(scan, now, test_time_min)
+            steady.add(tick.elapsed, data[2:len(station.HEADERS)])
+            with metrics.timer("energy.add"):
+                energy.add(tick.elapsed, {"Sensible HG": data[22], "Latent HG": data[23],
+                                          "Total HG": data[24]})
+        data.append(round(tick.elapsed, 3))
+        if opts.timing:
+            data += [round(tick.jitter*1000, 1), round(read_time*1000, 1)]
+        if rate is not None:
+            if scan is not None:
+                pipeline.scheduler.set_interval(rate.update(tick.elapsed, {
+                    "T_exh": scan["T_exh"], "pdiff_exh": station.pdiff_unrounded(scan),
+                    "Total HG": data[24]}))
+            step = tick.elapsed - last_scan[0] if last_scan[0] is not None else 0.0
+            data.append(round(step, 3))
+        last_scan[0] = tick.elapsed
+        if opts.energy or opts.resume_energy:
+            data += energy.row()
+        if device_headers:
+            data += [raw.get(name, 'OPEN') for name in device_headers]
+        if opts.uncertainty:
+            if scan is None:
+                data += ['OPEN']*len(station.UNCERTAINTY_HEADERS)
+            else:
+                with metrics.timer("calc.uncertainty"):
+                    u = uncertainty.propagate(station.chain_inputs(scan, data), opts.uncertainty,
+                                              sensor_specs, opts.mc_draws,
+                                              outputs=station.UNCERTAINTY_OUTPUTS)
+                data += [round(float(u["u:" + out]), 2 if out == "Q_Scfm" else 1)
+                         for out in station.UNCERTAINTY_OUTPUTS]
+        row = station.binary_row(stamp, tick.elapsed, scan, data, raw)
+        if history is not None:
+            with metrics.timer("history.add"):
+                history.add(tick.elapsed, row)
+        return data, tick.start, row
+
+    def log_record(record):
+        # ---- Write data to .csv file ----------
+        if log is not None:
+            with metrics.timer("log.csv"):
+                log.writerow(record[0])
+        if binlog is not None:
+            with metrics.timer("log.binlog"):
+                binlog.append(record[2])
+
+    def publish(record):
+        # ---- Live dashboards (one shared frame for all clients) ----------
+        with metrics.timer("live.publish"):
+            live.publish(dict(zip(headers, record[0])))
+
+    def display(record):
+        data, tic = record[:2]
+        process_time = round(monotonic() - tic, 3)
+        lap = metrics.laps()
+        print(station.format_display(data, process_time))
+        mean, std, slope = steady.status(["Sensible HG"])["Sensible HG"]
+        print("    Steady state:       {}   (Sensible HG {:.0f} +/- {:.0f} Btu/h, {:+.1f} /min)".format(
+            "YES" if steady.steady else "no", mean, std, slope))
+        if rate is not None:
+            print("    Scan interval:      {} s ({})".format(
+                rate.interval, "transient" if rate.fast else "settled"))
+        print("    Energy:             {:.0f} / {:.0f} / {:.0f} Btu".format(*energy.row()))
+        if opts.uncertainty:
+            print("    Uncertainty (k=1):  +/- {} Scfm, {} / {} / {} Btu/h".format(*data[-4:]))
+        stats = pipeline.stats()
+        print("    Queues: {compute_queue}/{output_queue}   Dropped: {dropped_compute}/{dropped_output}"
+              "   Missed ticks: {missed_ticks}".format(**stats))
+        lap("display")
+
+    sinks = [log_record]
+    if live is not None:
+        sinks.append(publish)
+    if not opts.quiet:
+        sinks.append(display)
+    pipeline = Pipeline(acquire, compute, sinks, interval, clock=monotonic, sleep=sim_sleep)
+    pipeline.start()
+    try:
+        while pipeline.running():
+            if opts.duration is not None and pipeline.scheduler.start is not None \
+                    and monotonic() - pipeline.scheduler.start >= opts.duration*3600:
+                break
+            time.sleep(0.1 if opts.simulate else 1)
+    except KeyboardInterrupt:
         pass
-# ---------------------------------------
-    test_time += 5
-    toc = time.time()
-    process_time = round(toc-tic, 3)
-
-    print("""
-    Time:               {}
-    Test Time:          {} min 
-    Process Time:       {} sec 
-    Room Temp:          {} F
-    Exhaust Temp:       {} F
-    Room Dewpoint:      {} F
-    Exh. Dewpoint:      {} F
-    Barometric Press.:  {} inHg
-    Velocity Press.:    {} inWc
-    Exhaust Flow:       {} Acfm 
-                        {} Scmf
-    Sensible Heat Gain: {} Btu/h
-    Latent Heat Gain:   {} Btu/h
-    Total Heat Gain:    {} Btu/h
-    """.format(data[0], data[1], process_time, data[3], data[4], data[5], data[6],
-               data[7], data[8], data[20], data[21], data[22], data[23], data[24]))
-    
-    t_delay = 5 - process_time
-    time.sleep(t_delay)
+    finally:
+        pipeline.stop()
+        if daq is not None:
+            daq.close()
+            print("Devices: {} read(s) late, {} tick(s) skipped while busy".format(daq.late, daq.busy))
+        if opts.stream:
+            stream.stop()
+            print("Stream: {} restart(s) after reconnects, {} samples overrun".format(
+                stream.restarts, stream.buffer.overruns))
+        if log is not None:
+            log.close()
+        if binlog is not None:
+            binlog.close()
+        if reporter is not None:
+            reporter.stop()
+        if live is not None:
+            live.close()
+        print("Pipeline stats: {}".format(pipeline.stats()))
+        print(pipeline.scheduler.report())
+        print(steady.report())
+        if checkpoint is not None and energy.n:
+            energy.save()
+        print(energy.report())
+        if rate is not None:
+            print(rate.report())
+        if history is not None:
+            print("History: {} scans in memory ({:.1f} MB preallocated)".format(
+                len(history.raw), history.nbytes/1e6))
+            for name in ("Q_Scfm", "Total HG"):
+                print("  {:12s} whole test mean {:.1f}, min {:.1f}, max {:.1f}".format(
+                    name, *history.summary(name)))
+        if sim is not None:
+            print("Simulated device: {} reads, {} injected errors, {} reconnects".format(
+                sim.read_calls, sim.injected_errors, session.reconnects))
+    return pipeline.stats()
+
+
+def main(argv=None):
+    parser = build_parser()
+    opts = parser.parse_args(argv)
+    if opts.devices and opts.stream:
+        parser.error("--stream reads a single device, not --devices")
+    device = open_device(opts)
+    # Check for system inputs - If no system inputs provided, continue w/ main prompt
+    if opts.feature is not None:
+        # The first argument specifies the user input
+        try:
+            feature = int(opts.feature)
+        except ValueError:
+            raise Exception("Invalid first argument \"{}\"".format(opts.feature))
+        if feature == 1:
+            probe()
+        return
+    if opts.log:
+        start_input = '2'
+    elif opts.idle:
+        start_input = '1'
+    else:
+        start_input = menu()
 
+    if start_input == '2':
+        clear_screen()
+        file_name, file_date = new_log_file(opts.data_dir)
+        run(opts, file_name, file_date, device)
+    elif start_input == '1':
+        clear_screen() # clear terminal screen
+        print("Starting Idle Test...")
+        run(opts, device=device)
+    else:
+        print("A valid input was not provided.")
 
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+Description:
+Hot-path timing instrumentation. Stages (LJM calls, scan reads, calculation
+steps, log writes) are timed with a context manager or a decorator and
+collected into one fixed-bucket histogram per stage:
+
+    with metrics.timer("calc.Pp"):
+        ...
+
+    @metrics.timed("lj.tempRead_TC")
+    def tempRead_TC(...):
+
+    lap = metrics.laps()    # consecutive steps of one function
+    ...
+    lap("calc.Pp")
+
+Timing is off until enable() is called. While disabled, timer() hands back a
+shared no-op context manager, laps() a no-op function and timed() functions
+only check a flag, so the instrumentation can stay in the acquisition loop
+permanently.
+
+The histograms are exported as a text summary, a JSON sidecar file (written
+atomically) and, optionally, a Prometheus-style text endpoint served from a
+background thread (http://127.0.0.1:<port>/metrics). Reporter does the first
+two periodically.
+
+Dependencies:
+    - scheduler (Histogram)
+    - http.server, json, threading (standard library)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import functools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from scheduler import Histogram
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Bucket upper edges [ms]; finer than the scan histograms since calculation
+# stages take microseconds
+BUCKETS_MS = [0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50,
+              100, 200, 500, 1000, 2000, 5000]
+
+_enabled = False
+_stages = {}
+_lock = threading.Lock()
+_started = time.time()
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def enabled():
+    return _enabled
+
+def reset():
+    global _started
+    with _lock:
+        _stages.clear()
+        _started = time.time()
+
+def record(stage, seconds):
+    with _lock:
+        h = _stages.get(stage)
+        if h is None:
+            h = _stages[stage] = Histogram(BUCKETS_MS)
+        h.add(seconds)
+
+
+class _Timer:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.t0)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+def timer(stage):
+    return _Timer(stage) if _enabled else _NULL_TIMER
+
+def _no_lap(stage):
+    pass
+
+def laps():
+    # Sequential stages: lap(stage) records the time since the previous lap
+    # (or since laps() was called)
+    if not _enabled:
+        return _no_lap
+    last = [time.perf_counter()]
+
+    def lap(stage):
+        now = time.perf_counter()
+        record(stage, now - last[0])
+        last[0] = now
+    return lap
+
+def timed(stage=None):
+    # Decorator; the stage defaults to module.function
+    def decorate(func):
+        name = stage or "{}.{}".format(func.__module__, func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - t0)
+        return wrapper
+    return decorate
+
+
+# ---- Export -----------------------------------------------------------------
+def snapshot():
+    # stage -> {n, total_ms, mean_ms, min_ms, p50_ms, p99_ms, max_ms, buckets}
+    with _lock:
+        stages = {}
+        for stage, h in sorted(_stages.items()):
+            stages[stage] = {"n": h.n, "total_ms": h.total, "mean_ms": h.mean(),
+                             "min_ms": h.min, "p50_ms": h.percentile(50),
+                             "p99_ms": h.percentile(99), "max_ms": h.max,
+                             "buckets": list(zip(h.edges + ["inf"], h.counts))}
+    return {"since": _started, "time": time.time(), "stages": stages}
+
+def summary():
+    snap = snapshot()
+    if not snap["stages"]:
+        return "Stage timing: no samples"
+    lines = ["Stage timing ({:.0f} s)".format(snap["time"] - snap["since"]),
+             "  {:28s} {:>8s} {:>10s} {:>10s} {:>10s} {:>10s}".format(
+                 "stage", "n", "mean ms", "p50 ms", "p99 ms", "max ms")]
+    for stage, s in snap["stages"].items():
+        lines.append("  {:28s} {:8d} {:10.3f} {:10.3f} {:10.3f} {:10.3f}".format(
+            stage, s["n"], s["mean_ms"], s["p50_ms"], s["p99_ms"], s["max_ms"]))
+    return "\n".join(lines)
+
+def write_file(path):
+    # JSON sidecar; written to a temporary file and renamed into place
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(snapshot(), f, indent=1)
+    os.replace(tmp, path)
+
+def prometheus_text(prefix="station_stage_seconds"):
+    lines = ["# HELP {} Time spent per acquisition / calculation stage".format(prefix),
+             "# TYPE {} histogram".format(prefix)]
+    with _lock:
+        for stage, h in sorted(_stages.items()):
+            label = 'stage="{}"'.format(stage.replace('"', '\\"'))
+            seen = 0
+            for edge, count in zip(h.edges, h.counts):
+                seen += count
+                lines.append('{}_bucket{{{},le="{:g}"}} {}'.format(prefix, label, edge/1000, seen))
+            lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(prefix, label, h.n))
+            lines.append("{}_sum{{{}}} {:.9f}".format(prefix, label, h.total/1000))
+            lines.append("{}_count{{{}}} {}".format(prefix, label, h.n))
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass # Keep the console for the station display
+
+def serve(port=9108, host="127.0.0.1"):
+    # Prometheus text endpoint on a daemon thread; returns the server
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class Reporter:
+    # Periodic export: prints summary() and/or rewrites the sidecar file
+
+    def __init__(self, interval=60.0, path=None, printer=print):
+        self.interval = interval
+        self.path = path
+        self.printer = printer
+        self._stop = threading.Event()
+        self._thread = None
+
+    def emit(self):
+        if self.printer is not None:
+            self.printer(summary())
+        if self.path is not None:
+            write_file(self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.emit()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # Stops the thread and exports once more
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.emit()
+
+
+if __name__ == '__main__':
+    # Demo: time a few stages and print both export formats
+    # (overhead numbers: benchmarks/metrics_overhead.py)
+    enable()
+    for i in range(1000):
+        lap = laps()
+        sum(range(100))
+        lap("demo.sum")
+        with timer("demo.sorted"):
+            sorted(range(1000, 0, -1))
+    print(summary())
+    print(prometheus_text())
@@ -0,0 +1,136 @@
+"""
+Description:
+Threaded acquisition pipeline for the logging station. Hardware reads,
+calculations and logging/display run in three threads linked by bounded
+queues, so a slow USB read, disk write or console print never stretches the
+sampling interval:
+
+    acquisition --(compute queue)--> compute --(output queue)--> sinks
+
+The acquisition thread runs on a drift-free monotonic schedule (see
+scheduler.py), never "sleep(interval - process_time)". When a downstream
+queue is full the scan is dropped and counted rather than blocking
+acquisition. stats() exposes queue depths and the counters.
+
+Dependencies:
+    - threading, queue (standard library)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import queue
+import threading
+import time
+import traceback
+from scheduler import Scheduler
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+_STOP = object() # End-of-stream marker passed down the queues
+
+
+class Pipeline:
+
+    def __init__(self, acquire, compute, sinks, interval=5.0, queue_size=100,
+                 clock=time.monotonic, sleep=None):
+        # acquire(tick) -> item     : read one scan (tick: scheduler.Tick)
+        # compute(item) -> record   : None to skip the scan
+        # sinks: callables(record)  : writer / display, called in order
+        # clock/sleep: simulated time source (e.g. sim_ljm.SimClock); by default
+        #              the acquisition thread waits on the stop event
+        self.acquire = acquire
+        self.compute = compute
+        self.sinks = list(sinks)
+        self._stop = threading.Event()
+        self._sleep = sleep
+        self.scheduler = Scheduler(interval, clock, self._wait)
+        self.compute_q = queue.Queue(maxsize=queue_size)
+        self.output_q = queue.Queue(maxsize=queue_size)
+        self.counters = dict.fromkeys(["acquired", "computed", "written", "missed_ticks",
+                                       "dropped_compute", "dropped_output",
+                                       "acquire_errors", "compute_errors", "sink_errors"], 0)
+        self._threads = []
+
+    # ---- Control ------------------------------------------------------------
+    def start(self):
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._acquire_loop, name="acquire", daemon=True),
+                         threading.Thread(target=self._compute_loop, name="compute", daemon=True),
+                         threading.Thread(target=self._output_loop, name="output", daemon=True)]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout=None):
+        # Stop sampling, then let compute/output drain what is already queued
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def stats(self):
+        return dict(self.counters, compute_queue=self.compute_q.qsize(),
+                    output_queue=self.output_q.qsize())
+
+    def _wait(self, delay):
+        if self._sleep is None:
+            return self._stop.wait(delay)
+        self._sleep(delay)
+        return self._stop.is_set()
+
+    # ---- Stages -------------------------------------------------------------
+    def _put(self, q, item, counter):
+        try:
+            q.put_nowait(item)
+        except queue.Full:
+            self.counters[counter] += 1
+
+    def _acquire_loop(self):
+        try:
+            for tick in self.scheduler.ticks():
+                if self._stop.is_set():
+                    break
+                try:
+                    item = self.acquire(tick)
+                except Exception:
+                    self.counters["acquire_errors"] += 1
+                    traceback.print_exc()
+                else:
+                    self.counters["acquired"] += 1
+                    self._put(self.compute_q, item, "dropped_compute")
+                self.scheduler.done(tick)
+                self.counters["missed_ticks"] = self.scheduler.missed
+        finally:
+            self.compute_q.put(_STOP)
+
+    def _compute_loop(self):
+        try:
+            while True:
+                item = self.compute_q.get()
+                if item is _STOP:
+                    break
+                try:
+                    record = self.compute(item)
+                except Exception:
+                    self.counters["compute_errors"] += 1
+                    traceback.print_exc()
+                    continue
+                if record is not None:
+                    self.counters["computed"] += 1
+                    self._put(self.output_q, record, "dropped_output")
+        finally:
+            self.output_q.put(_STOP)
+
+    def _output_loop(self):
+        while True:
+            record = self.output_q.get()
+            if record is _STOP:
+                break
+            for sink in self.sinks:
+                try:
+                    sink(record)
+                except Exception:
+                    self.counters["sink_errors"] += 1
+                    traceback.print_exc()
+            self.counters["written"] += 1
@@ -0,0 +1,432 @@
+"""
+Description:
+Streaming statistics and steady-state detection for heat gain tests. All
+updates are O(1) per sample and work on preallocated buffers, so they can run
+inside the acquisition loop:
+
+    Welford        - running mean / variance over the whole test (optionally
+                     weighted, e.g. by the time step of each sample), of one
+                     value or of a row of columns
+    RollingWindow  - mean, std and linear-trend slope over the last N minutes,
+                     kept as running sums over a circular buffer
+    RollingColumns - the same for a row of columns in one (capacity x width)
+                     buffer, NaN skipped per column
+    SteadyState    - rolling statistics of every derived quantity of a record;
+                     the test is steady when each quantity with criteria (by
+                     default Sensible HG, Latent HG, Q_Scfm; see
+                     load_criteria()) meets its std and slope limits over a
+                     full window
+
+Samples carry their own timestamps (seconds), so the windows and slopes are
+correct for non-uniform scan intervals as well, and SteadyState weights each
+sample by the time since the previous one so its averages are time averages
+(adaptive sampling, see adaptive.py, scans faster during transients).
+
+Dependencies:
+    - numpy
+    - math, os, csv, json (standard library)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import csv
+import json
+import math
+import os
+import numpy as np
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Default steady-state criteria: column -> (max std, max |slope| per minute)
+DEFAULT_CRITERIA = {
+    "Sensible HG": (150.0, 10.0), # Btu/h
+    "Latent HG": (150.0, 10.0),   # Btu/h
+    "Q_Scfm": (5.0, 0.5),         # Scfm
+}
+# Steady averages printed by SteadyState.report() besides the criteria columns
+REPORT_COLUMNS = ["Q_Scfm", "Sensible HG", "Latent HG", "Total HG"]
+
+
+def load_criteria(spec=None):
+    # spec: None (defaults), dict, path to .json / .csv (column,max_std,max_slope)
+    # or "column=std:slope,column=std:slope" (slope per minute). Replaces the
+    # default criteria.
+    if spec is None:
+        return dict(DEFAULT_CRITERIA)
+    if isinstance(spec, dict):
+        items = spec.items()
+    elif os.path.isfile(spec):
+        with open(spec, newline="") as f:
+            if spec.lower().endswith(".json"):
+                items = json.load(f).items()
+            else:
+                items = [(row[0], row[1:3]) for row in csv.reader(f) if row and row[0].strip()]
+    else:
+        items = [(name, limits.split(":")) for name, limits in
+                 (pair.split("=", 1) for pair in spec.split(","))]
+    criteria = {}
+    for name, (max_std, max_slope) in items:
+        criteria[name.strip()] = (float(max_std), float(max_slope))
+    return criteria
+
+
+class Welford:
+    # Running mean / variance (Welford's algorithm, West's weighted form).
+    # With the default weight of 1 this is the plain sample mean / variance.
+    # width: a row of that many columns per add() (n, mean, std are arrays;
+    # a column with weight 0 is skipped)
+
+    def __init__(self, width=None):
+        self.width = width
+        if width is None:
+            self.n = 0
+            self.weight = 0.0
+            self.mean = 0.0
+            self._m2 = 0.0
+        else:
+            self.n = np.zeros(width, dtype=int)
+            self.weight = np.zeros(width)
+            self.mean = np.zeros(width)
+            self._m2 = np.zeros(width)
+            self._delta = np.zeros(width)
+            self._ratio = np.zeros(width)
+            self._used = np.zeros(width, dtype=bool)
+
+    def add(self, x, w=1.0):
+        if self.width is not None:
+            return self._add_row(x, w)
+        if w <= 0:
+            return
+        self.n += 1
+        self.weight += w
+        delta = x - self.mean
+        self.mean += delta*w/self.weight
+        self._m2 += w*delta*(x - self.mean)
+
+    def _add_row(self, x, w):
+        # x: row of values (finite wherever w > 0); w: weight per column
+        np.greater(w, 0, out=self._used)
+        self.n += self._used
+        self.weight += w
+        np.subtract(x, self.mean, out=self._delta)
+        self._ratio.fill(0.0)
+        np.divide(w, self.weight, out=self._ratio, where=self._used)
+        self._delta *= self._ratio
+        self.mean += self._delta
+        # w*delta*(x - new mean), with delta*w/weight already in _delta
+        np.subtract(x, self.mean, out=self._ratio)
+        self._ratio *= self._delta
+        self._ratio *= self.weight
+        self._m2 += self._ratio
+
+    @property
+    def variance(self):
+        # Weighted population variance, scaled by n/(n-1) (= sample variance for w = 1)
+        if self.width is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where(self.n > 1, self._m2/self.weight*self.n/(self.n - 1), np.nan)
+        return self._m2/self.weight*self.n/(self.n - 1) if self.n > 1 else float('nan')
+
+    @property
+    def std(self):
+        if self.width is not None:
+            return np.sqrt(np.maximum(self.variance, 0.0))
+        return math.sqrt(self.variance) if self.n > 1 else float('nan')
+
+
+class RollingWindow:
+    # Time window of the last `seconds` of samples. Running sums of x, x^2,
+    # t, t^2 and t*x give mean, std and least-squares slope in O(1); times are
+    # taken relative to the first sample to keep the sums well conditioned.
+
+    def __init__(self, seconds, capacity):
+        self.seconds = float(seconds)
+        self.t = np.zeros(capacity)
+        self.x = np.zeros(capacity)
+        self.capacity = capacity
+        self.head = 0   # index of the oldest sample
+        self.n = 0
+        self.t0 = None
+        self.sx = self.sxx = self.st = self.stt = self.stx = 0.0
+        self.full = False # the window has covered `seconds` at least once
+
+    def _drop_oldest(self):
+        t, x = self.t[self.head], self.x[self.head]
+        self.sx -= x
+        self.sxx -= x*x
+        self.st -= t
+        self.stt -= t*t
+        self.stx -= t*x
+        self.head = (self.head + 1) % self.capacity
+        self.n -= 1
+
+    def add(self, t, x):
+        if self.t0 is None:
+            self.t0 = t
+        t = t - self.t0
+        # Expire samples older than the window (and make room if full)
+        while self.n and (t - self.t[self.head] > self.seconds or self.n == self.capacity):
+            self.full = True
+            self._drop_oldest()
+        i = (self.head + self.n) % self.capacity
+        self.t[i] = t
+        self.x[i] = x
+        self.n += 1
+        self.sx += x
+        self.sxx += x*x
+        self.st += t
+        self.stt += t*t
+        self.stx += t*x
+
+    @property
+    def mean(self):
+        return self.sx/self.n if self.n else float('nan')
+
+    @property
+    def std(self):
+        if self.n < 2:
+            return float('nan')
+        var = (self.sxx - self.sx*self.sx/self.n)/(self.n - 1)
+        return math.sqrt(max(var, 0.0))
+
+    @property
+    def slope(self):
+        # Least-squares slope [units per second]
+        if self.n < 2:
+            return float('nan')
+        den = self.n*self.stt - self.st*self.st
+        if den <= 0:
+            return float('nan')
+        return (self.n*self.stx - self.st*self.sx)/den
+
+    @property
+    def span(self):
+        # Time covered by the samples in the window [s]
+        if not self.n:
+            return 0.0
+        return self.t[(self.head + self.n - 1) % self.capacity] - self.t[self.head]
+
+
+class RollingColumns:
+    # RollingWindow over a row of columns: one preallocated (capacity x width)
+    # buffer and per-column running sums. NaN values are stored as 0 with a
+    # 0/1 mask, so each column counts only its own samples.
+
+    def __init__(self, seconds, capacity, width):
+        self.seconds = float(seconds)
+        self.capacity = capacity
+        self.width = width
+        self.t = np.zeros(capacity)
+        self.x = np.zeros((capacity, width))
+        self.valid = np.zeros((capacity, width)) # 1.0 where x holds a sample
+        self.head = 0   # index of the oldest row
+        self.rows = 0
+        self.t0 = None
+        self.n, self.sx, self.sxx, self.st, self.stt, self.stx = np.zeros((6, width))
+        self.full = False # the window has covered `seconds` at least once
+        self._tmp = np.zeros(width)
+        self._nan = np.zeros(width, dtype=bool)
+        # Output and scratch buffers of mean/std/slope (reused on every call)
+        self._mean, self._std, self._slope, self._den, self._scratch = np.zeros((5, width))
+        self._ok = np.zeros(width, dtype=bool)
+        self._bad = np.zeros(width, dtype=bool)
+
+    def _update(self, i, sign):
+        # Add (sign 1) or remove (sign -1) row i from the sums
+        t, x, m, tmp = self.t[i], self.x[i], self.valid[i], self._tmp
+        np.multiply(m, sign, out=tmp)
+        self.n += tmp
+        np.multiply(m, sign*t, out=tmp)
+        self.st += tmp
+        tmp *= t
+        self.stt += tmp
+        np.multiply(x, sign, out=tmp)
+        self.sx += tmp
+        tmp *= x
+        self.sxx += tmp
+        np.multiply(x, sign*t, out=tmp)
+        self.stx += tmp
+
+    def add(self, t, values):
+        # values: one number per column (NaN skipped)
+        if self.t0 is None:
+            self.t0 = t
+        t = t - self.t0
+        # Expire rows older than the window (and make room if full)
+        while self.rows and (t - self.t[self.head] > self.seconds or self.rows == self.capacity):
+            self.full = True
+            self._update(self.head, -1.0)
+            self.head = (self.head + 1) % self.capacity
+            self.rows -= 1
+        i = (self.head + self.rows) % self.capacity
+        x = self.x[i]
+        x[:] = values
+        np.isnan(x, out=self._nan)
+        x[self._nan] = 0.0
+        np.logical_not(self._nan, out=self.valid[i])
+        self.t[i] = t
+        self.rows += 1
+        self._update(i, 1.0)
+
+    def last(self):
+        # Newest row (NaN stored as 0) and its 0/1 mask, as views
+        i = (self.head + self.rows - 1) % self.capacity
+        return self.x[i], self.valid[i]
+
+    # mean, std and slope are computed into preallocated arrays: the result
+    # is overwritten by the next call, copy it to keep it.
+
+    def _fill_nan(self, out):
+        # NaN where self._ok is False
+        np.logical_not(self._ok, out=self._bad)
+        np.copyto(out, np.nan, where=self._bad)
+        return out
+
+    @property
+    def mean(self):
+        out = self._mean
+        np.greater(self.n, 0, out=self._ok)
+        np.divide(self.sx, self.n, out=out, where=self._ok)
+        return self._fill_nan(out)
+
+    @property
+    def std(self):
+        out, den = self._std, self._den
+        np.greater(self.n, 1, out=self._ok)
+        # var = (sxx - sx*sx/n)/(n - 1)
+        np.multiply(self.sx, self.sx, out=out)
+        np.divide(out, self.n, out=out, where=self._ok)
+        np.subtract(self.sxx, out, out=out)
+        np.subtract(self.n, 1.0, out=den)
+        np.divide(out, den, out=out, where=self._ok)
+        np.maximum(out, 0.0, out=out)
+        np.sqrt(out, out=out)
+        return self._fill_nan(out)
+
+    @property
+    def slope(self):
+        # Least-squares slope [units per second]
+        out, den, tmp = self._slope, self._den, self._scratch
+        np.multiply(self.n, self.stt, out=den)
+        np.multiply(self.st, self.st, out=tmp)
+        den -= tmp
+        np.greater(self.n, 1, out=self._ok)
+        np.greater(den, 0.0, out=self._bad)
+        self._ok &= self._bad
+        np.multiply(self.n, self.stx, out=out)
+        np.multiply(self.st, self.sx, out=tmp)
+        out -= tmp
+        np.divide(out, den, out=out, where=self._ok)
+        return self._fill_nan(out)
+
+    @property
+    def span(self):
+        # Time covered by the rows in the window [s]
+        if not self.rows:
+            return 0.0
+        return self.t[(self.head + self.rows - 1) % self.capacity] - self.t[self.head]
+
+
+class SteadyState:
+
+    def __init__(self, window_minutes=30, min_interval=1.0, criteria=None, columns=None):
+        # columns: names of the values passed to add() (default: the criteria
+        # columns); criteria: see load_criteria(), each one a column.
+        # min_interval: shortest expected scan interval, sizes the buffer
+        self.criteria = load_criteria(criteria)
+        self.columns = list(columns or self.criteria)
+        unknown = [name for name in self.criteria if name not in self.columns]
+        if unknown:
+            raise ValueError("Steady-state criteria for unknown columns: {}".format(", ".join(unknown)))
+        seconds = window_minutes*60
+        capacity = int(seconds/min_interval) + 2
+        width = len(self.columns)
+        self.window = RollingColumns(seconds, capacity, width)
+        self.totals = Welford(width)
+        # Averages of each quantity over the steady period(s)
+        self.steady_avg = Welford(width)
+        self._index = np.array([self.columns.index(name) for name in self.criteria], dtype=int)
+        self._max_std = np.array([c[0] for c in self.criteria.values()])
+        self._max_slope = np.array([c[1] for c in self.criteria.values()])/60 # per second
+        self._weight = np.zeros(width)
+        # Scratch for comparing the criteria columns on every scan
+        self._crit = np.zeros(len(self._index))
+        self._crit_ok = np.zeros(len(self._index), dtype=bool)
+        self._column_index = {name: k for k, name in enumerate(self.columns)}
+        self.steady = False
+        self.steady_since = None # test time [s] the current steady period began
+        self.min_interval = min_interval
+        self.t_first = None
+        self.t_prev = None
+        self.time_to_steady = None # first time steady was reached [s from start]
+
+    def add(self, t, values):
+        # t: test time [s]; values: one value per column (NaN is skipped).
+        # Averages are weighted by the step since the previous sample.
+        if self.t_first is None:
+            self.t_first = t
+        dt = t - self.t_prev if self.t_prev is not None else self.min_interval
+        self.t_prev = t
+        self.window.add(t, values)
+        x, valid = self.window.last()
+        np.multiply(valid, dt, out=self._weight)
+        self.totals.add(x, self._weight)
+        steady = self._meets()
+        if steady and not self.steady:
+            self.steady_since = t
+            if self.time_to_steady is None:
+                self.time_to_steady = t - self.t_first
+        self.steady = steady
+        if steady:
+            self.steady_avg.add(x, self._weight)
+        return steady
+
+    def _meets(self):
+        w = self.window
+        if not w.full and w.span < w.seconds*0.99:
+            return False # Window not covered yet
+        crit, ok = self._crit, self._crit_ok
+        np.take(w.std, self._index, out=crit)
+        np.less_equal(crit, self._max_std, out=ok)
+        if not ok.all():
+            return False
+        np.take(w.slope, self._index, out=crit)
+        np.abs(crit, out=crit)
+        np.less_equal(crit, self._max_slope, out=ok)
+        return bool(ok.all())
+
+    def status(self, names=None):
+        # name -> (mean, std, slope per minute) over the window, for the
+        # given columns (default all)
+        w = self.window
+        mean, std, slope = w.mean, w.std, w.slope
+        index = self._column_index
+        return {name: (mean[index[name]], std[index[name]], slope[index[name]]*60)
+                for name in (self.columns if names is None else names)}
+
+    def report(self):
+        lines = []
+        if self.time_to_steady is None:
+            lines.append("Steady state not reached")
+        else:
+            lines.append("Time to steady state: {:.1f} min".format(self.time_to_steady/60))
+        avg = self.steady_avg
+        std = avg.std
+        for name in list(self.criteria) + [c for c in REPORT_COLUMNS if c not in self.criteria]:
+            k = self.columns.index(name) if name in self.columns else None
+            if k is not None and avg.n[k]:
+                lines.append("  {:12s} steady avg {:.2f} (std {:.2f}, n={})".format(
+                    name, avg.mean[k], std[k], avg.n[k]))
+        return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    import random
+
+    # Synthetic test: heat gain settles exponentially with noise
+    det = SteadyState(window_minutes=10, min_interval=5,
+                      columns=["Q_Scfm", "Sensible HG", "Latent HG", "Total HG"])
+    for k in range(1200):
+        t = k*5.0
+        hg = 4000*(1 - math.exp(-t/900)) + random.gauss(0, 40)
+        det.add(t, [330 + random.gauss(0, 1), hg, hg/3, hg*4/3])
+    print(det.report())
@@ -0,0 +1,162 @@
+"""
+Description:
+Drift-free scan scheduler. Scan k is due at start + sum of the intervals
+before it, measured on a monotonic clock, so the schedule never accumulates
+process time or sleep overshoot, and the interval can be anything from a few
+milliseconds to many minutes (and changed while running). Each tick carries
+the measured elapsed time since the start - the value logged as "Test Time" -
+rather than a counter.
+
+Per-scan timing is recorded in two histograms:
+    jitter  - how late the scan started relative to its due time
+    latency - how long the scan itself took (start -> done())
+and summarized by report().
+
+Dependencies:
+    - time, bisect (standard library)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import bisect
+import time
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Histogram bucket upper edges [ms]
+BUCKETS_MS = [0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class Histogram:
+    # Fixed-bucket histogram of durations (seconds in, milliseconds out)
+
+    def __init__(self, edges=BUCKETS_MS):
+        self.edges = list(edges)
+        self.counts = [0]*(len(self.edges) + 1) # last bucket: > edges[-1]
+        self.n = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def add(self, seconds):
+        ms = seconds*1000
+        self.counts[bisect.bisect_left(self.edges, ms)] += 1
+        self.n += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+
+    def mean(self):
+        return self.total/self.n if self.n else float('nan')
+
+    def percentile(self, p):
+        # Upper bucket edge below which p % of the samples fall
+        if not self.n:
+            return float('nan')
+        target = p/100*self.n
+        seen = 0
+        for edge, count in zip(self.edges + [self.max], self.counts):
+            seen += count
+            if seen >= target:
+                return min(edge, self.max)
+        return self.max
+
+    def summary(self):
+        if not self.n:
+            return "no samples"
+        return "n={} mean={:.2f} min={:.2f} p50<={:.2f} p99<={:.2f} max={:.2f} ms".format(
+            self.n, self.mean(), self.min, self.percentile(50), self.percentile(99), self.max)
+
+    def table(self):
+        lines = []
+        lo = 0
+        for edge, count in zip(self.edges + [float('inf')], self.counts):
+            if count:
+                lines.append("    {:>8} - {:<8} ms: {}".format(lo, edge, count))
+            lo = edge
+        return "\n".join(lines)
+
+
+class Tick:
+    # One scheduled scan
+    __slots__ = ("k", "due", "start", "elapsed", "interval")
+
+    def __init__(self, k, due, start, elapsed, interval):
+        self.k = k               # scan number (missed ticks are skipped)
+        self.due = due           # scheduled start (clock time)
+        self.start = start       # actual start (clock time)
+        self.elapsed = elapsed   # measured time since the first scan [s]
+        self.interval = interval # interval in effect for this scan [s]
+
+    @property
+    def jitter(self):
+        return self.start - self.due
+
+
+class Scheduler:
+
+    def __init__(self, interval, clock=time.monotonic, wait=None):
+        # wait(delay) sleeps and returns True if the run should stop;
+        # clock/wait can be replaced by a simulated clock.
+        if interval <= 0:
+            raise ValueError("Scan interval must be positive")
+        self.interval = float(interval)
+        self.clock = clock
+        self.wait = wait or _default_wait
+        self.jitter = Histogram()
+        self.latency = Histogram()
+        self.missed = 0
+        self.start = None
+        self._next_due = None
+        self._k = 0
+
+    def set_interval(self, interval):
+        # Takes effect from the scan after the next one (already scheduled)
+        if interval <= 0:
+            raise ValueError("Scan interval must be positive")
+        self.interval = float(interval)
+
+    def next_tick(self):
+        # Wait for the next due time; returns a Tick or None if stopped
+        if self.start is None:
+            self.start = self._next_due = self.clock()
+        delay = self._next_due - self.clock()
+        if delay > 0:
+            if self.wait(delay):
+                return None
+        elif -delay >= self.interval:
+            # More than a whole interval behind: skip the missed scans
+            # instead of bursting to catch up
+            missed = int(-delay // self.interval)
+            self.missed += missed
+            self._k += missed
+            self._next_due += missed*self.interval
+        now = self.clock()
+        tick = Tick(self._k, self._next_due, now, now - self.start, self.interval)
+        self.jitter.add(max(0.0, tick.jitter))
+        self._k += 1
+        self._next_due += self.interval
+        return tick
+
+    def done(self, tick):
+        # Mark the end of the scan's work for the latency histogram
+        self.latency.add(self.clock() - tick.start)
+
+    def ticks(self):
+        while True:
+            tick = self.next_tick()
+            if tick is None:
+                return
+            yield tick
+
+    def report(self):
+        return """Scan timing ({} scans, {} missed, interval {} s)
+  Jitter:  {}
+{}
+  Latency: {}
+{}""".format(self.jitter.n, self.missed, self.interval, self.jitter.summary(),
+             self.jitter.table(), self.latency.summary(), self.latency.table())
+
+
+def _default_wait(delay):
+    time.sleep(delay)
+    return False
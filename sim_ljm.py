@@ -0,0 +1,221 @@
+"""
+Description:
+Simulated LabJack backend for load and soak testing without a T7. SimLJM is
+a FakeLJM (see fake_ljm.py) whose channel-map registers are driven by a
+signal source in engineering units:
+
+    Synthetic - exhaust temperature / flow settling like a heat gain test,
+                with noise (seeded)
+    Replay    - a recorded test: an xlsx export (e.g. test.xlsx) or a csv log
+                from main.py, interpolated on its own time column and looped
+
+Each read can take a configurable latency (+ random jitter), fail with an
+LJMError at a given rate (the session reconnects and retries), or fall into
+a scheduled outage (device unplugged for a while).
+
+All timing goes through a SimClock: speed=N runs N simulated seconds per
+real second (a day-long soak test of main.py in minutes), speed=None is a
+virtual clock where sleeps return at once and only advance simulated time
+(single-threaded scripts, benchmarks).
+
+    python main.py --simulate test.xlsx --speed 500 --duration 48 --quiet
+
+Dependencies:
+    - fake_ljm, station
+    - HG_interval_calc / ingest (Replay only: pandas, openpyxl for xlsx)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import math
+import random
+import threading
+import time
+import numpy as np
+import station
+from fake_ljm import FakeLJM, LJMError, LJME_DEVICE_DISCONNECTED, LJME_DEVICE_NOT_FOUND
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+class SimClock:
+
+    def __init__(self, speed=1.0, epoch=None):
+        # speed: simulated seconds per real second (None: virtual time)
+        # epoch: wall-clock time at simulated t=0 (default: now)
+        self.speed = speed
+        self.epoch = time.time() if epoch is None else epoch
+        self._real0 = time.monotonic()
+        self._virtual = 0.0
+        self._lock = threading.Lock()
+
+    def monotonic(self):
+        if self.speed is None:
+            return self._virtual
+        return (time.monotonic() - self._real0)*self.speed
+
+    def time(self):
+        return self.epoch + self.monotonic()
+
+    def sleep(self, delay):
+        if delay <= 0:
+            return
+        if self.speed is None:
+            with self._lock:
+                self._virtual += delay
+        else:
+            time.sleep(delay/self.speed)
+
+
+# ---- Signal sources ---------------------------------------------------------
+# A source returns one scan (channel name -> channel-map units) for a time t.
+
+class Synthetic:
+    # Heat gain test from a cold start: exhaust temperature rises towards its
+    # steady value with time constant tau; the rest is constant plus noise
+
+    def __init__(self, T_room=72.0, T_exh=(75.0, 95.0), tau=900.0, T_lab=71.0,
+                 Tdew_exh=55.0, Pbar_inHg=29.4, pdiff_exh=0.20, noise=1.0, seed=None):
+        self.T_room = T_room
+        self.T_exh = T_exh
+        self.tau = tau
+        self.T_lab = T_lab
+        self.Tdew_exh = Tdew_exh
+        self.Pbar_inHg = Pbar_inHg
+        self.pdiff_exh = pdiff_exh
+        self.noise = noise # scales all noise amplitudes
+        self._rng = random.Random(seed)
+
+    def _n(self, sd):
+        return self._rng.gauss(0.0, sd*self.noise) if self.noise else 0.0
+
+    def scan_at(self, t):
+        T0, T1 = self.T_exh
+        T_exh = T1 - (T1 - T0)*math.exp(-t/self.tau)
+        return station.scan_from_values(
+            T_room=round(self.T_room + 0.3*math.sin(2*math.pi*t/3600) + self._n(0.05), 2),
+            T_exh=round(T_exh + self._n(0.2), 2),
+            T_lab=round(self.T_lab + self._n(0.05), 2),
+            Tdew_exh=self.Tdew_exh + self._n(0.1),
+            Pbar_inHg=self.Pbar_inHg + self._n(0.002),
+            pdiff_exh=self.pdiff_exh + self._n(0.002))
+
+
+class Replay:
+    # Recorded test, linearly interpolated in time and looped
+
+    def __init__(self, path, loop=True, cache=True):
+        import HG_interval_calc as hgi
+        columns, diameter, skiprows, skip_footer = hgi.preset_for(path)
+        xlsx = columns is hgi.DEFAULT_COLUMNS
+        columns = {k: v for k, v in columns.items() if k != "W_room"}
+        columns["t"], scale = hgi.time_column_for(path)
+        if not xlsx:
+            columns["T_lab"] = "Tdb_Lab"
+        df = hgi.read_input(path, columns, skiprows, skip_footer, cache).dropna()
+        if len(df) < 2:
+            raise ValueError("{}: not enough rows to replay".format(path))
+        t = df[columns["t"]].to_numpy(dtype=float)*scale
+        self.t = t - t[0]
+        self.loop = loop
+        self.duration = self.t[-1] + np.median(np.diff(self.t))
+        col = {key: df[name].to_numpy(dtype=float) for key, name in columns.items()}
+        self.scan = station.scan_from_values(
+            T_room=col["Tdb_room"], T_exh=col["Tdb"], T_lab=col.get("T_lab", col["Tdb_room"]),
+            Tdew_exh=col["Tdew"], Pbar_inHg=col["Pbar_inHg"], pdiff_exh=col["pdiff"])
+
+    def scan_at(self, t):
+        if self.loop:
+            t = t % self.duration
+        return {name: float(np.interp(t, self.t, values)) for name, values in self.scan.items()}
+
+
+def make_source(spec, seed=None):
+    # "synthetic" or the path of a recorded log
+    if spec in (None, True, "synthetic"):
+        return Synthetic(seed=seed)
+    return Replay(spec)
+
+
+# ---- Simulated device -------------------------------------------------------
+class SimLJM(FakeLJM):
+
+    def __init__(self, channel_map, source=None, clock=None, latency=0.0, jitter=0.0,
+                 error_rate=0.0, outages=(), stream_noise=0.0, seed=None):
+        # latency/jitter: seconds per read (+ exponential jitter with that mean)
+        # error_rate: probability of a read failing with an LJMError
+        # outages: (start, duration) pairs in simulated seconds
+        self.sim_clock = clock or SimClock()
+        super().__init__(stream_noise=stream_noise, read_latency=latency,
+                         clock=self.sim_clock.monotonic, sleep=self.sim_clock.sleep)
+        self.source = source or Synthetic(seed=seed)
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.outages = list(outages)
+        self.injected_errors = 0
+        self._rng = random.Random(seed)
+        self._channels = {c.read_name: c for c in channel_map}
+        self._scan_t = None
+        self._scan = None
+
+    def _in_outage(self):
+        t = self.clock()
+        return any(start <= t < start + duration for start, duration in self.outages)
+
+    def openS(self, deviceType, connectionType, identifier):
+        self.connected = not self._in_outage()
+        return super().openS(deviceType, connectionType, identifier)
+
+    def _latency(self):
+        delay = self.read_latency
+        if self.jitter:
+            delay += self._rng.expovariate(1.0/self.jitter)
+        if delay:
+            self.sleep(delay)
+        if self._in_outage():
+            self.disconnect()
+            raise LJMError(LJME_DEVICE_NOT_FOUND, errorString="LJME_DEVICE_NOT_FOUND")
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.injected_errors += 1
+            raise LJMError(LJME_DEVICE_DISCONNECTED, errorString="LJME_DEVICE_DISCONNECTED")
+
+    def _value(self, name):
+        channel = self._channels.get(name)
+        if channel is None:
+            return super()._value(name)
+        t = self.clock()
+        if t != self._scan_t:
+            self._scan_t, self._scan = t, self.source.scan_at(t)
+        return channel.to_raw(self._scan[channel.name])
+
+
+if __name__ == '__main__':
+    import sys
+    import labjack_functions as ljf
+    from channel_map import ChannelMap
+    from scheduler import Scheduler
+
+    # Replay a recorded test (or synthetic data) on a virtual clock through the
+    # station calculations: hours of scans in about a second
+    channel_map = ChannelMap.load()
+    clock = SimClock(speed=None)
+    sim = SimLJM(channel_map, make_source(sys.argv[1] if len(sys.argv) > 1 else "test.xlsx"),
+                 clock, latency=0.02, jitter=0.005, error_rate=0.01,
+                 outages=[(3600, 60)], seed=1)
+    session = ljf.LabJackSession(backend=sim)
+    channel_map.configure(session)
+    sched = Scheduler(5.0, clock.monotonic, clock.sleep)
+    tic = time.perf_counter()
+    open_rows = 0
+    for tick in sched.ticks():
+        try:
+            data = station.compute_record(channel_map.read_scan(session), "", tick.elapsed/60)
+        except LJMError:
+            open_rows += 1
+        sched.done(tick)
+        if tick.elapsed >= 4*3600:
+            break
+    print("{} scans ({:.1f} simulated h) in {:.2f} s; last total HG {} Btu/h".format(
+        tick.k + 1, tick.elapsed/3600, time.perf_counter() - tic, data[24]))
+    print("Injected errors: {}, reconnects: {}, scans lost to the outage: {}".format(
+        sim.injected_errors, session.reconnects, open_rows))
+    print(sched.report())
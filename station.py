@@ -0,0 +1,189 @@
+"""
+Description:
+Per-scan calculations of the logging station: turns one channel-map scan
+(see channel_map.csv) into the 25-column data record written by main.py, and
+formats the console display. Kept apart from main.py so the acquisition
+pipeline, the offline tools and a simulated device can share it.
+
+Dependencies:
+    - systemCalcs, metrics
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import metrics
+import systemCalcs as calc
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+HEADERS = ["Time of Day", "Test Time", "Tdb_Lab", "Tdb_room:", "Tdb_exh",
+           "Tdew_room", "Tdew_exh", "Pbar_inHg", "Pdif_exh", "pp_water_supsys1",
+           "pp_sat_supsys1", "pp_water_exh", "pp_sat_exh", "W_room", "W_exh",
+           "rho_room", "rho_exh", "rh_room", "rh_exh", "V_exh", "Q_Acfm",
+           "Q_Scfm", "Sensible HG", "Latent HG", "Total HG"]
+# Unrounded elapsed test time ("Test Time" is rounded to 0.01 min); energy.py
+# integrates over it
+ELAPSED_HEADERS = ["Elapsed s"]
+# Optional per-scan timing columns (main.py --timing)
+TIMING_HEADERS = ["Scan Jitter ms", "Scan Latency ms"]
+# Measured step since the previous scan (main.py --adaptive, see adaptive.py)
+ADAPTIVE_HEADERS = ["Interval s"]
+# Optional standard uncertainty columns (main.py --uncertainty, see uncertainty.py)
+UNCERTAINTY_HEADERS = ["u Q_Scfm", "u Sensible HG", "u Latent HG", "u Total HG"]
+UNCERTAINTY_OUTPUTS = ["Q_Scfm", "q_sensible", "q_latent", "q_total"]
+# Binary log (binlog.py): time stamps, raw channel values, derived columns
+BINARY_TIME = ["time", "test_time"]   # unix time [s], elapsed test time [s]
+BINARY_DERIVED = HEADERS[2:]
+# Channel-map entries compute_record() reads (the station device's channels)
+SCAN_CHANNELS = ["T_room", "T_exh", "T_lab", "Tdew_exh", "Pbar", "pdiff_exh"]
+
+TDEW_ROOM = 51.8     # Room dew point [F] (no sensor connected)
+DUCT_ID = 7.87       # 8in diameter (7.87 ID) duct for Starbucks Heat Gain Testing
+PDIFF_OFFSET = 0.003 # Setra zero offset [inWc]
+
+
+def compute_record(scan, now, test_time_min):
+    # scan: channel name -> value as returned by ChannelMap.read_scan
+    lap = metrics.laps() # per-step timing (metrics.enable())
+    # 3.) Room Dry Bulb Temperature
+    T_room = scan["T_room"]
+    # 4.) Exhaust Dry Bulb Temperature
+    T_exh = scan["T_exh"]
+    # 5.) Dew Point - Supply/Room
+    Tdew_room = TDEW_ROOM #ljf.tempRead_TC(0, 1)
+    # 6.) Dew Point - Exhaust
+    Tdew_exh_mA = scan["Tdew_exh"] # (ch 11) Current -> Voltage using LJTick-Current Shunt
+    Tdew_exh = round(calc.DP_DewTran(Tdew_exh_mA, -40, 60), 2) # (SigOUT, lo-range, hi-range in celsius)
+    # 7.) Barometric Pressure
+    Pbar_V = scan["Pbar"] # (channel 12, 199-GND, 5V Range) Setra Bar Press. Transducer
+    Pbar = (80*Pbar_V + 798.95) # Barometric Pressure in mbar
+    Pbar_inHg = round(Pbar/33.864, 2)
+    # 8.) Differential Pressure - Velocity Pressure
+    pdiff_exh_mA = scan["pdiff_exh"] #(ch 10) Current -> Voltage using LJTick-Current Shunt
+    pdiff_exh = round(calc.pdiff_setra(pdiff_exh_mA, 0, 0.5), 3) + PDIFF_OFFSET # + offset (SigOUT, lo-range, hi-range)
+    lap("calc.sensors")
+    #************ Calculate air flow, and psychrometrics *********************
+    # 9.) Partial Pressure Water Vapor (Calculated)
+    pp_water_supsys1 = calc.Pp(Tdew_room)
+    # 10.) Saturation Partial Pressure (at Dry bulb Temp)
+    pp_sat_supsys1 = calc.Pp(T_room)
+    # 11.) Partial Pressure Water Vapor (Calculated)
+    pp_water_exh = calc.Pp(Tdew_exh)
+    # 12.) Saturation Partial Pressure (at Dry bulb Temp)
+    pp_sat_exh = calc.Pp(T_exh)
+    lap("calc.Pp")
+    # 13.) Humidity Ratio - Supply/Room
+    W_room = calc.W(Pbar_inHg, pp_water_supsys1)
+    # 14.) Humidity Ratio - Exhaust
+    W_exh = calc.W(Pbar_inHg, pp_water_exh)
+    # 15.) Calculated Air Density - Room/Supply System 1
+    rho_room = calc.rho(Pbar, T_room, W_room)
+    # 16.) Calculated Air Density - Exhaust
+    rho_exh = calc.rho(Pbar, T_exh, W_exh)
+    # 17.) Calculated %RH - Room/Supply System 1
+    rh_room = calc.RH(pp_water_supsys1, pp_sat_supsys1)
+    # 18.) Calculated %RH - Exhaust
+    rh_exh = calc.RH(pp_water_exh, pp_sat_exh)
+    lap("calc.psychrometrics")
+    # 19.) Air Velocity
+    V_exh = calc.velocity(pdiff_exh, rho_exh)
+    # 20.) Actual Measured Flow [Acfm]
+    Q_Acfm = round(calc.QflowActual(V_exh, DUCT_ID), 2)
+    # 21.) Standard Air Corrected Flow [Scfm]
+    Q_Scfm = round(calc.QflowStandard(Q_Acfm, Pbar_inHg, T_exh), 2)
+    # 22.) Sensible Heat Gain [Btu/h] (approx.)
+    q_sensible = round(1.08 * Q_Scfm * (T_exh - T_room), 1)
+    # 23.) Latent Heat Gain [Btu/h] (approx.)
+    q_latent = round(4840 * Q_Scfm * (W_exh - W_room), 1)
+    # 24.) Total Heat Gain [Btu/h]
+    q_total = round(q_sensible + q_latent, 1)
+    # 25.) Lab Temp
+    T_lab = scan["T_lab"]
+    lap("calc.flow_heat_gain")
+
+    return [now,                # 0
+            test_time_min,      # 1
+            T_lab,              # 2
+            T_room,             # 3
+            T_exh,              # 4
+            Tdew_room,          # 5
+            Tdew_exh,           # 6
+            Pbar_inHg,          # 7
+            round(pdiff_exh,2), # 8
+            pp_water_supsys1,   # 9
+            pp_sat_supsys1,     # 10
+            pp_water_exh,       # 11
+            pp_sat_exh,         # 12
+            W_room,             # 13
+            W_exh,              # 14
+            rho_room,           # 15
+            rho_exh,            # 16
+            rh_room,            # 17
+            rh_exh,             # 18
+            V_exh,              # 19
+            Q_Acfm,             # 20
+            Q_Scfm,             # 21
+            q_sensible,         # 22
+            q_latent,           # 23
+            q_total]            # 24
+
+def scan_from_values(T_room, T_exh, T_lab, Tdew_exh, Pbar_inHg, pdiff_exh):
+    # Inverse of the sensor conversions above: engineering values (F, inHg,
+    # inWc) -> channel-map scan units (F, mA, V). Used to drive a simulated
+    # device from synthetic or recorded data (see sim_ljm.py).
+    Tdew_C = (Tdew_exh - 32)/1.8
+    return {"T_room": T_room, "T_exh": T_exh, "T_lab": T_lab,
+            "Tdew_exh": (Tdew_C + 4*100/16 + 40)/(100/16), # DewTran 4-20 mA, -40..60 C
+            "Pbar": (Pbar_inHg*33.864 - 798.95)/80,
+            "pdiff_exh": (pdiff_exh - PDIFF_OFFSET)/(0.5/16) + 4} # Setra 4-20 mA, 0-0.5 inWc
+
+def pdiff_unrounded(scan):
+    # Velocity pressure [inWc] of a scan before rounding (the logged Pdif_exh is
+    # rounded to 0.01), for the adaptive rate's slope (adaptive.py)
+    return calc.pdiff_setra(scan["pdiff_exh"], 0, 0.5) + PDIFF_OFFSET
+
+def chain_inputs(scan, data):
+    # systemCalcs.heat_gain_chain arguments behind one computed record (the
+    # unrounded pdiff comes from the scan), for uncertainty.py
+    return {"Pbar_inHg": data[7],
+            "pdiff": round(calc.pdiff_setra(scan["pdiff_exh"], 0, 0.5), 3) + PDIFF_OFFSET,
+            "Tdb": data[4], "Tdew": data[6], "Tdb_room": data[3], "Tdew_room": data[5],
+            "D": DUCT_ID}
+
+def open_record(now, test_time_min):
+    # Record logged while the device is disconnected
+    return [now, test_time_min] + ['OPEN']*(len(HEADERS) - 2)
+
+def format_display(data, process_time):
+    return """
+    Time:               {}
+    Test Time:          {} min
+    Process Time:       {} sec
+    Room Temp:          {} F
+    Exhaust Temp:       {} F
+    Room Dewpoint:      {} F
+    Exh. Dewpoint:      {} F
+    Barometric Press.:  {} inHg
+    Velocity Press.:    {} inWc
+    Exhaust Flow:       {} Acfm
+                        {} Scmf
+    Sensible Heat Gain: {} Btu/h
+    Latent Heat Gain:   {} Btu/h
+    Total Heat Gain:    {} Btu/h
+    """.format(data[0], data[1], process_time, data[3], data[4], data[5], data[6],
+               data[7], data[8], data[20], data[21], data[22], data[23], data[24])
+
+def binary_columns(channel_names):
+    # Column list for binlog.BinaryLogWriter (all float64)
+    return BINARY_TIME + ["raw:" + name for name in channel_names] + BINARY_DERIVED
+
+def binary_row(stamp, elapsed, scan, data, raw=None):
+    # Binary log row as a dict; columns of a disconnected scan stay NaN.
+    # raw: channel values to log if not the station scan (main.py --devices)
+    row = {"time": stamp, "test_time": elapsed}
+    raw = scan if raw is None else raw
+    if raw is not None:
+        for name, value in raw.items():
+            row["raw:" + name] = value
+    if scan is not None:
+        row.update(zip(BINARY_DERIVED, data[2:len(HEADERS)]))
+    return row
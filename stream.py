@@ -0,0 +1,192 @@
+"""
+Description:
+Hardware stream-mode acquisition for the analog channels (Setra dp, DewTran,
+barometer). The T7 scans the channels at kHz rates with eStreamStart; a reader
+thread moves each eStreamRead block into a preallocated ring buffer, and
+reduce() turns everything received since the previous call into mean / std /
+min / max per channel with NumPy. Thermocouple EF reads are not streamable
+and stay on the command-response path (ChannelMap.read_scan).
+
+A stream does not survive a reconnect: when eStreamRead fails, the reader
+drops the connection and reopens it, and a session connect hook restarts the
+stream on every (re)open, whichever thread reconnected. Until samples arrive
+again reduce() raises the stream's LJMError, so the caller logs the scan as
+disconnected instead of NaN.
+
+Dependencies:
+    - numpy
+    - threading (standard library)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import threading
+import time
+import numpy as np
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+RECONNECT_SECONDS = 0.5 # wait between reopen attempts after a stream failure
+
+
+class RingBuffer:
+    # Fixed size (capacity x channels) sample buffer. Readers take everything
+    # written since their last read; if they fall behind by more than the
+    # capacity the oldest samples are lost and counted in .overruns.
+
+    def __init__(self, capacity, n_channels):
+        self.data = np.zeros((capacity, n_channels))
+        self.capacity = capacity
+        self.written = 0  # total rows ever written
+        self.consumed = 0 # total rows handed out by read_new()
+        self.overruns = 0
+        self._lock = threading.Lock()
+
+    def write(self, block):
+        block = np.asarray(block).reshape(-1, self.data.shape[1])
+        if len(block) > self.capacity:
+            block = block[-self.capacity:]
+        with self._lock:
+            start = self.written % self.capacity
+            end = start + len(block)
+            if end <= self.capacity:
+                self.data[start:end] = block
+            else:
+                split = self.capacity - start
+                self.data[start:] = block[:split]
+                self.data[:end - self.capacity] = block[split:]
+            self.written += len(block)
+
+    def read_new(self):
+        with self._lock:
+            n = self.written - self.consumed
+            if n > self.capacity:
+                self.overruns += n - self.capacity
+                n = self.capacity
+            idx = np.arange(self.written - n, self.written) % self.capacity
+            self.consumed = self.written
+            return self.data[idx]
+
+
+class StreamAcquisition:
+
+    def __init__(self, session, channels, scan_rate=1000, scans_per_read=None,
+                 buffer_seconds=60):
+        # channels: Channel objects (voltage/current kinds) from a ChannelMap
+        self.session = session
+        self.channels = list(channels)
+        for c in self.channels:
+            if c.kind == "tc":
+                raise ValueError("Thermocouple EF reads cannot be streamed ({})".format(c.name))
+        self.scan_rate = float(scan_rate)
+        # Default: read ~10 blocks per second
+        self.scans_per_read = scans_per_read or max(1, int(self.scan_rate // 10))
+        self.buffer = RingBuffer(int(self.scan_rate * buffer_seconds), len(self.channels))
+        self.device_backlog = 0
+        self.ljm_backlog = 0
+        self.error = None    # LJMError of the failed stream, until it restarts
+        self.restarts = 0    # stream restarts after a reconnect
+        self._generation = 0 # incremented by every eStreamStart
+        self._running = False
+        self._thread = None
+        # Restart the stream whenever the session (re)opens the device
+        session.add_connect_hook(self._on_connect)
+
+    def _start_stream(self):
+        # Stream configuration: default resolution and auto settling
+        self.session.eWriteNames(["STREAM_TRIGGER_INDEX", "STREAM_CLOCK_SOURCE",
+                                  "STREAM_RESOLUTION_INDEX", "STREAM_SETTLING_US"],
+                                 [0, 0, 0, 0])
+        names = ["AIN{}".format(c.channel) for c in self.channels]
+        self.scan_rate = self.session.eStreamStart(self.scans_per_read, names, self.scan_rate)
+        self._generation += 1
+        self.error = None
+
+    def _on_connect(self, session):
+        if self._running:
+            self._start_stream()
+            self.restarts += 1
+
+    def start(self):
+        self._start_stream()
+        self._running = True
+        self._thread = threading.Thread(target=self._reader, name="ljm-stream", daemon=True)
+        self._thread.start()
+        return self.scan_rate
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.session.eStreamStop()
+        except self.session.ljm.LJMError:
+            pass # Stream already stopped (e.g. device disconnected)
+
+    def _reader(self):
+        while self._running:
+            generation = self._generation
+            try:
+                data, self.device_backlog, self.ljm_backlog = self.session.eStreamRead()
+            except self.session.ljm.LJMError as e:
+                if generation == self._generation:
+                    self.error = e
+                    self._reconnect(generation)
+                continue # else: restarted by another thread's reconnect meanwhile
+            self.buffer.write(data)
+
+    def _reconnect(self, generation):
+        # Reopen the device until the connect hook has restarted the stream
+        self.session.close()
+        while self._running and self._generation == generation:
+            try:
+                self.session.open()
+            except Exception:
+                self.session.close()
+            if self._generation == generation:
+                time.sleep(RECONNECT_SECONDS)
+
+    def reduce(self):
+        # Block statistics for all samples since the previous call, in the
+        # channel's engineering units (V, mA) with its offset applied.
+        # Raises the stream's LJMError while it is down and nothing arrived.
+        block = self.buffer.read_new()
+        if len(block) == 0 and self.error is not None:
+            raise self.error
+        stats = {}
+        for i, c in enumerate(self.channels):
+            if len(block) == 0:
+                # Nothing arrived yet - report NaN, not stale data
+                stats[c.name] = {"mean": float('nan'), "std": float('nan'),
+                                 "min": float('nan'), "max": float('nan'), "n": 0}
+                continue
+            col = block[:, i]
+            gain = c.convert(1.0) - c.convert(0.0)
+            stats[c.name] = {"mean": c.convert(col.mean()),
+                             "std": abs(gain) * col.std(),
+                             "min": c.convert(col.min()),
+                             "max": c.convert(col.max()),
+                             "n": len(col)}
+        return stats
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    from fake_ljm import FakeLJM
+    from channel_map import ChannelMap
+    import labjack_functions as ljf
+
+    cmap = ChannelMap.load()
+    fake = FakeLJM({"AIN10": 0.55, "AIN11": 1.2, "AIN12": 2.0}, stream_noise=0.01)
+    session = ljf.LabJackSession(backend=fake)
+    cmap.configure(session)
+    with StreamAcquisition(session, cmap.subset(kinds=("voltage", "current")), 5000) as st:
+        time.sleep(1.0)
+        for name, s in st.reduce().items():
+            print("{:10s} n={n:5d} mean={mean:.4f} std={std:.4f} min={min:.4f} max={max:.4f}".format(name, **s))
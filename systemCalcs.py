@@ -16,7 +16,8 @@ inW_to_inHg = 0.0736912
 # Velocity Pressure
 def velocity(Pv, rho):
     
-    V = 1096.5 * math.sqrt(abs(Pv/rho))
+    # np.sqrt/np.abs so whole arrays (columns) work as well as scalars
+    V = 1096.5 * np.sqrt(np.abs(Pv/rho))
     return V
 
 # Actual Volumetric Flowrate - Numerical Evaluation of Duct Volumetric Flow Rate
@@ -50,6 +51,112 @@ def Pp(Tdew):
     pp = np.exp((c1/T)+c2+(c3*T)+(c4*T**2)+(c5*T**3)+(c6*np.log(T))) * 2.03602 # psia to inHg -> for psia to mbar: 68.9475728 
     return pp
 
+# d(ln pp)/dT of the correlation above [1/degF]
+def _dlnPp(Tdew):
+    T = Tdew + 459.67
+    return (1.0440397e4/T**2 - 2.7022355e-2 + 2*1.2890360e-5*T
+            - 3*2.4780681e-9*T**2 + 6.5459673/T)
+
+# Partial Pressure - lookup table. The correlation is tabulated once on a
+# dense grid (values and exact slopes) and evaluated as a cubic Hermite
+# polynomial per grid interval. With the default 0.25 degF grid over
+# -40..200 degF the relative error against Pp() is below 1e-10 (measured on
+# construction and stored in .max_rel_error); values outside the table use the
+# exact formula. Arrays are evaluated in blocks of PP_BLOCK values so the
+# index / coefficient scratch stays in cache: one row gather of the four
+# coefficients per value, then Horner. That is only about 1.3x faster than
+# Pp() on arrays (NumPy's exp/log are vectorized too) and on single numbers
+# no faster, so the table is an accuracy-bounded alternative and the exact
+# formula stays the default (benchmarks/pp_lut.py measures both).
+PP_BLOCK = 16384
+
+class PpTable:
+
+    def __init__(self, t_min=-40.0, t_max=200.0, step=0.25):
+        self.t_min = float(t_min)
+        self.step = float(step)
+        n = int(round((t_max - t_min)/step)) + 1
+        self.t_max = self.t_min + (n - 1)*self.step
+        T = self.t_min + self.step*np.arange(n)
+        y = Pp(T)
+        dy = y*_dlnPp(T)*self.step # slope per grid step
+        # p(u) = ((a*u + b)*u + c)*u + d on each interval, u in [0, 1); one
+        # row of coefficients per interval, gathered with a single take
+        self.coef = np.column_stack([2*y[:-1] - 2*y[1:] + dy[:-1] + dy[1:],
+                                     -3*y[:-1] + 3*y[1:] - 2*dy[:-1] - dy[1:],
+                                     dy[:-1], y[:-1]])
+        self.intervals = n - 1
+        self._lists = tuple(col.tolist() for col in self.coef.T)
+        # Worst relative error, checked between all grid points
+        Tc = (self.t_min + self.step*(np.arange(n - 1)[:, None] + np.linspace(0.05, 0.95, 19))).ravel()
+        exact = Pp(Tc)
+        self.max_rel_error = float(np.max(np.abs(self(Tc) - exact)/exact))
+
+    def __call__(self, Tdew):
+        if isinstance(Tdew, (int, float)):
+            return self._scalar(Tdew)
+        T = np.asarray(Tdew, dtype=float)
+        flat_T = T.reshape(-1) if T.flags.c_contiguous else T.ravel()
+        pp = np.empty(T.shape)
+        flat_pp = pp.reshape(-1)
+        n = min(len(flat_T), PP_BLOCK)
+        u = np.empty(n)
+        i = np.empty(n, dtype=np.intp)
+        c = np.empty((n, 4))
+        for start in range(0, len(flat_T), PP_BLOCK):
+            out = flat_pp[start:start + PP_BLOCK]
+            m = len(out)
+            x = u[:m]
+            np.subtract(flat_T[start:start + PP_BLOCK], self.t_min, out=x)
+            x /= self.step
+            if not (x.min() >= 0 and x.max() < self.intervals):
+                return self._mixed(T)
+            i[:m] = x
+            x -= i[:m]
+            np.take(self.coef, i[:m], axis=0, out=c[:m])
+            np.multiply(c[:m, 0], x, out=out)
+            out += c[:m, 1]
+            out *= x
+            out += c[:m, 2]
+            out *= x
+            out += c[:m, 3]
+        return pp if pp.ndim else float(pp)
+
+    def _mixed(self, T):
+        # Some values outside the table (or NaN, or the last grid point):
+        # the table where it applies, the exact formula elsewhere
+        x = (T - self.t_min)/self.step
+        inside = (x >= 0) & (x <= self.intervals)
+        pp = Pp(np.where(inside, self.t_min, T))
+        xi = x[inside]
+        i = np.minimum(xi.astype(np.intp), self.intervals - 1)
+        u = xi - i
+        a, b, c, d = (np.take(self.coef[:, k], i) for k in range(4))
+        pp[inside] = ((a*u + b)*u + c)*u + d
+        return pp if pp.ndim else float(pp)
+
+    def _scalar(self, Tdew):
+        x = (Tdew - self.t_min)/self.step
+        if not 0 <= x <= self.intervals:
+            return float(Pp(Tdew)) # Outside the table (or NaN)
+        i = min(int(x), self.intervals - 1)
+        u = x - i
+        a, b, c, d = self._lists
+        return ((a[i]*u + b[i])*u + c[i])*u + d[i]
+
+_pp_table = None
+
+def pp_table():
+    # The shared lookup table behind Pp_fast() (built on first use)
+    global _pp_table
+    if _pp_table is None:
+        _pp_table = PpTable()
+    return _pp_table
+
+def Pp_fast(Tdew):
+    # Pp() through the lookup table (see PpTable for when it is faster)
+    return pp_table()(Tdew)
+
 # Humidity Ratio (mixing ratio) - Mass of Water Vapor to Mass of Dry Air
 def W(Pbar, pp):
 
@@ -88,6 +195,68 @@ def DP_DewTran(Aout, lo_r, hi_r):
     DP_T = (y*1.8) + 32 # deg C -> deg F
     return DP_T
 
+##############################################################################
+# FULL CALCULATION CHAIN (vectorized)
+##############################################################################
+# Every input may be a scalar or a NumPy array / pandas column; they broadcast
+# against each other, so a whole log is computed in one call. The steps and
+# the rounding (round_results=True) are the same as the per-scan calculation
+# in main.py and HG_Calculator.py. Room humidity comes either from the room
+# dew point (Tdew_room) or directly as a humidity ratio (W_room).
+def heat_gain_chain(Pbar_inHg, pdiff, Tdb, Tdew, Tdb_room, D, Tdew_room=None,
+                    W_room=None, Pbar_mbar=None, round_results=True, fast_Pp=False):
+    # fast_Pp: use the Pp_fast lookup table instead of the exact correlation
+    pp_func = Pp_fast if fast_Pp else Pp
+    if (Tdew_room is None) == (W_room is None):
+        raise ValueError("Provide exactly one of Tdew_room or W_room")
+    Pbar_inHg = np.asarray(Pbar_inHg, dtype=float)
+    Tdb = np.asarray(Tdb, dtype=float)
+    Tdb_room = np.asarray(Tdb_room, dtype=float)
+    if Pbar_mbar is None:
+        Pbar_mbar = Pbar_inHg/millibar_to_inHg
+    r = {}
+    # Partial pressures (water vapor at dew point, saturation at dry bulb)
+    r["pp_water"] = pp_func(np.asarray(Tdew, dtype=float))
+    r["pp_sat"] = pp_func(Tdb)
+    r["pp_sat_room"] = pp_func(Tdb_room)
+    # Humidity ratios
+    r["W"] = W(Pbar_inHg, r["pp_water"])
+    if Tdew_room is not None:
+        r["pp_water_room"] = pp_func(np.asarray(Tdew_room, dtype=float))
+        r["W_room"] = W(Pbar_inHg, r["pp_water_room"])
+    else:
+        r["W_room"] = np.asarray(W_room, dtype=float)
+        # Back out the room vapor pressure from the humidity ratio
+        r["pp_water_room"] = Pbar_inHg*r["W_room"]/(0.621945 + r["W_room"])
+    # Densities and relative humidity
+    r["rho"] = rho(Pbar_mbar, Tdb, r["W"])
+    r["rho_room"] = rho(Pbar_mbar, Tdb_room, r["W_room"])
+    r["rh"] = RH(r["pp_water"], r["pp_sat"])
+    r["rh_room"] = RH(r["pp_water_room"], r["pp_sat_room"])
+    # Velocity and flow
+    r["V"] = velocity(np.asarray(pdiff, dtype=float), r["rho"])
+    Q_Acfm = QflowActual(r["V"], np.asarray(D, dtype=float))
+    if round_results:
+        Q_Acfm = np.round(Q_Acfm, 2)
+    Q_Scfm = QflowStandard(Q_Acfm, Pbar_inHg, Tdb)
+    if round_results:
+        Q_Scfm = np.round(Q_Scfm, 2)
+    r["Q_Acfm"] = Q_Acfm
+    r["Q_Scfm"] = Q_Scfm
+    # Heat gain [Btu/h] (approx.)
+    q_sensible = 1.08 * Q_Scfm * (Tdb - Tdb_room)
+    q_latent = 4840 * Q_Scfm * (r["W"] - r["W_room"])
+    if round_results:
+        q_sensible = np.round(q_sensible, 1)
+        q_latent = np.round(q_latent, 1)
+    q_total = q_sensible + q_latent
+    if round_results:
+        q_total = np.round(q_total, 1)
+    r["q_sensible"] = q_sensible
+    r["q_latent"] = q_latent
+    r["q_total"] = q_total
+    return r
+
 
 if __name__ == "__main__":
     
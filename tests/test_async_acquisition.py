@@ -0,0 +1,88 @@
+import asyncio
+
+import labjack_functions as ljf
+from async_acquisition import AsyncLabJack, ScanBroadcaster
+from channel_map import ChannelMap
+from fake_ljm import FakeLJM, LJMError
+
+
+def broadcaster(interval=0.01):
+    fake = FakeLJM()
+    lj = AsyncLabJack(ljf.LabJackSession(backend=fake))
+    channel_map = ChannelMap.load()
+    channel_map.configure(lj.session)
+    return fake, lj, ScanBroadcaster(lj, channel_map, interval=interval)
+
+
+async def collect(sub, until=None):
+    items = []
+    async for item in sub:
+        items.append(item)
+        if until is not None and until(item):
+            break
+    return items
+
+
+def test_stalled_subscriber_does_not_hold_back_a_fast_one():
+    async def run():
+        fake, lj, scans = broadcaster()
+        fast, stalled = scans.subscribe(), scans.subscribe(maxsize=3)
+        consumer = asyncio.create_task(collect(fast))
+        scans.start()
+        await asyncio.sleep(0.15)
+        dropped = stalled.dropped
+        await asyncio.sleep(0.15)
+        assert stalled.dropped > dropped > 0
+        await scans.stop()
+        items = await asyncio.wait_for(consumer, 1.0)
+        lj.close()
+        return scans, fast, stalled, items
+
+    scans, fast, stalled, items = asyncio.run(run())
+    assert fast.dropped == 0
+    assert len(items) == fast.received == scans.scans
+    assert all(item.scan is not None for item in items)
+    # The stalled queue holds its newest scans, the older ones were dropped
+    assert stalled.dropped == scans.scans + 1 - stalled.queue.maxsize
+    assert stalled.received == 0
+
+
+def test_read_error_is_published_as_an_item():
+    async def run():
+        fake, lj, scans = broadcaster()
+        sub = scans.subscribe()
+        fake.disconnect() # the read and its one retry both fail
+
+        def reconnect_after_error(item):
+            if item.error is not None:
+                fake.reconnect()
+            return item.scan is not None
+
+        scans.start()
+        items = await asyncio.wait_for(collect(sub, until=reconnect_after_error), 1.0)
+        await scans.stop()
+        lj.close()
+        return scans, items
+
+    scans, items = asyncio.run(run())
+    assert items[0].scan is None and isinstance(items[0].error, LJMError)
+    assert items[-1].scan is not None and items[-1].error is None
+    assert scans.errors >= sum(item.error is not None for item in items) >= 1
+
+
+def test_stop_ends_every_subscription():
+    async def run():
+        fake, lj, scans = broadcaster()
+        subs = [scans.subscribe(), scans.subscribe(maxsize=2)]
+        consumers = [asyncio.create_task(collect(subs[0]))]
+        scans.start()
+        await asyncio.sleep(0.05)
+        await scans.stop()
+        # The waiting consumer ends, the stalled one reads what is left and ends
+        done = await asyncio.wait_for(asyncio.gather(*consumers, collect(subs[1])), 1.0)
+        lj.close()
+        return done
+
+    waiting, stalled = asyncio.run(run())
+    assert len(waiting) > 0
+    assert len(stalled) == 1 # the end marker displaced the oldest of two
@@ -0,0 +1,19 @@
+import gc
+
+import labjack_functions as ljf
+from channel_map import ChannelMap
+from fake_ljm import FakeLJM
+
+
+def test_configure_adds_one_hook_per_session():
+    cmap = ChannelMap.load()
+    for _ in range(3):
+        # A new session may reuse the address of a freed one; it still has
+        # to get the hook
+        session = ljf.LabJackSession(backend=FakeLJM())
+        cmap.configure(session)
+        cmap.configure(session)
+        assert session._connect_hooks == [cmap.write_config]
+        del session
+        gc.collect()
+    assert len(cmap._configured) == 0
@@ -0,0 +1,50 @@
+import time
+
+from devices import DeviceRegistry, MultiDeviceAcquisition
+from fake_ljm import FakeLJM
+from scheduler import Scheduler
+from sim_ljm import SimClock
+
+
+def run_ticks(clock, latency, interval, ticks):
+    backends = {name: FakeLJM({"AIN2_EF_READ_A": 80.0}, read_latency=s,
+                              clock=clock.monotonic, sleep=clock.sleep)
+                for name, s in latency.items()}
+    registry = DeviceRegistry.from_dict({name: {"identifier": 470010000 + i}
+                                         for i, name in enumerate(backends)}, backends)
+    daq = MultiDeviceAcquisition(registry, clock)
+    sched = Scheduler(interval, clock=clock.monotonic,
+                      wait=lambda delay: clock.sleep(delay))
+    on_time = dict.fromkeys(latency, 0)
+    for i in range(ticks):
+        tick = sched.next_tick()
+        record = daq.acquire(tick)
+        sched.done(tick)
+        for name, scan in record["devices"].items():
+            on_time[name] += scan is not None
+    daq.close()
+    return daq, on_time
+
+
+def test_each_device_counts_once_per_tick():
+    # hood1 takes 2.5 intervals: each of its ticks is late or busy, and its
+    # stale results are not counted again. 10x fast-forward: 0.2 s real per tick.
+    ticks = 8
+    tic = time.monotonic()
+    daq, on_time = run_ticks(SimClock(speed=10), {"hood0": 0.0, "hood1": 5.0}, 2.0, ticks)
+    assert on_time == {"hood0": ticks, "hood1": 0}
+    assert daq.late + daq.busy == ticks
+    assert daq.late > 0 and daq.busy > 0
+    # The deadline budget is waited in real seconds (1.8 s per tick if not)
+    assert time.monotonic() - tic < ticks*0.9
+
+
+def test_virtual_time_deadline():
+    # Virtual time: reads take no real time, lateness is judged on the
+    # simulated clock (shared by all devices, so a slow read can make the
+    # others late too). Still one count per device and tick.
+    tic = time.monotonic()
+    daq, on_time = run_ticks(SimClock(speed=None), {"hood0": 0.0, "hood1": 30.0}, 5.0, 4)
+    assert on_time["hood1"] == 0
+    assert sum(on_time.values()) + daq.late + daq.busy == 2*4
+    assert time.monotonic() - tic < 5.0
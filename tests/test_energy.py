@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+import pytest
+
+import energy
+from adaptive import AdaptiveInterval
+from energy import EnergyIntegrator, max_gap_for
+
+DURATION = 3*3600.0
+TAU = 600.0
+
+
+def heat_gain(t):
+    # Appliance on for 1.5 h (warm-up), then off (cool-down) [Btu/h]
+    on = 3000*(1 - math.exp(-min(t, DURATION/2)/TAU))
+    return on if t < DURATION/2 else on*math.exp(-(t - DURATION/2)/TAU)
+
+def exact_total():
+    half = DURATION/2
+    on = 3000*(half - TAU*(1 - math.exp(-half/TAU)))
+    off = 3000*(1 - math.exp(-half/TAU))*TAU*(1 - math.exp(-half/TAU))
+    return (on + off)/3600
+
+
+def run(interval, slow=None):
+    # Integrate like main.py: the gap limit follows the slowest scan interval
+    rate = AdaptiveInterval(interval, slow, hold=120) if slow else None
+    integrator = EnergyIntegrator(["Total HG"], max_gap=max_gap_for(slow or interval))
+    t = 0.0
+    while t <= DURATION:
+        q = heat_gain(t)
+        integrator.add(t, {"Total HG": q})
+        step = rate.update(t, {"Total HG": q}) if rate else interval
+        t += step
+    return integrator, rate
+
+
+@pytest.mark.parametrize("interval, slow", [(1, None), (90, None), (5, 90), (1, 10)])
+def test_totals_do_not_depend_on_the_scan_interval(interval, slow):
+    integrator, rate = run(interval, slow)
+    assert integrator.gap_seconds["Total HG"] == 0
+    assert integrator.seconds["Total HG"] > DURATION - (slow or interval)
+    assert integrator.totals["Total HG"] == pytest.approx(exact_total(), rel=2e-3)
+    if rate is not None:
+        assert rate.time_slow > 0
+
+
+def test_real_gaps_are_not_bridged():
+    integrator = EnergyIntegrator(["Total HG"], max_gap=max_gap_for(90))
+    for t in (0, 90, 180, 1180, 1270):
+        integrator.add(t, {"Total HG": 3600.0})
+    assert integrator.gap_seconds["Total HG"] == 1000
+    assert integrator.totals["Total HG"] == pytest.approx(270.0)
+
+
+def test_integrate_matches_incremental_with_auto_gap():
+    t = np.concatenate([np.arange(0, 600, 5.0), np.arange(600, 3600, 90.0), [5000, 5090]])
+    q = 2000 + 500*np.sin(t/700)
+    q[7] = np.nan
+    running = energy.integrate(t, {"Total HG": q})["Total HG"]
+    assert energy.auto_max_gap(t) == max_gap_for(90)
+    integrator = EnergyIntegrator(["Total HG"], max_gap=energy.auto_max_gap(t))
+    for ti, qi in zip(t, q):
+        integrator.add(ti, {"Total HG": qi})
+    assert running[-1] == pytest.approx(integrator.totals["Total HG"], rel=1e-12)
+    assert integrator.gap_seconds["Total HG"] == 5000 - t[-3]
+
+
+def test_integrate_csv_reads_only_complete_new_rows(tmp_path):
+    path = tmp_path / "log.csv"
+    header = "10/18/2026\nTest Time,Sensible HG,Latent HG,Total HG\n"
+    rows = ["{:.2f},{},{},{}\n".format(i*1.5, 1000, 200, 1200) for i in range(20)]
+    path.write_text(header + "".join(rows[:10]) + rows[10][:5])
+    integrator = energy.integrate_csv(str(path))
+    assert integrator.n == 10
+    path.write_text(header + "".join(rows))
+    integrator = energy.integrate_csv(str(path), integrator)
+    assert integrator.n == 20
+    assert integrator.gap_seconds["Total HG"] == 0
+    assert integrator.totals["Total HG"] == pytest.approx(1200*19*90/3600)
+
+
+def test_integrate_csv_prefers_unrounded_elapsed_seconds(tmp_path):
+    # Test Time is rounded to 0.01 min (0.6 s): steps of 1.3 s come out
+    # uneven and the total is off; Elapsed s is not
+    path = tmp_path / "log.csv"
+    rows = ["{:.2f},{:.3f},{}\n".format(round(i*1.3/60, 2), i*1.3, 3600) for i in range(1000)]
+    path.write_text("10/18/2026\nTest Time,Elapsed s,Total HG\n" + "".join(rows))
+    integrator = energy.integrate_csv(str(path), EnergyIntegrator(["Total HG"], max_gap=None))
+    assert integrator.source["time"] == ["Elapsed s", 1.0]
+    assert integrator.totals["Total HG"] == pytest.approx(999*1.3)
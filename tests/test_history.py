@@ -0,0 +1,56 @@
+import math
+
+import numpy as np
+import pytest
+
+from history import History
+
+
+@pytest.fixture
+def hist():
+    # 2000 s at 1 s, value = test time; raw ring covers 360 s, then 10 s
+    # buckets for an hour and 100 s buckets for 10 hours. One value missing.
+    hist = History(["a", "b"], raw_hours=0.1, interval=1.0, tiers=((10, 3600), (100, 36000)))
+    for t in range(2000):
+        hist.add(float(t), {"a": "OPEN" if t == 505 else t, "b": 1.0})
+    return hist
+
+
+def test_series_picks_the_finest_level_that_covers_the_span(hist):
+    # Raw scans while the raw ring covers the span
+    t, v = hist.series("a", 300)
+    assert len(t) == 301 and t[0] == 1699
+    assert np.array_equal(t, v)
+    # 10 s buckets: the bucket holding t_last - span, through the open one
+    t, v = hist.series("a", 1000)
+    assert hist.tier_for(1000).resolution == 10
+    assert t[0] == 990 and t[-1] == 1990 and len(t) == 101
+    # Beyond the 10 s tier's span: 100 s buckets of the whole test
+    t, v = hist.series("a", 5000)
+    assert hist.tier_for(5000).resolution == 100
+    assert np.array_equal(t, np.arange(0, 2000, 100.0))
+    assert hist.tier_for(10**6) is hist.tiers[-1]
+
+
+def test_bucket_mean_min_max(hist):
+    t, mean = hist.series("a", 1000)
+    low, high = hist.series("a", 1000, "min")[1], hist.series("a", 1000, "max")[1]
+    assert (mean[0], low[0], high[0]) == (994.5, 990, 999)
+    # The open bucket is included
+    assert (mean[-1], low[-1], high[-1]) == (1994.5, 1990, 1999)
+    t, mean = hist.series("a", 5000)
+    low, high = hist.series("a", 5000, "min")[1], hist.series("a", 5000, "max")[1]
+    assert (mean[0], low[0], high[0]) == (49.5, 0, 99)
+    # The missing value is skipped, not counted as 0
+    k = list(t).index(500)
+    assert mean[k] == pytest.approx((sum(range(500, 600)) - 505)/99)
+    assert (low[k], high[k]) == (500, 599)
+    assert hist.summary("a", 5000) == (pytest.approx(np.mean(mean)), 0, 1999)
+    assert hist.summary("b") == (1.0, 1.0, 1.0)
+
+
+def test_summary_of_a_never_measured_field():
+    hist = History(["a"], raw_hours=0.01, interval=1.0)
+    for t in range(100):
+        hist.add(float(t), {})
+    assert all(math.isnan(x) for x in hist.summary("a"))
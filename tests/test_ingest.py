@@ -0,0 +1,72 @@
+import datetime
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import ingest
+
+
+def write_workbook(path, scans=5, dp=0.05):
+    # Two header rows to skip, a mixed column (numbers + footer text), a time
+    # of day column and a plain numeric one
+    rows = [["Test", None, None], ["Export", None, None], ["E.sec", "Time", "Dp"]]
+    for i in range(scans):
+        rows.append([i*5, datetime.time(9, 0, i*5), dp + i/1000])
+    rows.append(["Total test duration", None, None])
+    pd.DataFrame(rows).to_excel(path, header=False, index=False)
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / "log.xlsx"
+    write_workbook(path)
+    return str(path)
+
+
+def test_cached_read_matches_fresh_parse(workbook):
+    fresh = ingest.read_log(workbook, skiprows=2, cache=False)
+    first = ingest.read_log(workbook, skiprows=2)   # parses and stores the cache
+    cached = ingest.read_log(workbook, skiprows=2)  # loads the cache
+    assert ingest._load_cache(workbook, 2, None)[0] is not None
+    pd.testing.assert_frame_equal(first, fresh)
+    pd.testing.assert_frame_equal(cached, fresh)
+    assert fresh["E.sec"].iloc[-1] == "Total test duration"
+    assert fresh["Dp"].dtype == float
+
+
+def test_cached_column_subset_matches(workbook):
+    ingest.read_log(workbook, skiprows=2, usecols=["Dp"])
+    cached = ingest.read_log(workbook, skiprows=2, usecols=["E.sec", "Dp"])
+    again = ingest.read_log(workbook, skiprows=2, usecols=["E.sec", "Dp"])
+    fresh = ingest.read_log(workbook, skiprows=2, usecols=["E.sec", "Dp"], cache=False)
+    pd.testing.assert_frame_equal(cached, fresh)
+    pd.testing.assert_frame_equal(again, fresh)
+
+
+def test_rewritten_workbook_is_parsed_again(workbook):
+    old = ingest.read_log(workbook, skiprows=2)
+    write_workbook(workbook, scans=8, dp=0.2)
+    # Make sure the mtime moves even on coarse file system clocks
+    st = os.stat(workbook)
+    os.utime(workbook, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    new = ingest.read_log(workbook, skiprows=2)
+    pd.testing.assert_frame_equal(new, ingest.read_log(workbook, skiprows=2, cache=False))
+    assert len(new) == len(old) + 3
+    assert new["Dp"].iloc[0] == 0.2
+    # The cache now describes the new file and serves it
+    with open(ingest.cache_paths(workbook)[1]) as f:
+        meta = json.load(f)
+    st = os.stat(workbook)
+    assert (meta["mtime_ns"], meta["size"]) == (st.st_mtime_ns, st.st_size)
+    pd.testing.assert_frame_equal(ingest._load_cache(workbook, 2, None)[0], new)
+
+
+def test_other_skiprows_misses_the_cache(workbook):
+    ingest.read_log(workbook, skiprows=2)
+    assert ingest._load_cache(workbook, 3, None) == (None, None)
+    shifted = ingest.read_log(workbook, skiprows=3)
+    pd.testing.assert_frame_equal(shifted, ingest.read_log(workbook, skiprows=3, cache=False))
+    assert list(shifted.columns) != ["E.sec", "Time", "Dp"]
+    assert ingest._load_cache(workbook, 2, None) == (None, None)
@@ -0,0 +1,37 @@
+import pytest
+
+import labjack_functions as ljf
+from fake_ljm import FakeLJM, LJMError
+
+
+def test_reconnect_retries_once():
+    fake = FakeLJM({"AIN0": 1.5})
+    session = ljf.LabJackSession(backend=fake)
+    session.open()
+    fake.disconnect()
+    fake.reconnect()
+    assert session.eReadName("AIN0") == 1.5
+    assert session.reconnects == 1
+
+
+def test_failing_connect_hook_does_not_recurse():
+    session = ljf.LabJackSession(backend=FakeLJM({"AIN0": 1.0}))
+    calls = []
+
+    def hook(s):
+        calls.append(s)
+        s.eWriteNames(["AIN0_RANGE"], [10.0])
+        raise LJMError(errorString="configuration rejected")
+
+    session.add_connect_hook(hook)
+    with pytest.raises(LJMError):
+        session.eReadName("AIN0")
+    # First open plus the one retry, and the session is left closed
+    assert len(calls) == 2
+    assert session.handle is None
+
+
+def test_stream_read_on_a_closed_session_raises_ljm_error():
+    session = ljf.LabJackSession(backend=FakeLJM({"AIN0": 1.0}))
+    with pytest.raises(LJMError):
+        session.eStreamRead()
@@ -0,0 +1,99 @@
+import http.client
+import json
+import time
+
+import pytest
+
+from live_server import LiveServer
+
+
+@pytest.fixture
+def live():
+    server = LiveServer(0).start()
+    yield server
+    server.close()
+
+
+def get(live, path):
+    conn = http.client.HTTPConnection("127.0.0.1", live.port, timeout=5)
+    conn.request("GET", path)
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return response.status, body
+
+
+def replay(live, query):
+    status, body = get(live, "/replay?" + query)
+    assert status == 200
+    return [json.loads(line)["k"] for line in body.splitlines()]
+
+
+def open_events(live, path, headers=None):
+    # Connect an SSE client and wait until the server has registered it
+    clients = live.stats()["clients"]
+    conn = http.client.HTTPConnection("127.0.0.1", live.port, timeout=5)
+    conn.request("GET", path, headers=headers or {})
+    response = conn.getresponse()
+    for _ in range(500):
+        if live.stats()["clients"] > clients:
+            break
+        time.sleep(0.01)
+    return conn, response
+
+
+def read_ids(response, count):
+    ids = []
+    while len(ids) < count:
+        line = response.readline()
+        if line.startswith(b"id: "):
+            ids.append(int(line[4:]))
+    return ids
+
+
+def test_replay_last(live):
+    for k in range(5):
+        live.publish({"k": k})
+    assert replay(live, "last=2") == [3, 4]
+    assert replay(live, "last=0") == []
+    assert replay(live, "last=-3") == []
+    assert replay(live, "last=50") == [0, 1, 2, 3, 4]
+    assert replay(live, "since=2") == [3, 4]
+    assert get(live, "/replay?last=x")[0] == 400
+
+
+def test_events_decimation_and_reconnect_replay(live):
+    for k in range(3):
+        live.publish({"k": k})
+    # Reconnect after id 0: the missed records come first
+    conn, response = open_events(live, "/events", {"Last-Event-ID": "0"})
+    decimated, every = open_events(live, "/events?every=2")
+    for k in range(3, 9):
+        live.publish({"k": k})
+    assert read_ids(response, 8) == list(range(1, 9))
+    assert read_ids(every, 3) == [3, 5, 7]
+    conn.close()
+    decimated.close()
+
+
+def test_slow_client_drops_are_counted():
+    # A client that never reads: once the socket buffers are full its
+    # handler blocks and the oldest queued frames are dropped, publish()
+    # itself never waits
+    live = LiveServer(0, history=5, client_queue=3).start()
+    conn, response = open_events(live, "/events")
+    blob = "x"*(1 << 20)
+    tic = time.monotonic()
+    for k in range(40):
+        live.publish({"k": k, "blob": blob})
+    assert time.monotonic() - tic < 2.0
+    assert live.stats()["dropped"] > 0
+    response.close()
+    conn.close()
+    for _ in range(500):
+        if not live.stats()["clients"]:
+            break
+        time.sleep(0.01)
+    # The count is kept after the client is gone
+    assert live.stats()["clients"] == 0 and live.stats()["dropped"] > 0
+    live.close()
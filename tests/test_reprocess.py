@@ -0,0 +1,36 @@
+import glob
+import os
+
+import pandas as pd
+import pytest
+
+import HG_interval_calc as hgi
+import main
+
+
+@pytest.fixture(scope="module")
+def station_log(tmp_path_factory):
+    # A short simulated test logged by main.py
+    folder = str(tmp_path_factory.mktemp("Data"))
+    main.main(["--log", "--simulate", "synthetic", "--speed", "2000", "--duration", "0.05",
+               "--quiet", "--data-dir", folder])
+    return glob.glob(os.path.join(folder, "*.csv"))[0]
+
+
+def test_reprocess_station_log_with_its_preset(station_log, tmp_path):
+    output = str(tmp_path / "out.csv")
+    results, rate = hgi.reprocess(station_log, output, cache=False, energy=True)
+    log = pd.read_csv(station_log, skiprows=1)
+    assert len(results) == len(log) > 10
+    # Same chain on the logged inputs; Pdif_exh is logged to 0.01 inWc, so
+    # the flow agrees to about 1 %
+    assert ((results["Q_Scfm"] - log["Q_Scfm"]).abs()/log["Q_Scfm"]).max() < 0.02
+    assert results["Total Btu"].iloc[-1] > 0
+    assert len(pd.read_csv(output)) == len(log)
+
+
+def test_reprocess_command_line_on_station_log(station_log, tmp_path, capsys):
+    output = str(tmp_path / "out.csv")
+    hgi.main([station_log, "-o", output, "--no-cache"])
+    assert "rows ->" in capsys.readouterr().out
+    assert os.path.exists(output)
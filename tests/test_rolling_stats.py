@@ -0,0 +1,78 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+import station
+from rolling_stats import RollingColumns, SteadyState, Welford, load_criteria
+
+
+def test_rolling_columns_match_the_samples_in_the_window():
+    rng = np.random.default_rng(0)
+    window = RollingColumns(600, capacity=700, width=3)
+    t = np.cumsum(rng.choice([1.0, 5.0, 10.0], 3000))
+    x = np.column_stack([t*0.5 + rng.normal(0, 3, len(t)), rng.normal(50, 2, len(t)),
+                         rng.normal(0, 1, len(t))])
+    x[::7, 1] = np.nan
+    x[:, 2] = np.nan # never measured
+    for ti, row in zip(t, x):
+        window.add(ti, row)
+    inside = t >= t[-1] - 600
+    for k in range(2):
+        sel = inside & ~np.isnan(x[:, k])
+        assert window.n[k] == sel.sum()
+        assert window.mean[k] == pytest.approx(x[sel, k].mean(), rel=1e-9)
+        assert window.std[k] == pytest.approx(x[sel, k].std(ddof=1), rel=1e-6)
+        assert window.slope[k] == pytest.approx(np.polyfit(t[sel], x[sel, k], 1)[0], rel=1e-6, abs=1e-9)
+    assert math.isnan(window.mean[2]) and math.isnan(window.slope[2])
+
+
+def test_welford_row_matches_scalar_per_column():
+    rng = np.random.default_rng(1)
+    row = Welford(2)
+    scalar = [Welford(), Welford()]
+    for _ in range(500):
+        x = rng.normal(10, 3, 2)
+        w = rng.uniform(0, 5, 2)*(rng.random(2) > 0.2)
+        row.add(x, w)
+        for k in range(2):
+            scalar[k].add(x[k], w[k])
+    for k in range(2):
+        assert row.n[k] == scalar[k].n
+        assert row.mean[k] == pytest.approx(scalar[k].mean, rel=1e-12)
+        assert row.std[k] == pytest.approx(scalar[k].std, rel=1e-9)
+
+
+def test_steady_state_tracks_every_derived_column():
+    columns = station.HEADERS[2:]
+    criteria = {"Total HG": (100.0, 5.0), "Tdb_exh": (0.5, 0.05)}
+    det = SteadyState(10, min_interval=5, criteria=criteria, columns=columns)
+    rng = np.random.default_rng(2)
+    row = np.full(len(columns), np.nan)
+    for k in range(400):
+        t = k*5.0
+        row[columns.index("Tdb_exh")] = 95 - 20*math.exp(-t/300) + rng.normal(0, 0.1)
+        row[columns.index("Total HG")] = 4000 + rng.normal(0, 30)
+        det.add(t, row)
+    assert det.steady
+    assert 600 <= det.time_to_steady < 1800
+    assert set(det.status()) == set(columns)
+    mean, std, slope = det.status(["Total HG"])["Total HG"]
+    assert (mean, std, slope) == det.status()["Total HG"]
+    # The window statistics are written into the same arrays on every call
+    assert det.window.std is det.window.std
+    assert det.steady_avg.mean[columns.index("Total HG")] == pytest.approx(4000, abs=10)
+    with pytest.raises(ValueError):
+        SteadyState(criteria={"Nope": (1.0, 1.0)}, columns=columns)
+
+
+def test_load_criteria(tmp_path):
+    assert load_criteria("Total HG=200:8,Q_Scfm=4:0.4") == {"Total HG": (200.0, 8.0),
+                                                          "Q_Scfm": (4.0, 0.4)}
+    path = tmp_path / "criteria.csv"
+    path.write_text("Tdb_exh,0.5,0.05\nTotal HG,200,8\n")
+    assert load_criteria(str(path)) == {"Tdb_exh": (0.5, 0.05), "Total HG": (200.0, 8.0)}
+    path = tmp_path / "criteria.json"
+    path.write_text(json.dumps({"Q_Scfm": [4, 0.4]}))
+    assert load_criteria(str(path)) == {"Q_Scfm": (4.0, 0.4)}
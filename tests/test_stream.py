@@ -0,0 +1,38 @@
+import time
+
+import pytest
+
+import labjack_functions as ljf
+from channel_map import ChannelMap
+from fake_ljm import FakeLJM, LJMError
+from stream import StreamAcquisition
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+def test_stream_restarts_after_reconnect(monkeypatch):
+    monkeypatch.setattr("stream.RECONNECT_SECONDS", 0.02)
+    cmap = ChannelMap.load()
+    fake = FakeLJM({"AIN10": 0.55, "AIN11": 1.2, "AIN12": 2.0})
+    session = ljf.LabJackSession(backend=fake)
+    cmap.configure(session)
+    with StreamAcquisition(session, cmap.subset(kinds=("voltage", "current")), 2000) as st:
+        wait_for(lambda: st.buffer.written > 0)
+        st.reduce()
+        fake.disconnect()
+        wait_for(lambda: st.error is not None)
+        st.reduce() # samples received before the failure
+        # Down: the failure is raised, not reported as NaN
+        with pytest.raises(LJMError):
+            st.reduce()
+        fake.reconnect()
+        wait_for(lambda: st.restarts == 1 and st.error is None)
+        wait_for(lambda: st.buffer.written > st.buffer.consumed)
+        stats = st.reduce()
+    assert all(s["n"] > 0 for s in stats.values())
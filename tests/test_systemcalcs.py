@@ -0,0 +1,123 @@
+import math
+
+import numpy as np
+import pytest
+
+import systemCalcs as calc
+
+
+# ---- Reference: the original per-scan scalar formulas (math module only) ----
+def ref_velocity(Pv, rho):
+    return 1096.5 * math.sqrt(abs(Pv/rho))
+
+def ref_Qactual(V, D):
+    r = (D/2)/12
+    return V * math.pi * r**2
+
+def ref_Qstandard(Q, P, T):
+    return Q*(P/30)*(288.72/(((T - 32)/1.8) + 273.15))
+
+def ref_Pp(Tdew):
+    T = Tdew + 459.67
+    return math.exp(-1.0440397e4/T - 1.1294650e1 - 2.7022355e-2*T + 1.2890360e-5*T**2
+                    - 2.4780681e-9*T**3 + 6.5459673*math.log(T)) * 2.03602
+
+def ref_W(Pbar, pp):
+    return 0.621945*(pp/(Pbar - pp))
+
+def ref_RH(pp_water, pp_sat):
+    return 100*(pp_water/pp_sat)
+
+def ref_rho(Pbar_mbar, T, W):
+    P = Pbar_mbar * 2.08854
+    return (P * (1 + W))/(53.352 * (T + 459.69) * (1 + 1.6078 * W))
+
+def ref_scan(Pbar_mbar, Pbar_inHg, pdiff, Tdb, Tdew, Tdb_room, D, Tdew_room=None, W_room=None):
+    # One record as the original logging loop computed it
+    pp_water = ref_Pp(Tdew)
+    pp_sat = ref_Pp(Tdb)
+    pp_sat_room = ref_Pp(Tdb_room)
+    w = ref_W(Pbar_inHg, pp_water)
+    if Tdew_room is not None:
+        pp_water_room = ref_Pp(Tdew_room)
+        w_room = ref_W(Pbar_inHg, pp_water_room)
+    else:
+        w_room = W_room
+        pp_water_room = Pbar_inHg*w_room/(0.621945 + w_room)
+    rho = ref_rho(Pbar_mbar, Tdb, w)
+    V = ref_velocity(pdiff, rho)
+    Q_Acfm = round(ref_Qactual(V, D), 2)
+    Q_Scfm = round(ref_Qstandard(Q_Acfm, Pbar_inHg, Tdb), 2)
+    q_sensible = round(1.08 * Q_Scfm * (Tdb - Tdb_room), 1)
+    q_latent = round(4840 * Q_Scfm * (w - w_room), 1)
+    return {"pp_water": pp_water, "pp_sat": pp_sat, "pp_water_room": pp_water_room,
+            "W": w, "W_room": w_room, "rho": rho, "rho_room": ref_rho(Pbar_mbar, Tdb_room, w_room),
+            "rh": ref_RH(pp_water, pp_sat), "rh_room": ref_RH(pp_water_room, pp_sat_room),
+            "V": V, "Q_Acfm": Q_Acfm, "Q_Scfm": Q_Scfm, "q_sensible": q_sensible,
+            "q_latent": q_latent, "q_total": round(q_sensible + q_latent, 1)}
+
+ROUNDED = {"Q_Acfm": 0.01, "Q_Scfm": 0.01, "q_sensible": 0.1, "q_latent": 0.1, "q_total": 0.1}
+
+
+def operating_points(n=2000, seed=0):
+    # Random inputs over the station's range, the barometer as the station
+    # reads it (mbar, and inHg rounded to 0.01)
+    rng = np.random.default_rng(seed)
+    Pbar_mbar = rng.uniform(965, 1033, n)
+    return {"Pbar_mbar": Pbar_mbar, "Pbar_inHg": np.round(Pbar_mbar/33.864, 2),
+            "pdiff": rng.uniform(0.0, 0.5, n), "Tdb": rng.uniform(60, 110, n),
+            "Tdew": rng.uniform(30, 60, n), "Tdb_room": rng.uniform(65, 85, n),
+            "D": rng.choice([5.88, 7.87, 16.0], n)}
+
+
+@pytest.mark.parametrize("room", ["Tdew_room", "W_room"])
+def test_chain_matches_scalar_reference(room):
+    inputs = operating_points()
+    n = len(inputs["Tdb"])
+    rng = np.random.default_rng(1)
+    inputs[room] = rng.uniform(35, 60, n) if room == "Tdew_room" else rng.uniform(0.004, 0.012, n)
+    r = calc.heat_gain_chain(**inputs)
+    mismatched = dict.fromkeys(ROUNDED, 0)
+    for i in range(n):
+        ref = ref_scan(**{k: float(v[i]) for k, v in inputs.items()})
+        for key, value in ref.items():
+            got = float(r[key][i])
+            if key in ROUNDED:
+                # Rounding a value that sits on a .5 boundary may go either way
+                # (1 ulp apart); anything else must match exactly
+                assert abs(got - value) <= ROUNDED[key]*1.0001, (key, i, got, value)
+                mismatched[key] += got != value
+            else:
+                assert got == pytest.approx(value, rel=1e-12, abs=1e-15), (key, i)
+    assert all(count <= n//1000 for count in mismatched.values()), mismatched
+
+
+def test_scalar_inputs_give_scalar_results():
+    r = calc.heat_gain_chain(29.62, 0.05, 79.4, 53.35, 76.09, 16, W_room=0.00803)
+    ref = ref_scan(29.62/calc.millibar_to_inHg, 29.62, 0.05, 79.4, 53.35, 76.09, 16, W_room=0.00803)
+    for key in ("V", "Q_Scfm", "q_sensible", "q_latent", "q_total", "rh"):
+        assert np.ndim(r[key]) == 0
+        assert float(r[key]) == pytest.approx(ref[key], rel=1e-12)
+
+
+def test_velocity_matches_math_sqrt_including_negative_pdiff():
+    pdiff = np.array([-0.02, 0.0, 0.004, 0.25])
+    v = calc.velocity(pdiff, 0.075)
+    assert list(v) == pytest.approx([ref_velocity(p, 0.075) for p in pdiff], rel=1e-15)
+
+
+def test_fast_Pp_within_table_error():
+    inputs = operating_points(500)
+    inputs["Tdew_room"] = inputs["Tdew"] - 5
+    exact = calc.heat_gain_chain(round_results=False, **inputs)
+    fast = calc.heat_gain_chain(round_results=False, fast_Pp=True, **inputs)
+    for key in ("W", "rh", "rh_room", "Q_Scfm", "q_total"):
+        assert np.allclose(fast[key], exact[key], rtol=1e-8, atol=1e-6)
+
+
+def test_room_humidity_is_either_or():
+    inputs = operating_points(3)
+    with pytest.raises(ValueError):
+        calc.heat_gain_chain(**inputs)
+    with pytest.raises(ValueError):
+        calc.heat_gain_chain(Tdew_room=50.0, W_room=0.008, **inputs)
@@ -0,0 +1,252 @@
+"""
+Description:
+Measurement uncertainty of the flow and heat gain results. The accuracy specs
+of the sensors (uncertainty_specs.csv: one or more error components per
+systemCalcs.heat_gain_chain input, e.g. Setra accuracy + zero offset for
+pdiff) are propagated through velocity -> Acfm -> Scfm -> sensible / latent /
+total heat gain in one of two ways:
+
+    linear(inputs)       first-order (GUM) propagation: sensitivities from
+                         central differences of the chain, all inputs stacked
+                         into one vectorized chain call; optional per-input
+                         uncertainty budget
+    monte_carlo(inputs)  every input drawn `draws` times per sample and the
+                         chain evaluated on (samples, draws) arrays; gives the
+                         spread and a 95 % interval without linearizing
+
+At low flows (pdiff of a few thousandths of an inWc) velocity ~ sqrt(pdiff)
+is far from linear over the pdiff uncertainty, so the first-order result
+understates the spread there; use the Monte Carlo mode for those tests.
+
+Inputs are heat_gain_chain arguments (scalars for one scan, arrays for a
+whole log). Both functions return a dict of arrays: the nominal value of each
+output, "u:<output>" (standard uncertainty) and "lo:<output>" / "hi:<output>"
+(95 % interval), plus "mean:<output>" for Monte Carlo and
+"u:<output>:<input>" per input for linear(..., budget=True).
+
+Dependencies:
+    - systemCalcs
+    - numpy
+    - csv (standard library)
+"""
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#                               Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import csv
+import os
+import numpy as np
+import systemCalcs as calc
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+DEFAULT_SPECS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uncertainty_specs.csv")
+OUTPUTS = ("V", "Q_Acfm", "Q_Scfm", "q_sensible", "q_latent", "q_total")
+DISTRIBUTIONS = ("uniform", "normal")
+COVERAGE_K = 2.0      # linear(): lo/hi = value -/+ k*u (~95 %)
+STEP = 1e-3           # central-difference step, fraction of the input's std
+CHUNK_ELEMENTS = 500000 # monte_carlo(): draws x samples per chain call
+
+
+class Component:
+    # One error source of an input: +/- (limit + rel*|x|). For "uniform" the
+    # bound is the limit of a rectangular distribution (datasheet accuracy),
+    # for "normal" it is the 95 % (k=2) bound.
+
+    def __init__(self, input, name, limit=0.0, rel=0.0, dist="uniform"):
+        if dist not in DISTRIBUTIONS:
+            raise ValueError("Unknown distribution \"{}\" for {}".format(dist, input))
+        self.input = input
+        self.name = name
+        self.limit = float(limit)
+        self.rel = float(rel)
+        self.dist = dist
+
+    def bound(self, x):
+        return self.limit + self.rel*np.abs(x) if self.rel else self.limit
+
+    def std(self, x):
+        return self.bound(x)/(np.sqrt(3.0) if self.dist == "uniform" else 2.0)
+
+    def draw(self, rng, x, shape):
+        if self.dist == "uniform":
+            return rng.uniform(-1.0, 1.0, shape)*self.bound(x)
+        return rng.standard_normal(shape)*(self.bound(x)/2.0)
+
+
+class SensorSpecs:
+
+    def __init__(self, components):
+        self.components = {}
+        for c in components:
+            self.components.setdefault(c.input, []).append(c)
+
+    @classmethod
+    def from_dict(cls, spec):
+        # spec: [{input, component, limit, rel, dist}, ...] or
+        #       {input: limit} (one uniform component each)
+        if isinstance(spec, dict):
+            spec = [{"input": k, "limit": v} for k, v in spec.items()]
+        components = []
+        for entry in spec:
+            entry = {k: v for k, v in entry.items() if v not in (None, "")}
+            components.append(Component(entry["input"], entry.get("component", entry["input"]),
+                                        entry.get("limit", 0.0), entry.get("rel", 0.0),
+                                        entry.get("dist", "uniform")))
+        return cls(components)
+
+    @classmethod
+    def load(cls, path=DEFAULT_SPECS):
+        with open(path, newline='') as f:
+            rows = [{k.strip(): v.strip() for k, v in row.items()}
+                    for row in csv.DictReader(f)]
+        return cls.from_dict(rows)
+
+    def std(self, input, x):
+        # Combined standard uncertainty of one input (components in quadrature)
+        var = 0.0
+        for c in self.components.get(input, ()):
+            var = var + c.std(x)**2
+        return np.sqrt(var)
+
+    def draw(self, input, rng, x, shape):
+        # Summed error of all components, `shape` draws
+        err = 0.0
+        for c in self.components.get(input, ()):
+            err = err + c.draw(rng, x, shape)
+        return err
+
+    def __contains__(self, input):
+        return input in self.components
+
+    def __iter__(self):
+        return iter(self.components)
+
+
+def _specs(specs):
+    if specs is None:
+        return SensorSpecs.load()
+    if isinstance(specs, (dict, list)):
+        return SensorSpecs.from_dict(specs)
+    return specs
+
+def _chain(inputs, fast_Pp):
+    return calc.heat_gain_chain(round_results=False, fast_Pp=fast_Pp, **inputs)
+
+
+# ---- First-order propagation ------------------------------------------------
+def linear(inputs, specs=None, outputs=OUTPUTS, budget=False, fast_Pp=False):
+    # inputs: heat_gain_chain arguments (scalars or arrays, incl. D)
+    specs = _specs(specs)
+    x = {k: np.asarray(v, dtype=float) for k, v in inputs.items()}
+    shape = np.broadcast(*x.values()).shape
+    names = [k for k in x if k in specs]
+    # Stack nominal, +h and -h for every uncertain input along a new first
+    # axis so the whole Jacobian costs a single chain call
+    m = len(names)
+    stacked = {k: np.broadcast_to(v, (1 + 2*m,) + shape).copy() if k in specs else v
+               for k, v in x.items()}
+    u_in, steps = {}, {}
+    for j, k in enumerate(names):
+        u_in[k] = np.broadcast_to(specs.std(k, x[k]), shape)
+        steps[k] = np.where(u_in[k] > 0, STEP*u_in[k], 1.0)
+        stacked[k][1 + 2*j] += steps[k]
+        stacked[k][2 + 2*j] -= steps[k]
+    r = _chain(stacked, fast_Pp)
+    result = {}
+    for out in outputs:
+        y = r[out]
+        var = 0.0
+        for j, k in enumerate(names):
+            c = (y[1 + 2*j] - y[2 + 2*j])/(2*steps[k])*u_in[k]
+            var = var + c**2
+            if budget:
+                result["u:{}:{}".format(out, k)] = np.abs(c)
+        u = np.sqrt(var)*np.ones(shape)
+        result[out] = y[0]
+        result["u:" + out] = u
+        result["lo:" + out] = y[0] - COVERAGE_K*u
+        result["hi:" + out] = y[0] + COVERAGE_K*u
+    return result
+
+
+# ---- Monte Carlo --------------------------------------------------------------
+def monte_carlo(inputs, specs=None, draws=2000, seed=None, outputs=OUTPUTS,
+                interval=(2.5, 97.5), fast_Pp=False, chunk_elements=CHUNK_ELEMENTS):
+    # Samples are processed in chunks of about chunk_elements / draws rows to
+    # bound memory on long logs; fast_Pp: Pp lookup table instead of the
+    # exact formula (see systemCalcs.PpTable)
+    specs = _specs(specs)
+    rng = np.random.default_rng(seed)
+    x = {k: np.asarray(v, dtype=float) for k, v in inputs.items()}
+    shape = np.broadcast(*x.values()).shape
+    flat = {k: np.broadcast_to(v, shape).ravel() for k, v in x.items()}
+    n = int(np.prod(shape))
+    nominal = _chain(flat, fast_Pp)
+    result = {}
+    for out in outputs:
+        result[out] = nominal[out]
+        for stat in ("mean", "u", "lo", "hi"):
+            result["{}:{}".format(stat, out)] = np.empty(n)
+    rows = max(1, chunk_elements//draws)
+    for start in range(0, n, rows):
+        sl = slice(start, min(start + rows, n))
+        sample = {}
+        for k, v in flat.items():
+            v = v[sl]
+            v = v[:, None] # draws along the last (contiguous) axis
+            sample[k] = v + specs.draw(k, rng, v, (len(v), draws)) if k in specs else v
+        r = _chain(sample, fast_Pp)
+        for out in outputs:
+            y = r[out]
+            result["mean:" + out][sl] = y.mean(axis=1)
+            result["u:" + out][sl] = y.std(axis=1, ddof=1)
+            lo, hi = np.percentile(y, interval, axis=1)
+            result["lo:" + out][sl] = lo
+            result["hi:" + out][sl] = hi
+    return {k: v.reshape(shape) if v.ndim else v for k, v in result.items()}
+
+
+def propagate(inputs, method="linear", specs=None, draws=2000, seed=None, **kwargs):
+    # method: "linear" or "mc"
+    if method == "linear":
+        return linear(inputs, specs, **kwargs)
+    if method == "mc":
+        return monte_carlo(inputs, specs, draws, seed, **kwargs)
+    raise ValueError("Unknown uncertainty method \"{}\" (linear or mc)".format(method))
+
+
+if __name__ == '__main__':
+    import time
+
+    # Uncertainty budget at a nominal and a low flow (input_parameters.csv
+    # conditions), first-order vs. Monte Carlo
+    specs = SensorSpecs.load()
+    for pdiff in (0.05, 0.009):
+        inputs = {"Pbar_inHg": 29.62, "pdiff": pdiff, "Tdb": 79.4, "Tdew": 53.35,
+                  "Tdb_room": 76.09, "W_room": 0.00803, "D": 16}
+        lin = linear(inputs, specs, budget=True)
+        mc = monte_carlo(inputs, specs, draws=20000, seed=0)
+        print("\npdiff = {} inWc".format(pdiff))
+        print("  {:12s} {:>10s} {:>10s} {:>10s} {:>10s}   largest contributions".format(
+            "output", "value", "u linear", "u MC", "MC mean"))
+        for out in ("Q_Scfm", "q_sensible", "q_latent", "q_total"):
+            top = sorted(((float(lin["u:{}:{}".format(out, k)]), k) for k in inputs if k in specs),
+                         reverse=True)[:3]
+            print("  {:12s} {:10.2f} {:10.2f} {:10.2f} {:10.2f}   {}".format(
+                out, float(lin[out]), float(lin["u:" + out]), float(mc["u:" + out]),
+                float(mc["mean:" + out]), ", ".join("{} {:.1f}".format(k, u) for u, k in top)))
+
+    # Per-scan and whole-log cost
+    n = 100
+    tic = time.perf_counter()
+    for i in range(n):
+        linear(inputs, specs)
+    print("\nlinear, one scan:        {:8.3f} ms".format((time.perf_counter() - tic)/n*1000))
+    tic = time.perf_counter()
+    for i in range(n):
+        monte_carlo(inputs, specs, draws=2000)
+    print("monte_carlo 2000 draws:  {:8.3f} ms".format((time.perf_counter() - tic)/n*1000))
+    rows = 10000
+    log = {k: np.full(rows, v, dtype=float) for k, v in inputs.items()}
+    tic = time.perf_counter()
+    monte_carlo(log, specs, draws=1000)
+    print("monte_carlo, {} rows x 1000 draws: {:.2f} s".format(rows, time.perf_counter() - tic))